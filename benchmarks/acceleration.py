@@ -0,0 +1,92 @@
+"""
+Benchmark of the acceleration schemes of the outer fixed-point iteration
+
+Solves a series of operating points with the plain fixed-point iteration as
+baseline and with the selected acceleration schemes and reports the outer
+iterations per operating point, the share of accelerated iterations, the
+solution time, the savings relative to the baseline and the deviation of
+the stack voltage from the baseline, e.g.:
+
+    python benchmarks/acceleration.py --cells 10 --schemes anderson aitken
+    python benchmarks/acceleration.py --current-density 6000 14000 --depth 3
+"""
+# general imports
+import argparse
+import copy
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local module imports
+from pemfc.src import simulation
+from pemfc.data import input_dicts
+
+
+def run(settings, scheme):
+    """
+    Solves the operating points and returns the solution time, the timing
+    dictionary and the stack voltage of the last operating point
+    """
+    settings = copy.deepcopy(settings)
+    settings['simulation']['acceleration']['type'] = scheme
+    start_time = timeit.default_timer()
+    sim = simulation.Simulation(settings)
+    global_data, local_data = sim.run()
+    solution_time = timeit.default_timer() - start_time
+    return solution_time, sim.timing, global_data['Stack Voltage']['value']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cells', type=int, default=10,
+                        help='number of cells of the stack')
+    parser.add_argument('--current-density', type=float, nargs='+',
+                        default=[14000.0],
+                        help='stack current densities [A/m²]')
+    parser.add_argument('--schemes', nargs='+',
+                        default=['anderson', 'aitken'],
+                        help='acceleration schemes compared to the plain '
+                             'iteration')
+    parser.add_argument('--depth', type=int, default=5,
+                        help='history depth of the Anderson mixing')
+    parser.add_argument('--start', type=int, default=3,
+                        help='plain iterations before the acceleration '
+                             'starts')
+    args = parser.parse_args(argv)
+
+    np.seterr(all='raise')
+    settings = copy.deepcopy(input_dicts.sim_dict)
+    settings['stack']['cell_number'] = args.cells
+    settings['simulation']['current_density'] = args.current_density
+    settings['simulation']['acceleration'].update(
+        {'depth': args.depth, 'start_iteration': args.start})
+    settings['output']['save_csv'] = False
+    settings['output']['save_plot'] = False
+
+    print('{:>10s} {:>20s} {:>12s} {:>9s} {:>9s} {:>9s} {:>10s}'.format(
+        'scheme', 'iterations/point', 'accelerated', 'time [s]',
+        'it. saved', 'speedup', 'deviation'))
+    base_time, base_timing, reference = run(settings, None)
+    for scheme in [None] + args.schemes:
+        if scheme is None:
+            solution_time, timing, voltage = \
+                base_time, base_timing, reference
+        else:
+            solution_time, timing, voltage = run(settings, scheme)
+        iterations = timing['iterations']
+        print('{:>10s} {:>20s} {:>12.1%} {:>9.2f} {:>9.1%} {:>9.2f} '
+              '{:>10.2e}'.format(
+                  str(scheme),
+                  ' '.join(str(n) for n in timing['point_iterations']),
+                  timing['accelerated_iterations'] / max(iterations, 1),
+                  solution_time,
+                  1.0 - iterations / base_timing['iterations'],
+                  base_time / solution_time,
+                  abs(voltage - reference) / reference))
+
+
+if __name__ == '__main__':
+    main()
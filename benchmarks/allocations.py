@@ -0,0 +1,88 @@
+"""
+Allocation benchmark of the outer iteration
+
+Measures the heap memory allocated by a steady-state outer iteration
+(Stack.update) and its phases with tracemalloc after a number of warm-up
+iterations. Reported are the transient peak above the memory in use before
+the call, the retained memory after the call and the number of workspace
+buffers allocated during the measured iterations (zero in steady state),
+e.g.:
+
+    python benchmarks/allocations.py --cells 50 --iterations 5
+"""
+# general imports
+import argparse
+import copy
+import os
+import sys
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local module imports
+from pemfc.src import stack
+from pemfc.data import input_dicts
+
+
+def measure(function):
+    """
+    Returns the transient peak and the retained heap memory [bytes] of a
+    function call
+    """
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - start, current - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cells', type=int, default=50,
+                        help='number of cells of the stack')
+    parser.add_argument('--warmup', type=int, default=5,
+                        help='number of outer iterations before measuring')
+    parser.add_argument('--iterations', type=int, default=5,
+                        help='number of measured outer iterations')
+    parser.add_argument('--current-density', type=float, default=10000.0,
+                        help='stack current density [A/m²]')
+    args = parser.parse_args(argv)
+
+    np.seterr(all='raise')
+    settings = copy.deepcopy(input_dicts.sim_dict)
+    settings['stack']['cell_number'] = args.cells
+    n_nodes = settings['simulation']['nodes']
+    fc_stack = stack.Stack(settings, n_nodes, current_control=True)
+    fc_stack.update(current_density=args.current_density)
+    for i in range(args.warmup):
+        fc_stack.update()
+
+    def update_cells():
+        for i, cell in enumerate(fc_stack.cells):
+            cell.update(fc_stack.i_cd[i], current_control=True)
+
+    phases = [('stack update', fc_stack.update),
+              ('flow circuits', fc_stack.update_flows),
+              ('cells', update_cells),
+              ('temperature system', fc_stack.temp_sys.update),
+              ('electrical system', fc_stack.elec_sys.update)]
+    n_buffers = fc_stack.workspace.n_allocations
+    print('cells: {}, nodes: {}, iterations: {}, workspace: {:.1f} kB'.format(
+        args.cells, n_nodes, args.iterations,
+        fc_stack.workspace.nbytes / 1e3))
+    print('{:<20s} {:>12s} {:>14s}'.format(
+        'phase', 'peak [kB]', 'retained [kB]'))
+    for name, function in phases:
+        results = np.asarray([measure(function)
+                              for i in range(args.iterations)])
+        peak, retained = np.max(results, axis=0) / 1e3
+        print('{:<20s} {:>12.1f} {:>14.1f}'.format(name, peak, retained))
+    print('workspace buffers allocated in steady state: {}'.format(
+        fc_stack.workspace.n_allocations - n_buffers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark of the thread-parallel cell and flow circuit updates
+
+Times a fixed number of outer iterations (Stack.update) of a large stack for
+different numbers of cell update threads and for the batched update of all
+cells and checks, that the resulting stack states are identical to the
+serial calculation. Optionally, the flow circuits are updated concurrently
+in the multi-threaded runs, e.g.:
+
+    python benchmarks/cell_threads.py --cells 300 --threads 1 2 4 8
+    python benchmarks/cell_threads.py --threads 1 3 --concurrent-flow
+"""
+# general imports
+import argparse
+import copy
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local module imports
+from pemfc.src import stack
+from pemfc.data import input_dicts
+
+
+def run(settings, n_nodes, n_threads, n_iterations, concurrent_flow=False,
+        cell_bank=False):
+    """
+    Returns the timings of the iterations and the final state of the stack
+    """
+    settings = copy.deepcopy(settings)
+    settings['stack']['cell_threads'] = n_threads
+    settings['stack']['cell_bank'] = cell_bank
+    settings['stack']['concurrent_flow_circuits'] = \
+        concurrent_flow and n_threads > 1
+    current_density = settings['simulation']['current_density']
+    fc_stack = stack.Stack(settings, n_nodes, current_control=True)
+    timing = {'total': 0.0, 'flow': 0.0, 'cells': 0.0, 'temperature': 0.0}
+    for i in range(n_iterations):
+        start_time = timeit.default_timer()
+        if i == 0:
+            fc_stack.update(current_density=current_density)
+        else:
+            fc_stack.update()
+        timing['total'] += timeit.default_timer() - start_time
+        timing['flow'] += fc_stack.timing['flow']
+        timing['cells'] += fc_stack.timing['cells']
+        timing['temperature'] += fc_stack.timing['temperature']
+    fc_stack.close()
+    return timing, fc_stack.get_state()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cells', type=int, default=300,
+                        help='number of cells of the stack')
+    parser.add_argument('--threads', type=int, nargs='+',
+                        default=[1, 2, 4, 8],
+                        help='numbers of cell update threads')
+    parser.add_argument('--iterations', type=int, default=5,
+                        help='number of outer iterations')
+    parser.add_argument('--current-density', type=float, default=5000.0,
+                        help='stack current density [A/m²]')
+    parser.add_argument('--manifold-diameter', type=float, default=60e-3,
+                        help='diameter of all manifolds [m], the default '
+                             'manifolds are too small for large stacks')
+    parser.add_argument('--concurrent-flow', action='store_true',
+                        help='update the flow circuits concurrently in the '
+                             'multi-threaded runs')
+    args = parser.parse_args(argv)
+
+    np.seterr(all='raise')
+    settings = copy.deepcopy(input_dicts.sim_dict)
+    settings['stack']['cell_number'] = args.cells
+    settings['simulation']['current_density'] = args.current_density
+    for circuit in ('cathode', 'anode'):
+        for manifold in ('inlet_manifold', 'outlet_manifold'):
+            settings[circuit]['flow_circuit'][manifold]['diameter'] = \
+                args.manifold_diameter
+    for manifold in ('inlet_manifold', 'outlet_manifold'):
+        settings['coolant_flow_circuit'][manifold]['diameter'] = \
+            args.manifold_diameter
+    n_nodes = settings['simulation']['nodes']
+
+    if hasattr(os, 'sched_getaffinity'):
+        n_cores = len(os.sched_getaffinity(0))
+    else:
+        n_cores = os.cpu_count()
+    # cores available to this process
+    print('cells: {}, nodes: {}, iterations: {}, cpu cores: {}'.format(
+        args.cells, n_nodes, args.iterations, n_cores))
+    if n_cores < max(args.threads):
+        print('warning: fewer cpu cores than threads, the speedups are '
+              'limited by the number of cores')
+    print('{:>8s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s}'.format(
+        'threads', 'total [s]', 'flow [s]', 'cells [s]', 'speedup',
+        'identical'))
+    reference = None
+    serial_time = None
+    runs = [(str(n_threads), n_threads, False) for n_threads in args.threads]
+    runs.append(('batched', 1, True))
+    for label, n_threads, cell_bank in runs:
+        timing, state = run(settings, n_nodes, n_threads, args.iterations,
+                            args.concurrent_flow, cell_bank)
+        if reference is None:
+            reference = state
+            serial_time = timing['cells']
+        identical = \
+            np.array_equal(state['i_cd'], reference['i_cd']) \
+            and np.array_equal(state['temp_layer_vec'],
+                               reference['temp_layer_vec'])
+        print('{:>8s} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.2f} {:>10s}'.format(
+            label, timing['total'], timing['flow'], timing['cells'],
+            serial_time / timing['cells'], str(identical)))
+
+
+if __name__ == '__main__':
+    main()
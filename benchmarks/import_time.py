@@ -0,0 +1,91 @@
+"""
+Import-time benchmark of the pemfc package
+
+Measures the time to import the package and its numerical core in fresh
+interpreters and checks, that neither the GUI (tkinter) nor the plotting
+library (matplotlib) are loaded by these imports. Exits with a non-zero
+status, if a heavy dependency is imported or the optional time limit is
+exceeded, e.g.:
+
+    python benchmarks/import_time.py --repeat 5 --max-time 2.0
+"""
+# general imports
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules imported in the benchmark
+TARGETS = ['pemfc', 'pemfc.src.simulation']
+
+# modules which must not be loaded by importing the targets
+HEAVY_MODULES = ['tkinter', 'matplotlib', 'pemfc.gui']
+
+SNIPPET = """
+import sys, timeit
+start = timeit.default_timer()
+import {target}
+duration = timeit.default_timer() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(duration, ','.join(heavy))
+"""
+
+
+def measure(target, heavy_modules):
+    """
+    Imports the target module in a fresh interpreter and returns the import
+    time and the list of loaded heavy modules, raises a RuntimeError if the
+    import fails
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = \
+        os.pathsep.join([ROOT_DIR] + [env['PYTHONPATH']]
+                        if env.get('PYTHONPATH') else [ROOT_DIR])
+    code = SNIPPET.format(target=target, heavy=heavy_modules)
+    result = subprocess.run([sys.executable, '-c', code], env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().split('\n')[-1])
+    duration, heavy = result.stdout.split('\n')[0].split(' ', 1)
+    return float(duration), [name for name in heavy.split(',') if name]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of fresh interpreters per target')
+    parser.add_argument('--max-time', type=float, default=None,
+                        help='maximum median import time per target [s]')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for target in TARGETS:
+        durations = []
+        heavy = set()
+        try:
+            for i in range(args.repeat):
+                duration, heavy_modules = measure(target, HEAVY_MODULES)
+                durations.append(duration)
+                heavy.update(heavy_modules)
+        except RuntimeError as error:
+            print('{:<24s} import failed: {}'.format(target, error))
+            failed = True
+            continue
+        median = statistics.median(durations)
+        print('{:<24s} median: {:8.4f} s, min: {:8.4f} s, max: {:8.4f} s'
+              .format(target, median, min(durations), max(durations)))
+        if heavy:
+            print('    heavy modules imported: {}'.format(
+                ', '.join(sorted(heavy))))
+            failed = True
+        if args.max_time is not None and median > args.max_time:
+            print('    import time exceeds {} s'.format(args.max_time))
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Benchmark of the linear solvers of the temperature and electrical systems
+
+Solves an operating point of a stack to convergence with different linear
+solver configurations and reports the number of outer iterations, the
+computational time of the temperature and electrical systems, the number
+of factorizations and the deviation of the stack voltage from the first
+configuration. The configurations are given as solver type with optional
+preconditioner and refactorization interval, separately for the
+temperature and the electrical system if separated by a slash, e.g.:
+
+    python benchmarks/linear_solvers.py --cells 50 --elements 50 \
+        --solvers spsolve splu:4 cg:jacobi bicgstab:ilu:4 cg:jacobi/splu:4
+
+The block-tridiagonal and the domain decomposition solver only apply to the
+temperature system, e.g. block_tridiagonal:4/splu:4. The domain decomposition
+solver partitions the stack into one subdomain per cell thread (--threads).
+"""
+# general imports
+import argparse
+import copy
+import os
+import sys
+import tempfile
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local module imports
+from pemfc.src import simulation, grid_sequencing
+from pemfc.data import input_dicts
+
+
+def parse_solver(spec):
+    """
+    Returns the linear solver settings for a configuration string of the
+    form type[:preconditioner][:refactor_interval]
+    """
+    solver_dict = {}
+    for item in spec.split(':'):
+        if 'type' not in solver_dict:
+            solver_dict['type'] = item
+        elif item.isdigit():
+            solver_dict['refactor_interval'] = int(item)
+        else:
+            solver_dict['preconditioner'] = item
+    return solver_dict
+
+
+def run(settings, spec, current_density):
+    """
+    Solves the operating point and returns the results and timings
+    """
+    settings = copy.deepcopy(settings)
+    specs = spec.split('/')
+    for i, key in enumerate(('temperature_linear_solver',
+                             'electrical_linear_solver')):
+        settings['stack'][key].update(
+            parse_solver(specs[min(i, len(specs) - 1)]))
+    sim = simulation.Simulation(settings)
+    timing = {'temperature': 0.0, 'electrical': 0.0}
+
+    def add_timing(record):
+        for key in timing:
+            timing[key] += record['timing'][key]
+
+    sim.iteration_callback = add_timing
+    start_time = timeit.default_timer()
+    n_iterations = sim.solve(current_density)[0]
+    timing['total'] = timeit.default_timer() - start_time
+    n_factorizations = \
+        sim.stack.temp_sys.linear_solver.n_factorizations \
+        + sim.stack.elec_sys.linear_solver.n_factorizations
+    return sim.stack.v_stack, n_iterations, n_factorizations, timing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cells', type=int, default=50,
+                        help='number of cells of the stack')
+    parser.add_argument('--elements', type=int, default=50,
+                        help='number of elements along the channels')
+    parser.add_argument('--solvers', nargs='+',
+                        default=['spsolve', 'splu', 'splu:4', 'cg:jacobi',
+                                 'bicgstab:ilu:4', 'cg:jacobi/splu:4'],
+                        help='linear solver configurations '
+                             '(type[:preconditioner][:refactor_interval], '
+                             'temperature/electrical system)')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='number of cell threads')
+    parser.add_argument('--current-density', type=float, default=10000.0,
+                        help='stack current density [A/m²]')
+    args = parser.parse_args(argv)
+
+    np.seterr(all='raise')
+    settings = copy.deepcopy(input_dicts.sim_dict)
+    settings['stack']['cell_number'] = args.cells
+    settings['stack']['cell_threads'] = args.threads
+    grid_sequencing.set_nodes(settings, args.elements + 1)
+    settings['output']['directory'] = tempfile.mkdtemp()
+    settings['output']['save_plot'] = False
+    settings['output']['save_csv'] = False
+
+    print('cells: {}, elements: {}, threads: {}'.format(
+        args.cells, args.elements, args.threads))
+    print('{:<24s} {:>10s} {:>8s} {:>10s} {:>10s} {:>10s} {:>12s}'.format(
+        'solver', 'total [s]', 'outer', 'temp. [s]', 'elec. [s]',
+        'factoriz.', 'voltage dev.'))
+    reference = None
+    for spec in args.solvers:
+        v_stack, n_iterations, n_factorizations, timing = \
+            run(settings, spec, args.current_density)
+        if reference is None:
+            reference = v_stack
+        print('{:<24s} {:>10.3f} {:>8d} {:>10.3f} {:>10.3f} {:>10d} '
+              '{:>12.2e}'.format(spec, timing['total'], n_iterations,
+                                 timing['temperature'], timing['electrical'],
+                                 n_factorizations,
+                                 v_stack / reference - 1.0))
+
+
+if __name__ == '__main__':
+    main()
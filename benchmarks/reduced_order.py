@@ -0,0 +1,105 @@
+"""
+Benchmark of the reduced-order stack model
+
+Solves an operating point of a large stack with all cells and with the
+reduced-order model for different initial numbers of cell clusters and
+reports the solution times, the iterations and the maximum relative
+deviation of the interpolated cell voltages from the full solution, e.g.:
+
+    python benchmarks/reduced_order.py --cells 40 80 --clusters 8 16
+    python benchmarks/reduced_order.py --cells 200 --max-refinements 0 1
+"""
+# general imports
+import argparse
+import copy
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local module imports
+from pemfc.src import simulation
+from pemfc.data import input_dicts
+
+
+def run(settings, reduced_dict=None):
+    """
+    Returns the solution time, the number of iterations, the number of
+    solved cells and the average voltages of all cells of the stack
+    """
+    settings = copy.deepcopy(settings)
+    if reduced_dict is not None:
+        settings['simulation']['reduced_order'].update(reduced_dict)
+        settings['simulation']['reduced_order']['active'] = True
+    start_time = timeit.default_timer()
+    sim = simulation.Simulation(settings)
+    global_data, local_data = sim.run()
+    solution_time = timeit.default_timer() - start_time
+    cell_voltages = np.average(local_data['Cell Voltage']['value'], axis=-1)
+    return solution_time, sim.timing['iterations'], sim.stack.n_cells, \
+        cell_voltages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cells', type=int, nargs='+', default=[40, 80],
+                        help='numbers of cells of the stack')
+    parser.add_argument('--clusters', type=int, nargs='+', default=[8, 16],
+                        help='initial numbers of clusters of the interior '
+                             'cells')
+    parser.add_argument('--tolerance', type=float, default=2e-3,
+                        help='maximum relative spread of the cell voltages '
+                             'within a cluster')
+    parser.add_argument('--max-refinements', type=int, nargs='+',
+                        default=[1],
+                        help='maximum numbers of adaptive refinements')
+    parser.add_argument('--current-density', type=float, default=14000.0,
+                        help='stack current density [A/m²]')
+    parser.add_argument('--manifold-diameter', type=float, default=None,
+                        help='diameter of all manifolds [m], the default '
+                             'manifolds are too small for large stacks')
+    args = parser.parse_args(argv)
+
+    np.seterr(all='raise')
+    settings = copy.deepcopy(input_dicts.sim_dict)
+    settings['simulation']['current_density'] = args.current_density
+    settings['output']['save_csv'] = False
+    settings['output']['save_plot'] = False
+    if args.manifold_diameter is not None:
+        for circuit in ('cathode', 'anode'):
+            for manifold in ('inlet_manifold', 'outlet_manifold'):
+                settings[circuit]['flow_circuit'][manifold]['diameter'] = \
+                    args.manifold_diameter
+        for manifold in ('inlet_manifold', 'outlet_manifold'):
+            settings['coolant_flow_circuit'][manifold]['diameter'] = \
+                args.manifold_diameter
+
+    print('{:>6s} {:>9s} {:>12s} {:>7s} {:>11s} {:>9s} {:>8s} {:>10s}'.format(
+        'cells', 'clusters', 'refinements', 'solved', 'iterations',
+        'time [s]', 'speedup', 'deviation'))
+    for n_cells in args.cells:
+        settings['stack']['cell_number'] = n_cells
+        full_time, iterations, n_solved, reference = run(settings)
+        print('{:>6d} {:>9s} {:>12s} {:>7d} {:>11d} {:>9.2f} {:>8.2f} '
+              '{:>10.2e}'.format(n_cells, '-', '-', n_solved, iterations,
+                                 full_time, 1.0, 0.0))
+        for n_clusters in args.clusters:
+            for max_refinements in args.max_refinements:
+                reduced_dict = {'clusters': n_clusters,
+                                'tolerance': args.tolerance,
+                                'max_refinements': max_refinements}
+                solution_time, iterations, n_solved, cell_voltages = \
+                    run(settings, reduced_dict)
+                deviation = \
+                    np.max(np.abs(cell_voltages - reference) / reference)
+                print('{:>6d} {:>9d} {:>12d} {:>7d} {:>11d} {:>9.2f} {:>8.2f} '
+                      '{:>10.2e}'.format(n_cells, n_clusters, max_refinements,
+                                         n_solved, iterations, solution_time,
+                                         full_time / solution_time,
+                                         deviation))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,37 +1,55 @@
+import importlib
+
 from .src import *
-from .data import gas_properties
-from .data import input_dicts
-from .data import material_properties
-
-from .src import cell
-from .src import channel
-from .src import constants
-from .src import electrical_coupling
-from .src import flow_circuit
-from .src import flow_resistance
-from .src import fluid
-from .src import global_functions
-# from .src.gui import *
-from .src import half_cell
-from .src import interpolation
-from .src import layers
-from .src import matrix_functions
-from .src import membrane
-from .src import output
-from .src import output_object
-from .src import simulation
-from .src import species
-from .src import stack
-from .src import temperature_system
-from . import main_app
-from . import gui_app
-
-from .gui import base
-from .gui import button
-from .gui import frame
-from .gui import widget_set
-from .gui import input
-from .gui import data_transfer
-from .gui import entry_value
+
+# modules accessible as package attributes, which are only imported on first
+# access, so that importing the package (e.g. for the numerical core only)
+# does not load the GUI (tkinter) or the plotting library (matplotlib)
+_lazy_modules = {
+    'gas_properties': '.data.gas_properties',
+    'input_dicts': '.data.input_dicts',
+    'material_properties': '.data.material_properties',
+
+    'cell': '.src.cell',
+    'channel': '.src.channel',
+    'constants': '.src.constants',
+    'electrical_coupling': '.src.electrical_coupling',
+    'flow_circuit': '.src.flow_circuit',
+    'flow_resistance': '.src.flow_resistance',
+    'fluid': '.src.fluid',
+    'global_functions': '.src.global_functions',
+    'half_cell': '.src.half_cell',
+    'interpolation': '.src.interpolation',
+    'layers': '.src.layers',
+    'matrix_functions': '.src.matrix_functions',
+    'membrane': '.src.membrane',
+    'output': '.src.output',
+    'output_object': '.src.output_object',
+    'simulation': '.src.simulation',
+    'species': '.src.species',
+    'stack': '.src.stack',
+    'temperature_system': '.src.temperature_system',
+    'main_app': '.main_app',
+    'gui_app': '.gui_app',
+
+    'base': '.gui.base',
+    'button': '.gui.button',
+    'frame': '.gui.frame',
+    'widget_set': '.gui.widget_set',
+    'input': '.gui.input',
+    'data_transfer': '.gui.data_transfer',
+    'entry_value': '.gui.entry_value',
+}
+
+
+def __getattr__(name):
+    if name in _lazy_modules:
+        module = importlib.import_module(_lazy_modules[name], __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError('module {} has no attribute {}'.format(__name__,
+                                                                 name))
 
 
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_modules))
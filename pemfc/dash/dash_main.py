@@ -1,3 +1,4 @@
+import copy
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
@@ -8,6 +9,7 @@ import plotly.graph_objects as go
 from pemfc.src import interpolation as ip
 from pemfc import main_app
 from pemfc.gui import data_transfer
+from pemfc.data import input_dicts
 from flask_caching import Cache
 
 #external_stylesheets = ["https://codepen.io/chriddyp/pen/bWLwgP.css"]
@@ -62,9 +64,13 @@ app.layout = html.Div([
 def simulation_store(cell_number):
     values = {'cell number': {'sim_name': ['stack', 'cell_number'],
                               'gui_name': 'Cell Number:', 'value': cell_number}}
-    data_transfer.gui_to_sim_transfer(values, data_transfer.sim_dict)
-    # print(data_transfer.sim_dict)
-    global_data, local_data, sim = main_app.main()
+    settings = copy.deepcopy(input_dicts.sim_dict)
+    data_transfer.gui_to_sim_transfer(values, settings)
+    # persistent results across processes and sessions, the flask cache
+    # only holds the results of the current process for a limited time
+    settings['simulation']['result_cache']['active'] = True
+    # print(settings)
+    global_data, local_data, sim = main_app.main(settings)
     return [global_data, local_data]
 
 
@@ -12,6 +12,25 @@ sim_dict = {
         'cool_flow': geom.coolant_circuit,
         'calc_temperature': sim.calc_temperature,
         'calc_current_density': sim.calc_electricity,
+        'clone_cells': sim.clone_cells,
+        'cell_bank': sim.batched_cells,
+        'cell_threads': sim.cell_threads,
+        'concurrent_flow_circuits': sim.concurrent_flow_circuits,
+        'temperature_linear_solver': {
+            'type': sim.temperature_linear_solver,
+            'preconditioner': sim.temperature_preconditioner,
+            'subdomains': sim.temperature_subdomains,
+            'refactor_interval': sim.linear_solver_refactor_interval,
+            'forcing_factor': sim.linear_solver_forcing_factor,
+            'tolerance': sim.linear_solver_tolerance
+            },
+        'electrical_linear_solver': {
+            'type': sim.electrical_linear_solver,
+            'preconditioner': sim.electrical_preconditioner,
+            'refactor_interval': sim.linear_solver_refactor_interval,
+            'forcing_factor': sim.linear_solver_forcing_factor,
+            'tolerance': sim.linear_solver_tolerance
+            },
         # 'calc_flow_distribution': sim.calc_flow_distribution,
         'init_current_density': op_con.current_density,
         'init_voltage': None
@@ -23,7 +42,50 @@ sim_dict = {
         'current_control': op_con.current_control,
         'nodes': nodes,
         'current_density': getattr(op_con, 'current_density', None),
-        'average_cell_voltage': getattr(op_con, 'average_cell_voltage', None)
+        'average_cell_voltage': getattr(op_con, 'average_cell_voltage', None),
+        'parallel_workers': sim.parallel_workers,
+        'parallel_chunk_size': sim.parallel_chunk_size,
+        'continuation': sim.continuation,
+        'continuation_order': sim.continuation_order,
+        'continuation_max_refinements': sim.continuation_max_refinements,
+        'acceleration': {
+            'type': sim.acceleration,
+            'depth': sim.acceleration_depth,
+            'start_iteration': sim.acceleration_start,
+            'mixing_factor': sim.acceleration_mixing_factor
+            },
+        'adaptive_underrelaxation': {
+            'active': sim.adaptive_underrelaxation,
+            'cell_wise': sim.adaptive_underrelaxation_cell_wise,
+            'min': sim.underrelaxation_factor_min,
+            'max': sim.underrelaxation_factor_max
+            },
+        'convergence_monitor': {
+            'active': sim.convergence_monitor,
+            'window': sim.convergence_monitor_window,
+            'action': sim.convergence_monitor_action,
+            'max_retries': sim.convergence_monitor_max_retries
+            },
+        'save_states': sim.save_states,
+        'initial_state_file': sim.initial_state_file,
+        'result_cache': {
+            'active': sim.result_cache,
+            'directory': sim.result_cache_directory,
+            'max_size': sim.result_cache_size
+            },
+        'reduced_order': {
+            'active': sim.reduced_order,
+            'clusters': sim.reduced_order_clusters,
+            'tolerance': sim.reduced_order_tolerance,
+            'max_refinements': sim.reduced_order_max_refinements
+            },
+        'grid_sequencing': {
+            'active': sim.grid_sequencing,
+            'levels': sim.grid_sequencing_levels,
+            'coarsening_factor': sim.grid_sequencing_coarsening_factor,
+            'minimum_elements': sim.grid_sequencing_minimum_elements,
+            'iteration_criteria': sim.grid_sequencing_criteria
+            }
         },
     'cell': {
         'width': geom.cell_width,
@@ -130,6 +192,7 @@ sim_dict = {
             'tolerance': sim.convergence_criteria_flow,
             'min_iter': sim.minimum_iteration_number_flow,
             'max_iter': sim.maximum_iteration_number_flow,
+            'channel_bank': sim.batched_channels,
             'underrelaxation_factor': sim.underrelaxation_factor,
             'inlet_manifold': {
                 'name': 'Cathode Inlet Manifold',
@@ -231,6 +294,7 @@ sim_dict = {
             'tolerance': sim.convergence_criteria_flow,
             'min_iter': sim.minimum_iteration_number_flow,
             'max_iter': sim.maximum_iteration_number_flow,
+            'channel_bank': sim.batched_channels,
             'underrelaxation_factor': sim.underrelaxation_factor,
             'inlet_manifold': {
                 'name': 'Anode Inlet Manifold',
@@ -303,6 +367,7 @@ sim_dict = {
         'tolerance': sim.convergence_criteria_flow,
         'min_iter': sim.minimum_iteration_number_flow,
         'max_iter': sim.maximum_iteration_number_flow,
+        'channel_bank': sim.batched_channels,
         'inlet_manifold': {
             'name': 'Coolant Inlet Manifold',
             'p_out': op_con.p_manifold_cathode_out,
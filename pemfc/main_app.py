@@ -9,10 +9,10 @@ np.set_printoptions(threshold=sys.maxsize, linewidth=10000,
 np.seterr(all='raise')
 
 
-def main():
+def main(settings=None):
     np.seterr(all='raise')
     start_time = timeit.default_timer()
-    sim = simulation.Simulation()
+    sim = simulation.Simulation(settings)
     sim.timing['start'] = start_time
     sim.timing['initialization'] = timeit.default_timer()
     # simulation.timing['start'] = start_time
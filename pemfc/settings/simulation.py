@@ -11,9 +11,27 @@ minimum_iteration_number = 3
 minimum_iteration_number_flow = 2
 maximum_iteration_number = 200
 maximum_iteration_number_flow = 50
+# update the channels of each flow circuit as one batch of 2D arrays
+# (requires channels of identical type and geometry)
+batched_channels = True
+# update the electrochemistry of all cells of the stack as one batch of 2D
+# arrays (requires identical cell parameters, only for current control)
+batched_cells = True
+# create the interior cells of the stack as copies of a template cell, which
+# share the constant data (conductance matrices, species properties) of the
+# template and speed up the setup of large stacks
+clone_cells = True
 # underrelaxation factor for current density updates (0.0 - 1.0)
 # lower: faster convergence, higher: better stability
 underrelaxation_factor = 0.5
+# adapt the underrelaxation factor for current density updates during the
+# iterations: lowered while the residuals decrease and raised on increasing
+# residuals (oscillations) within the given limits
+adaptive_underrelaxation = False
+# adapt the underrelaxation factor individually for each cell
+adaptive_underrelaxation_cell_wise = False
+underrelaxation_factor_min = 0.1
+underrelaxation_factor_max = 0.95
 # minimum number of iterations
 # numerical concentration value for determining critical current density for
 # linearization/regularization of Kulikovsky model at limiting current densities
@@ -37,3 +55,129 @@ calc_gdl_loss = True
 calc_cl_loss = True
 
 
+
+"""Parallelization Settings"""
+# number of worker processes for the calculation of multiple operating points
+# (polarization curve), 1: serial calculation
+parallel_workers = 1
+# number of consecutive operating points calculated by each worker task,
+# consecutive points are initialized with the solution of the previous point
+# (None: operating points are distributed evenly among the workers)
+parallel_chunk_size = None
+# number of threads for the independent updates of the cells within each
+# iteration, the cells are partitioned into contiguous blocks and the results
+# are identical to the serial calculation (1: serial calculation), only used
+# without the batched cell update (batched_cells)
+cell_threads = 1
+# update the cathode, anode and coolant flow circuits concurrently in
+# separate threads (the circuits are independent within one iteration)
+concurrent_flow_circuits = False
+
+"""Linear Solver Settings"""
+# solvers for the linear systems of the layer temperatures and the electrical
+# potentials in each iteration ('spsolve': sparse direct solver, 'splu': LU
+# factorization with reused ordering, 'cg', 'bicgstab', 'gmres':
+# preconditioned iterative solvers started from the previous solution,
+# 'block_tridiagonal': block LU factorization along the stack with an effort
+# growing linearly with the number of cells, 'domain_decomposition':
+# concurrent factorization of subdomains of contiguous cells with exact
+# interface coupling, both only for the temperatures)
+temperature_linear_solver = 'spsolve'
+electrical_linear_solver = 'spsolve'
+# preconditioners of the iterative solvers ('ilu', 'jacobi', 'amg' (requires
+# the package pyamg), None)
+temperature_preconditioner = 'ilu'
+electrical_preconditioner = 'ilu'
+# number of subdomains of the domain decomposition solver (None: number of
+# cell threads)
+temperature_subdomains = None
+# number of systems solved with the same LU factorization or preconditioner,
+# outdated LU factorizations are corrected by iterative refinement
+linear_solver_refactor_interval = 1
+# relative tolerance of the iterative solvers as factor of the residual of
+# the previous outer iteration (convergence criteria)
+linear_solver_forcing_factor = 1e-2
+# minimum and maximum relative tolerance of the iterative solvers (the
+# minimum also applies to the refinement of outdated LU factorizations)
+linear_solver_tolerance = [1e-10, 1e-8]
+
+"""Continuation Settings"""
+# initialize each operating point with the stack state (current density,
+# temperatures, flow distribution) extrapolated from the previously converged
+# operating points instead of a homogeneous current density distribution
+continuation = False
+# order of the predictor (0: scaled previous solution, 1: secant predictor)
+continuation_order = 1
+# maximum number of step bisections, if an operating point fails
+continuation_max_refinements = 4
+
+"""Acceleration Settings"""
+# acceleration scheme for the coupled outer iteration of current density and
+# temperatures (None: plain fixed-point iteration, 'Anderson', 'Aitken')
+acceleration = None
+# number of previous iterations used for Anderson mixing
+acceleration_depth = 5
+# number of plain iterations before the acceleration starts
+acceleration_start = 3
+# mixing factor (Anderson) or initial relaxation factor (Aitken)
+acceleration_mixing_factor = 1.0
+
+"""Convergence Monitor Settings"""
+# detect divergence, oscillation or stagnation of the outer iteration from
+# the trend of the recent residuals
+convergence_monitor = False
+# number of recent iterations used for the trend analysis
+convergence_monitor_window = 10
+# action on detected events ('retry': increase damping of the current density
+# updates, 'abort': skip to the next operating point)
+convergence_monitor_action = 'retry'
+# maximum number of retries before the operating point is aborted
+convergence_monitor_max_retries = 2
+
+"""Restart Settings"""
+# write the complete stack state of each converged operating point to
+# 'state.npz' in the corresponding case directory
+save_states = False
+# stack state file (.npz) used as initial solution instead of the initial
+# temperatures and a uniform current density (None: cold start)
+initial_state_file = None
+
+"""Result Cache Settings"""
+# reuse the results of previous simulations with identical settings from a
+# persistent cache on disk
+result_cache = False
+# cache directory (None: '.pemfc_cache' in the user's home directory)
+result_cache_directory = None
+# maximum size of the cache directory in MB, the least recently used
+# results are removed first
+result_cache_size = 1000.0
+
+"""Reduced-Order Settings"""
+# solve representative cells for clusters of adjacent cells instead of all
+# cells of the stack (end cells are always solved individually), the results
+# of the remaining cells are interpolated (only for current control)
+reduced_order = False
+# initial number of clusters of the interior cells
+reduced_order_clusters = 16
+# maximum relative spread of the interpolated cell voltages within a cluster,
+# clusters exceeding the spread are split and the stack is solved again
+reduced_order_tolerance = 2e-3
+# maximum number of adaptive refinements per operating point (each refinement
+# solves the refined stack again and roughly doubles the solution time)
+reduced_order_max_refinements = 1
+
+"""Grid Sequencing Settings"""
+# solve each operating point first on coarser discretizations of the flow
+# channels and start each finer level from the solution of the previous
+# level interpolated along the channels (coarse-to-fine multilevel solve,
+# not combined with the continuation of operating points)
+grid_sequencing = False
+# number of levels including the target discretization (elements)
+grid_sequencing_levels = 3
+# ratio of the number of elements of consecutive levels
+grid_sequencing_coarsening_factor = 2.0
+# minimum number of elements of the coarsest level (coarser grids do not
+# resolve the temperature and concentration gradients along the channels)
+grid_sequencing_minimum_elements = 5
+# convergence criteria of the coarse levels
+grid_sequencing_criteria = 1e-4
@@ -0,0 +1,176 @@
+# general imports
+import numpy as np
+from abc import ABC, abstractmethod
+
+
+class FixedPointAcceleration(ABC):
+    """
+    Base class for the acceleration of fixed-point iterations x = G(x).
+    The update() method receives the current iterate x and its image G(x)
+    and returns the next iterate.
+    """
+    def __init__(self, accel_dict):
+        self.start_iteration = accel_dict.get('start_iteration', 1)
+        # number of plain fixed-point iterations before acceleration starts
+        self.iteration = 0
+        self.scale = None
+        # scaling vector to obtain relative values of different quantities
+        self.accelerated = False
+        # True if the last update returned an accelerated iterate instead
+        # of the plain fixed-point image G(x)
+
+    def reset(self):
+        """
+        Clears the iteration history, e.g. for a new operating point
+        """
+        self.iteration = 0
+        self.scale = None
+        self.accelerated = False
+
+    def update(self, x, gx):
+        x = np.asarray(x, dtype=float)
+        gx = np.asarray(gx, dtype=float)
+        if self.scale is None:
+            self.scale = np.where(np.abs(x) > 0.0, np.abs(x), 1.0)
+        self.iteration += 1
+        x_scaled = x / self.scale
+        gx_scaled = gx / self.scale
+        x_new = self.calc_iterate(x_scaled, gx_scaled)
+        self.accelerated = self.iteration > self.start_iteration
+        if self.accelerated:
+            return x_new * self.scale
+        else:
+            return gx
+
+    @abstractmethod
+    def calc_iterate(self, x, gx):
+        pass
+
+
+class AndersonAcceleration(FixedPointAcceleration):
+    """
+    Anderson mixing (type II) using the differences of the last m
+    residuals and fixed-point images
+    """
+    def __init__(self, accel_dict):
+        super().__init__(accel_dict)
+        self.depth = accel_dict.get('depth', 5)
+        # number of previous iterates used for mixing
+        self.mixing_factor = accel_dict.get('mixing_factor', 1.0)
+        self.x_old = None
+        self.f_old = None
+        self.delta_x = []
+        self.delta_f = []
+
+    def reset(self):
+        super().reset()
+        self.x_old = None
+        self.f_old = None
+        self.delta_x = []
+        self.delta_f = []
+
+    def calc_iterate(self, x, gx):
+        f = gx - x
+        if self.f_old is not None:
+            self.delta_x.append(x - self.x_old)
+            self.delta_f.append(f - self.f_old)
+            if len(self.delta_f) > self.depth:
+                self.delta_x.pop(0)
+                self.delta_f.pop(0)
+        self.x_old = x
+        self.f_old = f
+        x_new = x + self.mixing_factor * f
+        if self.delta_f:
+            delta_f = np.asarray(self.delta_f).transpose()
+            delta_x = np.asarray(self.delta_x).transpose()
+            gamma = np.linalg.lstsq(delta_f, f, rcond=None)[0]
+            x_new -= np.dot(delta_x + self.mixing_factor * delta_f, gamma)
+        return x_new
+
+
+class AitkenAcceleration(FixedPointAcceleration):
+    """
+    Vector Aitken (Irons-Tuck) dynamic relaxation
+    """
+    def __init__(self, accel_dict):
+        super().__init__(accel_dict)
+        self.omega_init = accel_dict.get('mixing_factor', 1.0)
+        self.omega_min = accel_dict.get('omega_min', 0.05)
+        self.omega_max = accel_dict.get('omega_max', 2.0)
+        self.omega = self.omega_init
+        self.f_old = None
+
+    def reset(self):
+        super().reset()
+        self.omega = self.omega_init
+        self.f_old = None
+
+    def calc_iterate(self, x, gx):
+        f = gx - x
+        if self.f_old is not None:
+            delta_f = f - self.f_old
+            denominator = np.dot(delta_f, delta_f)
+            if denominator > 0.0:
+                self.omega = \
+                    - self.omega * np.dot(self.f_old, delta_f) / denominator
+                self.omega = \
+                    np.clip(self.omega, self.omega_min, self.omega_max)
+        self.f_old = f
+        return x + self.omega * f
+
+
+def factory(accel_dict):
+    """
+    Returns the fixed-point acceleration object according to the
+    'type' entry of the provided dictionary or None for plain iteration
+    """
+    accel_type = accel_dict.get('type', None)
+    if accel_type is None or accel_type.lower() == 'none':
+        return None
+    elif accel_type.lower() == 'anderson':
+        return AndersonAcceleration(accel_dict)
+    elif accel_type.lower() == 'aitken':
+        return AitkenAcceleration(accel_dict)
+    else:
+        raise NotImplementedError('acceleration type must be either None, '
+                                  'Anderson, or Aitken')
+
+
+class AdaptiveUnderRelaxation:
+    """
+    Controller for the underrelaxation factor of the current density
+    update in Cell.update. The factor is lowered (less damping) while the
+    residuals decrease and raised (more damping) when they increase, e.g.
+    due to oscillations. The residuals can be provided either as a single
+    value or individually for each cell.
+    """
+    def __init__(self, urf_dict, urf_init, n_cells=1):
+        self.urf_init = urf_init
+        self.urf_min = urf_dict.get('min', 0.1)
+        self.urf_max = urf_dict.get('max', 0.95)
+        self.decrease_factor = urf_dict.get('decrease_factor', 0.8)
+        # factor applied to the underrelaxation factor for decreasing
+        # residuals
+        self.increase_factor = urf_dict.get('increase_factor', 0.3)
+        # fraction of the remaining range to the maximum underrelaxation
+        # factor added for increasing residuals
+        self.n_cells = n_cells
+        self.urf = np.full(self.n_cells, self.urf_init)
+        self.residual_old = None
+
+    def reset(self):
+        self.urf[:] = self.urf_init
+        self.residual_old = None
+
+    def update(self, residual):
+        residual = \
+            np.broadcast_to(np.asarray(residual, dtype=float), self.urf.shape)
+        if self.residual_old is not None:
+            self.urf[:] = \
+                np.where(residual < self.residual_old,
+                         self.urf * self.decrease_factor,
+                         self.urf + self.increase_factor
+                         * (self.urf_max - self.urf))
+            self.urf[:] = np.clip(self.urf, self.urf_min, self.urf_max)
+        self.residual_old = np.copy(residual)
+        return self.urf
@@ -1,20 +1,90 @@
 # general imports
 import numpy as np
-import copy
 
 # local modul imports
 from . import interpolation as ip, matrix_functions as mtx, half_cell as h_c, \
-    global_functions as g_func, membrane as membrane
+    global_functions as g_func, membrane as membrane, workspace as ws
 from .output_object import OutputObject
 
 
+def relax_current_density(current_density, old_current_density, urf):
+    """
+    Returns the underrelaxed update of the current density
+    """
+    return (1.0 - urf) * current_density + urf * old_current_density
+
+
+def calc_membrane_temperature(temp_layer):
+    """
+    Returns the membrane temperature as average of the temperatures of the
+    adjacent layer interfaces (layers x elements or cells x layers x
+    elements)
+    """
+    return 0.5 * (temp_layer[..., 2, :] + temp_layer[..., 3, :])
+
+
+def calc_cell_voltage_loss(membrane_v_loss, cathode_v_loss, anode_v_loss):
+    """
+    Returns the cell voltage loss as sum of the membrane and electrode
+    voltage losses
+    """
+    return membrane_v_loss + cathode_v_loss + anode_v_loss
+
+
+def calc_cell_conductance(current_density, v_loss, active_area_dx):
+    """
+    Returns the electrical conductance of the elements in z-direction from
+    the voltage loss and the current density of a single cell (elements) or
+    several cells (cells x elements)
+    """
+    current = current_density * active_area_dx
+    resistance_z = v_loss / current
+    return 1.0 / resistance_z
+
+
+class CellArrays:
+    """
+    Struct-of-arrays storage for the state variables of all cells of a stack
+    with a leading cell axis. The arrays of the individual cell, half cell
+    and membrane objects are views into these arrays, so that stack-wide
+    operations can be carried out with single NumPy calls.
+    """
+    def __init__(self, n_cells, n_ele, n_layer=6, n_electrodes=2):
+        self.n_cells = n_cells
+        self.i_cd = np.zeros((n_cells, n_ele))
+        # current density
+        self.v = np.zeros((n_cells, n_ele))
+        # cell voltage
+        self.v_loss = np.zeros((n_cells, n_ele))
+        # cell voltage loss
+        self.conductance_z = np.zeros((n_cells, n_ele))
+        # electrical conductance in z-direction
+        self.active_area_dx = np.zeros((n_cells, n_ele))
+        # active area of the elements
+        self.temp_layer = np.zeros((n_cells, n_layer, n_ele))
+        # layer temperatures, unused layers of cells without end plate
+        # layer remain zero
+        self.half_cell_v_loss = np.zeros((n_cells, n_electrodes, n_ele))
+        # voltage losses of the half cells
+        self.membrane_v_loss = np.zeros((n_cells, n_ele))
+        # membrane voltage loss
+        self.e_0 = np.zeros(n_cells)
+        # open circuit voltage
+
+
 class Cell(OutputObject):
 
     def __init__(self, cell_dict, membrane_dict, half_cell_dicts,
-                 channels, number=None):
+                 channels, number=None, arrays=None, workspace=None):
         name = 'Cell'  # + str(number)
         self.number = number
         super().__init__(name)
+        self.arrays = arrays
+        # stack-wide struct-of-arrays storage (CellArrays) or None
+        if workspace is None:
+            workspace = ws.Workspace()
+        self.workspace = workspace
+        # pool of preallocated temporary arrays (shared within the stack)
         self.cell_dict = cell_dict
         # print('Initializing: ', self.name)
         self.n_layer = 5
@@ -33,24 +103,25 @@ class Cell(OutputObject):
         self.urf = cell_dict['underrelaxation_factor']
 
         self.e_0 = cell_dict['open_circuit_voltage']
+        if self.arrays is not None:
+            self.arrays.e_0[self.number] = self.e_0
         self.e_tn = cell_dict['thermoneutral_voltage']
 
         self.width = self.cell_dict['width']
         self.length = self.cell_dict['length']
         self.active_area = self.width * self.length
 
-        half_cell_dicts = copy.deepcopy(half_cell_dicts)
         # Create half cell objects
-        for i in range(len(half_cell_dicts)):
-            # name = self.name + ': ' + half_cell_dicts[i]['name']
-            name = half_cell_dicts[i]['name']
-            half_cell_dicts[i]['name'] = name
-
         self.half_cells = [h_c.HalfCell(half_cell_dicts[i], cell_dict,
-                                        channels[i], number=self.number)
+                                        channels[i], number=self.number,
+                                        workspace=self.workspace)
                            for i in range(len(channels))]
         self.cathode = self.half_cells[0]
         self.anode = self.half_cells[1]
+        if self.arrays is not None:
+            for i, half_cell in enumerate(self.half_cells):
+                half_cell.v_loss = \
+                    self.init_array('half_cell_v_loss', half_cell.v_loss, i)
 
         # Append half cell names to output data
         for half_cell in self.half_cells:
@@ -66,6 +137,8 @@ class Cell(OutputObject):
             self.cathode.flow_field.length_straight_channels
 
         self.membrane = membrane.Membrane(membrane_dict, self.dx)
+        self.membrane.v_loss = \
+            self.init_array('membrane_v_loss', self.membrane.v_loss)
 
         self.thickness = self.cathode.thickness + self.membrane.thickness \
             + self.anode.thickness
@@ -79,7 +152,9 @@ class Cell(OutputObject):
         """heat conductivity along and through the cell layers"""
         self.width_straight_channels = \
             self.cathode.flow_field.width_straight_channels
-        self.active_area_dx = self.width_straight_channels * self.dx
+        self.active_area_dx = \
+            self.init_array('active_area_dx',
+                            self.width_straight_channels * self.dx)
 
         # heat conductivity along the gas diffusion electrode and membrane
         self.th_layer = \
@@ -118,18 +193,24 @@ class Cell(OutputObject):
             heat_cond_mtx = \
                 mtx.build_cell_conductance_matrix(self.thermal_conductance_x,
                                                   self.thermal_conductance_z,
-                                                  self.n_ele)
+                                                  self.n_ele,
+                                                  sparse_format='csr')
         else:
             heat_cond_mtx = \
                 mtx.build_cell_conductance_matrix(self.thermal_conductance_x[:-1],
                                                   self.thermal_conductance_z[:-1],
-                                                  self.n_ele)
+                                                  self.n_ele,
+                                                  sparse_format='csr')
+        heat_cond_mtx.data.flags.writeable = False
         self.heat_mtx_const = heat_cond_mtx
+        # constant sparse conductance matrix, not modified after construction
+        # and shared between cloned cells
         # self.heat_mtx_const = np.zeros(self.heat_cond_mtx.shape)
-        self.heat_mtx_dyn = np.zeros(self.heat_mtx_const.shape)
-        self.heat_mtx = np.zeros(self.heat_mtx_dyn.shape)
 
         self.heat_rhs_const = np.zeros(self.n_layer * self.n_ele)
+        self.heat_diag_const = np.zeros(self.heat_rhs_const.shape)
+        # constant implicit sources on the diagonal of the conductance matrix,
+        # e.g. heat transfer to the ambient
         self.heat_rhs_dyn = np.zeros(self.heat_rhs_const.shape)
         self.heat_rhs = np.zeros(self.heat_rhs_dyn.shape)
 
@@ -161,7 +242,9 @@ class Cell(OutputObject):
         self.elec_cond = self.elec_cond[:, :-1]
         self.elec_x_mat_const = \
             mtx.build_z_cell_conductance_matrix(self.elec_cond.transpose(),
-                                                len(self.elec_cond))
+                                                len(self.elec_cond),
+                                                sparse_format='csr')
+        self.elec_x_mat_const.data.flags.writeable = False
         # print(self.elec_x_mat_const)
 
         """boolean alarms"""
@@ -177,10 +260,12 @@ class Cell(OutputObject):
             + self.anode.bpp.thickness \
             + self.anode.gde.thickness
 
-        self.v_loss = np.zeros(self.n_ele)
+        self.v_loss = self.init_array('v_loss', np.zeros(self.n_ele))
         # voltage loss
         self.temp_layer = \
-            g_func.full((self.n_layer, self.n_ele), cell_dict['temp_init'])
+            self.init_array('temp_layer',
+                            g_func.full((self.n_layer, self.n_ele),
+                                        cell_dict['temp_init']))
         # layer temperature
         # coolant inlet temperature
         self.temp_names = ['Cathode BPP-BPP',
@@ -192,12 +277,13 @@ class Cell(OutputObject):
         # interface names according to temperature array
         self.temp_mem = np.zeros(self.n_ele)
         # membrane temperature
-        self.i_cd = np.zeros(self.n_ele)
+        self.i_cd = self.init_array('i_cd', np.zeros(self.n_ele))
         # current density
-        self.v = np.zeros(self.n_ele)
+        self.v = self.init_array('v', np.zeros(self.n_ele))
         # cell voltage
         # self.resistance_z = np.zeros(n_ele)
-        self.conductance_z = np.zeros(self.n_ele)
+        self.conductance_z = \
+            self.init_array('conductance_z', np.zeros(self.n_ele))
         # cell resistance
 
         self.add_print_data(self.i_cd, 'Current Density', 'A/m²')
@@ -205,6 +291,84 @@ class Cell(OutputObject):
                             self.temp_names[:self.n_layer])
         self.add_print_data(self.v, 'Cell Voltage', 'V')
 
+    def init_array(self, name, value, *index, number=None):
+        """
+        Returns the provided array or, if the cell is part of a stack-wide
+        struct-of-arrays storage, the view into the corresponding stack array
+        initialized with the provided values
+        """
+        if self.arrays is None:
+            return value
+        if number is None:
+            number = self.number
+        array = getattr(self.arrays, name)[(number,) + index]
+        array = array[tuple(slice(0, n) for n in np.shape(value))]
+        array[:] = value
+        return array
+
+    def array_views(self):
+        """
+        Returns the (object, attribute name, CellArrays name, index) tuples
+        of the arrays stored as views into the stack-wide storage
+        """
+        views = [(self, name, name, ()) for name in
+                 ('i_cd', 'v', 'v_loss', 'conductance_z', 'active_area_dx',
+                  'temp_layer')]
+        views += [(half_cell, 'v_loss', 'half_cell_v_loss', (i,))
+                  for i, half_cell in enumerate(self.half_cells)]
+        views.append((self.membrane, 'v_loss', 'membrane_v_loss', ()))
+        return views
+
+    def clone(self, number, channels):
+        """
+        Returns a copy of this cell with the given number connected to the
+        provided channels, which must be set up identically to the channels
+        of this cell. Immutable data (constant conductance matrices, species
+        properties, settings) is shared with this cell instead of being
+        rebuilt, the state arrays are copied into the stack-wide storage.
+        """
+        memo = {id(self.arrays): self.arrays,
+                id(self.workspace): self.workspace,
+                id(self.cell_dict): self.cell_dict,
+                id(self.heat_mtx_const): self.heat_mtx_const,
+                id(self.elec_x_mat_const): self.elec_x_mat_const,
+                id(self.index_array): self.index_array}
+        # Apply the setup of the half cells to the new channels
+        for half_cell, channel in zip(self.half_cells, channels):
+            template = half_cell.channel
+            channel.name = template.name
+            channel.fluid.name = template.fluid.name
+            if channel.length != template.length:
+                channel.length = template.length
+            channel.extend_data_names(channel.name)
+            channel.fluid.extend_data_names(channel.fluid.name)
+            memo[id(template)] = channel
+        memo[id(self.dx)] = channels[0].dx
+
+        # Redirect the views into the stack-wide storage and the
+        # corresponding output data to the position of the new cell
+        if self.arrays is not None:
+            views = []
+            for obj, attr, name, index in self.array_views():
+                old_array = getattr(obj, attr)
+                new_array = \
+                    self.init_array(name, old_array, *index, number=number)
+                memo[id(old_array)] = new_array
+                views.append((old_array, new_array))
+            for entry in self.print_data_2d.values():
+                for i, sub_entry in enumerate(entry.values()):
+                    for old_array, new_array in views:
+                        if np.shares_memory(sub_entry['value'], old_array):
+                            memo[id(sub_entry['value'])] = new_array[i]
+
+        cell = self.copy(memo)
+        cell.number = number
+        for half_cell in cell.half_cells:
+            half_cell.number = number
+        if self.arrays is not None:
+            self.arrays.e_0[number] = cell.e_0
+        return cell
+
     def calc_ambient_conductance(self, alpha_amb):
         """
         :param alpha_amb: heat transfer coefficient for free or forced
@@ -235,7 +399,9 @@ class Cell(OutputObject):
             else:
                 source_vector = np.asarray(-source_term)
         else:
-            source_vector = np.zeros(rhs_vector.shape)
+            source_vector = self.workspace.zeros(
+                (id(self), 'explicit layer source', layer_id),
+                rhs_vector.shape)
             np.put(source_vector, self.index_array[layer_id], -source_term)
         rhs_vector += source_vector
         return rhs_vector, source_vector
@@ -248,9 +414,11 @@ class Cell(OutputObject):
             else:
                 source_vector = np.asarray(coefficient)
         else:
-            source_vector = np.zeros(matrix_size)
+            source_vector = self.workspace.zeros(
+                (id(self), 'implicit layer source', layer_id), matrix_size)
             np.put(source_vector, self.index_array[layer_id], coefficient)
-        matrix += np.diag(source_vector)
+        # add the source to the diagonal of the matrix in place
+        np.einsum('ii->i', matrix)[:] += source_vector
         return matrix, source_vector
 
     def update(self, current_density, channel_update=False,
@@ -260,12 +428,13 @@ class Cell(OutputObject):
         """
         if urf is None:
             urf = self.urf
-        current_density = (1.0 - urf) * current_density + urf * self.i_cd
+        current_density = \
+            relax_current_density(current_density, self.i_cd, urf)
         # if g_par.iteration > 50:
         #     self.urf *= 0.99
         # self.urf = max(self.urf, 0.8)
         # self.temp_mem[:] = .5 * (self.temp_layer[2] + self.temp_layer[3])
-        self.membrane.temp = 0.5 * (self.temp_layer[2] + self.temp_layer[3])
+        self.membrane.temp[:] = calc_membrane_temperature(self.temp_layer)
         if isinstance(self.membrane, membrane.WaterTransportMembrane):
             self.cathode.w_cross_flow[:] = self.membrane.w_cross_flow
             self.anode.w_cross_flow[:] = self.membrane.w_cross_flow
@@ -303,7 +472,8 @@ class Cell(OutputObject):
         than the open circuit cell voltage, the cell voltage is set to zero.
         """
         self.v_loss[:] = \
-            self.membrane.v_loss + self.cathode.v_loss + self.anode.v_loss
+            calc_cell_voltage_loss(self.membrane.v_loss, self.cathode.v_loss,
+                                   self.anode.v_loss)
         self.v_alarm = self.v_loss >= self.e_0
         # self.v_loss[:] = np.minimum(self.v_loss, self.e_0)
 
@@ -370,6 +540,198 @@ class Cell(OutputObject):
         Calculates the area-specific electrical resistance of the element in
         z-direction
         """
-        current = current_density * self.active_area_dx
-        resistance_z = self.v_loss / current
-        self.conductance_z[:] = 1.0 / resistance_z
+        self.conductance_z[:] = \
+            calc_cell_conductance(current_density, self.v_loss,
+                                  self.active_area_dx)
+
+
+class CellBank:
+    """
+    Batched update of the electrochemistry of all cells of a stack. The
+    electrode, plate and membrane voltage losses, the reactant sources of
+    the channels and the electrical conductance of all cells are calculated
+    at once on the stack-wide arrays (CellArrays) with a leading cell axis
+    by the same functions used by the individual cells and half cells.
+    The membranes of the cells are replaced by row views into a membrane
+    object spanning all cells. Requires cells with identical half cell and
+    membrane parameters and is only used for current control.
+    """
+    half_cell_parameters = \
+        ('n_charge', 'faraday', 'tafel_slope', 'i_sigma', 'i_star',
+         'prot_con_cl', 'diff_coeff_cl', 'diff_coeff_gdl', 'th_gdl',
+         'conc_eps', 'delta_i', 'calc_act_loss', 'calc_cl_diff_loss',
+         'calc_gdl_diff_loss', 'id_fuel', 'id_h2o', 'n_stoi')
+    # half cell parameters, which must be identical for all cells
+    membrane_parameters = \
+        ('thickness', 'calc_loss', 'ionic_conductivity', 'vapour_coeff',
+         'acid_group_conc', 'basic_resistance', 'temp_coeff')
+    # membrane parameters, which must be identical for all cells (if
+    # defined for the membrane model)
+    membrane_arrays = ('temp', 'omega', 'omega_ca', 'w_cross_flow')
+
+    def __init__(self, cells, arrays):
+        if not self.is_compatible(cells):
+            raise ValueError('cells of CellBank must have identical half cell '
+                             'and membrane parameters')
+        self.cells = list(cells)
+        self.cell = self.cells[0]
+        # reference cell for the electrochemical parameters
+        self.arrays = arrays
+        self.n_cells = len(self.cells)
+        self.urf = np.asarray([[cell.urf] for cell in self.cells])
+        # underrelaxation factors from the settings of the cells
+
+        # membrane spanning all cells, the membranes of the cells are row
+        # views into its arrays
+        dx = np.stack([cell.dx for cell in self.cells])
+        self.membrane = membrane.Membrane(self.cell.membrane.layer_dict, dx)
+        for name in self.membrane_arrays:
+            if not hasattr(self.membrane, name):
+                continue
+            array = getattr(self.membrane, name)
+            for i, cell in enumerate(self.cells):
+                array[i] = getattr(cell.membrane, name)
+                setattr(cell.membrane, name, array[i])
+        self.membrane.v_loss = arrays.membrane_v_loss
+        self.water_transport = \
+            isinstance(self.membrane, membrane.WaterTransportMembrane)
+        if self.water_transport:
+            # cross water flux of the half cells taken from the membranes
+            for cell in self.cells:
+                for half_cell in cell.half_cells:
+                    half_cell.w_cross_flow = cell.membrane.w_cross_flow
+
+        self.half_cells = \
+            [[cell.half_cells[i] for cell in self.cells]
+             for i in range(len(self.cell.half_cells))]
+        # half cells of all cells for each electrode
+        self.active_area_dx = \
+            [np.stack([half_cell.flow_field.active_area_dx
+                       for half_cell in half_cells])
+             for half_cells in self.half_cells]
+        self.bpp_conductance = \
+            [np.stack([half_cell.bpp.electrical_conductance[0]
+                       for half_cell in half_cells])
+             for half_cells in self.half_cells]
+        self.flow_direction = \
+            [np.asarray([[half_cell.channel.flow_direction]
+                         for half_cell in half_cells])
+             for half_cells in self.half_cells]
+        self.id_in = \
+            [np.asarray([half_cell.channel.id_in for half_cell in half_cells])
+             for half_cells in self.half_cells]
+        self.v_alarm = np.zeros(arrays.v_loss.shape, dtype=bool)
+        for i, cell in enumerate(self.cells):
+            cell.v_alarm = self.v_alarm[i]
+
+    @classmethod
+    def is_compatible(cls, cells):
+        """
+        Checks, if the provided cells can be combined to a CellBank
+        """
+        cell = cells[0]
+        for other in cells:
+            if other.n_ele != cell.n_ele \
+                    or type(other.membrane) is not type(cell.membrane) \
+                    or len(other.half_cells) != len(cell.half_cells):
+                return False
+            for name in cls.membrane_parameters:
+                if not np.array_equal(getattr(other.membrane, name, None),
+                                      getattr(cell.membrane, name, None)):
+                    return False
+            for half_cell, other_half_cell \
+                    in zip(cell.half_cells, other.half_cells):
+                for name in cls.half_cell_parameters:
+                    if not np.array_equal(getattr(other_half_cell, name),
+                                          getattr(half_cell, name)):
+                        return False
+                if not np.array_equal(
+                        other_half_cell.channel.fluid.species.mw,
+                        half_cell.channel.fluid.species.mw):
+                    return False
+        return True
+
+    def update(self, current_density, urf=None):
+        """
+        Updates all cells with the provided current density (cells x
+        elements) and the optional cell-wise underrelaxation factors
+        """
+        arrays = self.arrays
+        if urf is None:
+            urf = self.urf
+        else:
+            urf = np.asarray(urf)[:, None]
+        current_density = \
+            relax_current_density(current_density, arrays.i_cd, urf)
+        self.membrane.temp[:] = calc_membrane_temperature(arrays.temp_layer)
+        for i in range(len(self.half_cells)):
+            self.update_half_cells(i, current_density)
+        self.check_stoichiometry()
+        humidity = \
+            np.asarray([[half_cell.channel.fluid.humidity
+                         for half_cell in half_cells]
+                        for half_cells in self.half_cells])
+        humidity_ele = ip.interpolate_along_axis(humidity, axis=-1)
+        self.membrane.update(current_density, humidity_ele)
+        arrays.v_loss[:] = \
+            calc_cell_voltage_loss(arrays.membrane_v_loss,
+                                   arrays.half_cell_v_loss[:, 0],
+                                   arrays.half_cell_v_loss[:, 1])
+        np.greater_equal(arrays.v_loss, arrays.e_0[:, None], out=self.v_alarm)
+        arrays.conductance_z[:] = \
+            calc_cell_conductance(current_density, arrays.v_loss,
+                                  arrays.active_area_dx)
+        arrays.i_cd[:] = current_density
+
+    def update_half_cells(self, index, current_density):
+        """
+        Calculates the reactant sources of the channels and the voltage
+        losses of the half cells of one electrode of all cells
+        """
+        half_cell = self.cell.half_cells[index]
+        half_cells = self.half_cells[index]
+        active_area_dx = self.active_area_dx[index]
+        mass_source, mole_source = \
+            half_cell.calc_mass_source(current_density, active_area_dx,
+                                       self.membrane_cross_flow(),
+                                       self.flow_direction[index])
+        for i, other in enumerate(half_cells):
+            other.channel.mass_source[:] = mass_source[i]
+            other.channel.mole_source[:] = mole_source[i]
+
+        conc = np.asarray(
+            [other.channel.fluid.gas.concentration[half_cell.id_fuel]
+             for other in half_cells])
+        self.arrays.half_cell_v_loss[:, index] = \
+            half_cell.calc_electrode_loss(current_density, conc,
+                                          self.id_in[index]) \
+            + half_cell.calc_plate_loss(current_density, active_area_dx,
+                                        self.bpp_conductance[index])
+        mole_flow_in = np.asarray(
+            [other.channel.mole_flow[half_cell.id_fuel, other.channel.id_in]
+             for other in half_cells])
+        inlet_stoi = \
+            half_cell.calc_inlet_stoichiometry(current_density, mole_flow_in,
+                                               active_area_dx)
+        for i, other in enumerate(half_cells):
+            other.updated_v_loss = True
+            other.inlet_stoi = inlet_stoi[i]
+
+    def membrane_cross_flow(self):
+        if self.water_transport:
+            return self.membrane.w_cross_flow
+        else:
+            return 0.0
+
+    def check_stoichiometry(self):
+        """
+        Raises a ValueError for the first cell with an inlet stoichiometry
+        smaller than one
+        """
+        for cell in self.cells:
+            for half_cell in cell.half_cells:
+                if half_cell.inlet_stoi < 1.0:
+                    raise ValueError('stoichiometry of cell {0} '
+                                     'becomes smaller than one: {1:0.3f}'
+                                     .format(half_cell.number,
+                                             half_cell.inlet_stoi))
@@ -14,7 +14,121 @@ except ModuleNotFoundError:
     CHT_FOUND = False
 
 
+def calc_flow_velocity(mass_flow, density, viscosity, cross_area, d_h):
+    """
+    Returns the volume flow, the velocity and the reynolds number for the
+    node-based mass flow of a single channel (nodes) or several channels
+    (channels x nodes with cross_area and d_h of shape (channels, 1))
+    """
+    vol_flow = mass_flow / density
+    velocity = np.maximum(vol_flow / cross_area, 0.0)
+    reynolds = velocity * d_h * density / viscosity
+    return vol_flow, velocity, reynolds
+
+
+def calc_nusselt(reynolds, prandtl, d_by_l):
+    """
+    Returns the nusselt number for the reynolds and prandtl numbers and the
+    ratio of hydraulic diameter to channel length (broadcastable to the
+    reynolds array), the turbulent correlation is only evaluated for
+    reynolds numbers from 2300 on
+    (Correlations should be reviewed)
+    """
+    sqrt_re_pr_dbyl = np.sqrt(reynolds * prandtl * d_by_l)
+    nu_1 = 3.66
+    nu_2 = 1.66 * sqrt_re_pr_dbyl
+    nu_3 = (2. / (1. + 22. * prandtl)) ** 0.166667 * sqrt_re_pr_dbyl
+    nusselt = (nu_1 ** 3. + 0.7 ** 3. + (nu_2 - 0.7) ** 3.
+               + nu_3 ** 3.) ** 0.333333
+
+    turb = reynolds >= 2300.0
+    if np.any(turb):
+        reynolds = reynolds[turb]
+        prandtl = prandtl[turb]
+        d_by_l = np.broadcast_to(d_by_l, turb.shape)[turb]
+        nu_lam = nusselt[turb]
+        zeta = (1.8 * np.log(reynolds) - 1.5) ** -2.
+        nu_turb = zeta / 8. * reynolds * prandtl \
+            / (1. + 12.7 * np.sqrt(zeta / 8.)
+               * (prandtl ** 0.666667) - 1.) * (1. + d_by_l ** 0.666667)
+        nusselt[turb] = \
+            np.where(reynolds < 1e4,
+                     (1. - (reynolds - 2300.) / 7700.) * nu_lam
+                     + (reynolds - 2300.) / 7700. * nu_turb, nu_turb)
+    return nusselt
+
+
+def calc_heat_transfer_coeff(reynolds, viscosity, specific_heat,
+                             thermal_conductivity, d_h, length, surface_area):
+    """
+    Returns the element-wise heat transfer coefficients (multiplied by the
+    convection area of the channel wall) for node-based fluid arrays of a
+    single channel or several channels, assuming element-wise constant wall
+    temperature
+    """
+    prandtl = viscosity * specific_heat / thermal_conductivity
+    nusselt = calc_nusselt(reynolds, prandtl, d_h / length)
+    ht_coeff = nusselt * thermal_conductivity / d_h
+    # convection coefficient between the coolant and the channel wall
+    return ip.interpolate_along_axis(ht_coeff, axis=-1) * surface_area
+
+
+def calc_dynamic_pressure_drop(density, velocity, flow_direction):
+    """
+    Returns the element-wise influence of the dynamic pressure variation due
+    to velocity changes on the static pressure drop (flow_direction: scalar
+    or array of shape (channels, 1))
+    """
+    rho_v_sqr = density * velocity ** 2.0
+    return 0.5 * (rho_v_sqr[..., 1:] - rho_v_sqr[..., :-1]) * flow_direction
+
+
+def calc_species_flows(mass_flow, mw):
+    """
+    Returns the total mass flow, the species mole flows and the total mole
+    flow for the node-based species mass flows of a single channel
+    (species x nodes) or several channels (channels x species x nodes)
+    """
+    mass_flow_total = np.sum(mass_flow, axis=-2)
+    mole_flow = mass_flow / mw[:, None]
+    mole_flow_total = np.sum(mole_flow, axis=-2)
+    return mass_flow_total, mole_flow, mole_flow_total
+
+
+def calc_two_phase_flow(mole_flow, mole_flow_total, mass_flow_total,
+                        liquid_mole_fraction, liquid_mass_fraction,
+                        gas_mole_fraction, gas_mass_fraction):
+    """
+    Returns the total gas phase mole and mass flows, the gas phase species
+    mole and mass flows and the condensed species mole flows of a single
+    channel or several channels (leading channel axis)
+    """
+    mole_flow_gas_total = \
+        mole_flow_total - mole_flow_total * liquid_mole_fraction
+    mass_flow_gas_total = \
+        mass_flow_total - mass_flow_total * liquid_mass_fraction
+    mole_flow_gas = mole_flow_gas_total[..., None, :] * gas_mole_fraction
+    mass_flow_gas = mass_flow_gas_total[..., None, :] * gas_mass_fraction
+    mole_flow_liq = mole_flow - mole_flow_gas
+    return mole_flow_gas_total, mass_flow_gas_total, mole_flow_gas, \
+        mass_flow_gas, mole_flow_liq
+
+
+def calc_condensation_rate(mole_flow_liq, flow_direction):
+    """
+    Returns the element-wise molar condensation rate for the node-based
+    condensed mole flow of the phase change species (flow_direction: scalar
+    or array of shape (channels, 1))
+    """
+    return flow_direction * np.diff(mole_flow_liq, axis=-1)
+
+
 class Channel(ABC, oo.OutputObject):
+    array_names = ('pressure', 'temperature', 'temp_ele', 'velocity',
+                   'reynolds', 'mass_flow_total', 'vol_flow', 'g_fluid',
+                   'k_coeff', 'heat', 'wall_temp', 'mass_source')
+    # names of the node- and element-based state arrays
+
     def __new__(cls, channel_dict, fluid, number=None):
 
         if type(fluid) is fluids.IncompressibleFluid \
@@ -39,6 +153,10 @@ class Channel(ABC, oo.OutputObject):
         self._length = channel_dict.get('length', 0.1)
         self.n_nodes = len(self.fluid.density)
         self.n_ele = self.n_nodes - 1
+        self.relative_coordinates = \
+            channel_dict.get('relative_coordinates', None)
+        # node coordinates relative to the channel length for a non-uniform
+        # discretization (None: equidistant nodes)
 
         # element length
         self.p_out = channel_dict['p_out']
@@ -49,7 +167,6 @@ class Channel(ABC, oo.OutputObject):
         self.temp_ele = g_func.full(self.n_ele, self.temp_in)
 
         # inlet temperature
-        self.tri_mtx = None
         self.id_in = None
         self.id_out = None
         self.flow_direction = channel_dict['flow_direction']
@@ -109,7 +226,7 @@ class Channel(ABC, oo.OutputObject):
             zeta_dict = \
                 {'type': 'Junction', 'value': zeta_const, 'factor': zeta_split}
             self.zetas.append(fr.FlowResistance(self, zeta_dict))
-        elif zeta_const > 0.0:
+        elif np.any(np.asarray(zeta_const) > 0.0):
             self.zetas.append(fr.FlowResistance(self, {'type': 'Constant',
                                                        'value': zeta_const}))
 
@@ -130,7 +247,10 @@ class Channel(ABC, oo.OutputObject):
         # self.add_print_data(self.p, 'Fluid Pressure', 'Pa')
 
     def calculate_geometry(self):
-        self.x = np.linspace(0.0, self._length, self.n_nodes)
+        if self.relative_coordinates is None:
+            self.x = np.linspace(0.0, self._length, self.n_nodes)
+        else:
+            self.x = np.asarray(self.relative_coordinates) * self._length
         self.dx = np.diff(self.x)
         self.dx_node = np.zeros(self.n_nodes)
         self.dx_node[1:-1] = np.diff(ip.interpolate_1d(self.x))
@@ -248,10 +368,10 @@ class Channel(ABC, oo.OutputObject):
         """
         Calculates the gas phase velocity.
         """
-        self.vol_flow[:] = self.mass_flow_total / self.fluid.density
-        self.velocity[:] = np.maximum(self.vol_flow / self.cross_area, 0.0)
-        self.reynolds[:] = self.velocity * self.d_h * self.fluid.density \
-            / self.fluid.viscosity
+        self.vol_flow[:], self.velocity[:], self.reynolds[:] = \
+            calc_flow_velocity(self.mass_flow_total, self.fluid.density,
+                               self.fluid.viscosity, self.cross_area,
+                               self.d_h)
 
     @property
     def flow_direction(self):
@@ -269,12 +389,6 @@ class Channel(ABC, oo.OutputObject):
         else:
             self.id_in = -1
             self.id_out = 0
-        ones = np.zeros((self.n_ele, self.n_ele))
-        ones[:] = 1.0
-        if self._flow_direction == 1:
-            self.tri_mtx = np.tril(ones)
-        else:
-            self.tri_mtx = np.triu(ones)
 
     @abstractmethod
     def calc_mass_balance(self, *args, **kwargs):
@@ -284,39 +398,13 @@ class Channel(ABC, oo.OutputObject):
         """
         Calculates heat transfer coefficient of channel assuming element-wise
         constant wall temperature
-        (Correlations should be reviewed)
-        """
-        prandtl = self.fluid.viscosity * self.fluid.specific_heat / \
-            self.fluid.thermal_conductivity
-        d_by_l = self.d_h / self._length
-        sqrt_re_pr_dbyl = np.sqrt(self.reynolds * prandtl * d_by_l)
-        nu_1 = 3.66
-        nu_2 = 1.66 * sqrt_re_pr_dbyl
-        nu_3 = (2. / (1. + 22. * prandtl)) ** 0.166667 * sqrt_re_pr_dbyl
-        nu_lam = (nu_1 ** 3. + 0.7 ** 3. + (nu_2 - 0.7) ** 3.
-                  + nu_3 ** 3.) ** 0.333333
-
-        if np.any(self.reynolds >= 2300.0):
-            zeta = \
-                (1.8 * np.log(self.reynolds,
-                              where=self.reynolds != 0) - 1.5) ** -2.
-            nu_turb = zeta / 8. * self.reynolds * prandtl \
-                / (1. + 12.7 * np.sqrt(zeta / 8.)
-                   * (prandtl ** 0.666667) - 1.) * (1. + d_by_l ** 0.666667)
-            nusselt = \
-                np.where(self.reynolds < 2300.0, nu_lam,
-                         np.where(self.reynolds < 1e4,
-                                  (1. - (self.reynolds - 2300.) / 7700.)
-                                  * nu_lam
-                                  + (self.reynolds - 2300.) / 7700. * nu_turb,
-                                  nu_turb))
-        else:
-            nusselt = nu_lam
-
-        ht_coeff = nusselt * self.fluid.thermal_conductivity / self.d_h
-        # convection coefficient between the coolant and the channel wall
-        # convection area of the channel wall
-        self.k_coeff[:] = ip.interpolate_1d(ht_coeff) * self.surface_area
+        """
+        self.k_coeff[:] = \
+            calc_heat_transfer_coeff(self.reynolds, self.fluid.viscosity,
+                                     self.fluid.specific_heat,
+                                     self.fluid.thermal_conductivity,
+                                     self.d_h, self._length,
+                                     self.surface_area)
 
     def calc_heat_capacitance(self, factor=1.0):
         self.g_fluid[:] = \
@@ -338,12 +426,8 @@ class Channel(ABC, oo.OutputObject):
 
         # calculate influence of dynamic pressure variation due to velocity
         # changes on static pressure drop
-        rho1 = self.fluid.density[:-1]
-        rho2 = self.fluid.density[1:]
-        v1 = self.velocity[:-1]
-        v2 = self.velocity[1:]
-        dp_dyn = 0.5 * (rho2 * v2 ** 2.0 - rho1 * v1 ** 2.0) \
-            * self.flow_direction
+        dp_dyn = calc_dynamic_pressure_drop(self.fluid.density, self.velocity,
+                                            self.flow_direction)
         return dp_res + dp_dyn
 
     def calc_pressure(self):
@@ -406,8 +490,7 @@ class Channel(ABC, oo.OutputObject):
             heat = heat_flux * self.surface_area
             dtemp = heat / g_fluid
             self.temperature[:] = self.temperature[self.id_in]
-            g_func.add_source(self.temperature, dtemp,
-                              self.flow_direction, self.tri_mtx)
+            g_func.add_source(self.temperature, dtemp, self.flow_direction)
             self.heat[:] = heat
             self.temp_ele[:] = ip.interpolate_1d(self.temperature)
             wall_temp = self.temp_ele + heat / self.k_coeff
@@ -477,11 +560,14 @@ class IncompressibleFluidChannel(Channel):
         if mass_source is not None:
             self.mass_source[:] = mass_source
         g_func.add_source(self.mass_flow_total, self.mass_source,
-                          self.flow_direction, self.tri_mtx)
+                          self.flow_direction)
         self.mass_flow_total.clip(min=0, out=self.mass_flow_total)
 
 
 class GasMixtureChannel(Channel):
+    array_names = Channel.array_names \
+        + ('mole_flow_total', 'mole_flow', 'mass_flow', 'mole_source')
+
     def __init__(self, channel_dict, fluid, number=None):
         super().__init__(channel_dict, fluid, number)
         self.mole_flow_total = np.zeros(self.n_nodes)
@@ -572,20 +658,19 @@ class GasMixtureChannel(Channel):
             else:
                 raise ValueError('shape of mass_source does not conform '
                                  'to mole_source array')
-        for i in range(self.fluid.n_species):
-            g_func.add_source(self.mass_flow[i], self.mass_source[i],
-                              self.flow_direction, self.tri_mtx)
-
+        g_func.add_source(self.mass_flow, self.mass_source,
+                          self.flow_direction)
         self.mass_flow.clip(min=0, out=self.mass_flow)
-        self.mass_flow_total[:] = np.sum(self.mass_flow, axis=0)
-        # self.mass_flow[:] = \
-        #     (self.mole_flow.transpose() * self.fluid.species.mw).transpose()
-        self.mole_flow[:] = \
-            (self.mass_flow.transpose() / self.fluid.species.mw).transpose()
-        self.mole_flow_total[:] = np.sum(self.mole_flow, axis=0)
+        self.mass_flow_total[:], self.mole_flow[:], self.mole_flow_total[:] = \
+            calc_species_flows(self.mass_flow, self.fluid.species.mw)
 
 
 class TwoPhaseMixtureChannel(GasMixtureChannel):
+    array_names = GasMixtureChannel.array_names \
+        + ('mole_flow_gas_total', 'mass_flow_gas_total', 'vol_flow_gas',
+           'mole_flow_liq', 'mole_flow_gas', 'mass_flow_gas', 'mass_flow_liq',
+           'cond_rate_ele', 'condensation_heat')
+
     def __init__(self, channel_dict, fluid, number=None):
         super().__init__(channel_dict, fluid, number)
         self.mole_flow_gas_total = np.zeros(self.n_nodes)
@@ -627,29 +712,25 @@ class TwoPhaseMixtureChannel(GasMixtureChannel):
         """
         Calculates the gas phase velocity.
         """
-        self.vol_flow_gas[:] = self.mass_flow_gas_total / self.fluid.density
+        self.vol_flow_gas[:], self.velocity[:], self.reynolds[:] = \
+            calc_flow_velocity(self.mass_flow_gas_total, self.fluid.density,
+                               self.fluid.viscosity, self.cross_area,
+                               self.d_h)
         self.vol_flow[:] = self.vol_flow_gas
-        self.velocity[:] = np.maximum(self.vol_flow_gas / self.cross_area, 0.0)
-        self.reynolds[:] = self.velocity * self.d_h * self.fluid.density \
-            / self.fluid.viscosity
 
     def calc_two_phase_flow(self):
         """
         Calculates the condensed phase flow and updates mole and mass fractions
         """
-        mole_flow_liq_total = self.mole_flow_total \
-            * self.fluid.liquid_mole_fraction
-        mass_flow_liq_total = self.mass_flow_total \
-            * self.fluid.liquid_mass_fraction
-        self.mole_flow_gas_total[:] = \
-            self.mole_flow_total - mole_flow_liq_total
-        self.mass_flow_gas_total[:] = \
-            self.mass_flow_total - mass_flow_liq_total
-        self.mole_flow_gas[:] = \
-            self.mole_flow_gas_total * self.fluid.gas.mole_fraction
-        self.mass_flow_gas[:] = \
-            self.mass_flow_gas_total * self.fluid.gas.mass_fraction
-        self.mole_flow_liq[:] = self.mole_flow - self.mole_flow_gas
+        self.mole_flow_gas_total[:], self.mass_flow_gas_total[:], \
+            self.mole_flow_gas[:], self.mass_flow_gas[:], \
+            self.mole_flow_liq[:] = \
+            calc_two_phase_flow(self.mole_flow, self.mole_flow_total,
+                                self.mass_flow_total,
+                                self.fluid.liquid_mole_fraction,
+                                self.fluid.liquid_mass_fraction,
+                                self.fluid.gas.mole_fraction,
+                                self.fluid.gas.mass_fraction)
         self.calc_cond_rate()
         self.calc_condensation_heat()
 
@@ -658,25 +739,281 @@ class TwoPhaseMixtureChannel(GasMixtureChannel):
         Calculates the molar condensation rate of the phase change species in
         the channel.
         """
-        # cond_rate_ele = np.ediff1d(self.mole_flow_liq[self.fluid.id_pc])
-        # self.cond_rate[:] = \
-        #     self.flow_direction * ip.interpolate_1d(cond_rate_ele,
-        #                                             add_edge_points=True)
-
-        self.cond_rate_ele[:] = self.flow_direction \
-            * np.ediff1d(self.mole_flow_liq[self.fluid.id_pc])
+        self.cond_rate_ele[:] = \
+            calc_condensation_rate(self.mole_flow_liq[self.fluid.id_pc],
+                                   self.flow_direction)
 
     def calc_condensation_heat(self):
         """
-        Calculates the molar condensation rate of the phase change species in
+        Calculates the condensation heat of the phase change species in
         the channel.
         """
-        condensation_rate = self.flow_direction \
-            * np.ediff1d(self.mole_flow_liq[self.fluid.id_pc])
         vaporization_enthalpy = self.fluid.phase_change_species.\
             calc_vaporization_enthalpy(self.temp_ele)
-        self.condensation_heat[:] = condensation_rate * vaporization_enthalpy
+        self.condensation_heat[:] = self.cond_rate_ele * vaporization_enthalpy
+
+
+class ChannelBank:
+    """
+    Batched container for the channels of a flow circuit with identical type
+    and axial discretization. The state arrays of all channels are stacked
+    into 2D arrays (channels x nodes or elements, with an additional species
+    axis for gas mixtures) and the arrays of the individual channels are
+    replaced by row views into these arrays. Mass balance, flow velocity,
+    pressure and heat transfer are calculated for all channels at once,
+    while flow directions, outlet pressures and cross-sectional geometries
+    are kept individually for each channel. Enthalpy sources and prescribed
+    heat fluxes (only used for the manifolds) are not supported.
+    """
+    def __init__(self, channels):
+        if not self.is_compatible(channels):
+            raise ValueError('channels of ChannelBank must be of identical '
+                             'type and discretization with constant or wall '
+                             'friction flow resistances')
+        self.channels = list(channels)
+        self.channel = self.channels[0]
+        # reference channel for discretization and flow resistances
+        self.n_channels = len(self.channels)
+        self.n_nodes = self.channel.n_nodes
+        self.n_ele = self.channel.n_ele
+        self.gas_mixture = isinstance(self.channel, GasMixtureChannel)
+        self.two_phase = isinstance(self.channel, TwoPhaseMixtureChannel)
+        self.array_names = self.channel.array_names
+        for name in self.array_names:
+            array = np.stack([getattr(channel, name)
+                              for channel in self.channels])
+            setattr(self, name, array)
+            for i, channel in enumerate(self.channels):
+                channel_array = getattr(channel, name)
+                setattr(channel, name, array[i])
+                channel.replace_print_data(channel_array, array[i])
+
+        self.fluid_bank = \
+            fluids.FluidBank([channel.fluid for channel in self.channels])
+        # batched property evaluation of the channel fluids
+
+        self.rows = np.arange(self.n_channels)
+        self.flow_direction = \
+            np.asarray([channel.flow_direction for channel in self.channels])
+        self.id_in = np.where(self.flow_direction == 1, 0, self.n_nodes - 1)
+        self.id_out = np.where(self.flow_direction == 1, self.n_nodes - 1, 0)
+        self.p_out = \
+            np.asarray([channel.p_out for channel in self.channels],
+                       dtype=float)
+        # channel-wise outlet pressures
+
+        # channel-wise geometry
+        self.cross_area = np.asarray([[channel.cross_area]
+                                      for channel in self.channels])
+        self.d_h = np.asarray([[channel.d_h] for channel in self.channels])
+        self.surface_area = \
+            np.asarray([channel.surface_area for channel in self.channels])
+        self.f_reynolds = [None] * len(self.channel.zetas)
+        # laminar friction constants of the wall friction resistances
+        for i, zeta in enumerate(self.channel.zetas):
+            if isinstance(zeta, fr.WallFrictionFlowResistance):
+                self.f_reynolds[i] = \
+                    np.asarray([[channel.zetas[i].calc_laminar_constant()]
+                                for channel in self.channels])
+
+    @staticmethod
+    def is_compatible(channels):
+        """
+        Checks, if the provided channels can be combined to a ChannelBank
+        """
+        channel = channels[0]
+        for other in channels:
+            if type(other) is not type(channel) \
+                    or other.n_nodes != channel.n_nodes \
+                    or len(other.zetas) != len(channel.zetas) \
+                    or not np.allclose(other.dx, channel.dx) \
+                    or not np.isclose(other.length, channel.length):
+                return False
+            if hasattr(channel.fluid, 'species') \
+                    and other.fluid.species.names != channel.fluid.species.names:
+                return False
+            for zeta, other_zeta in zip(channel.zetas, other.zetas):
+                if type(other_zeta) is not type(zeta):
+                    return False
+                if isinstance(zeta, fr.ConstantFlowResistance) \
+                        and other_zeta.value != zeta.value:
+                    return False
+                if isinstance(zeta, fr.WallFrictionFlowResistance) \
+                        and other_zeta.method != zeta.method:
+                    return False
+                if isinstance(zeta, fr.JunctionFlowResistance):
+                    return False
+        return True
+
+    def fluid_array(self, name):
+        """
+        Returns the fluid property (e.g. 'density' or 'gas.mole_fraction') of
+        all channels as view with a leading channel axis
+        """
+        return self.fluid_bank.get_array(name)
+
+    def inlet(self, array):
+        """
+        Returns the channel-wise inlet values of a stacked node-based array
+        """
+        return array[self.rows, ..., self.id_in]
+
+    def outlet(self, array):
+        """
+        Returns the channel-wise outlet values of a stacked node-based array
+        """
+        return array[self.rows, ..., self.id_out]
+
+    def update(self, mass_flow_in=None, mass_source=None, update_flow=True,
+               update_fluid=True):
+        if mass_flow_in is not None or mass_source is not None:
+            self.calc_mass_balance(mass_flow_in, mass_source)
+            if update_fluid:
+                self.update_fluids()
+            if self.two_phase:
+                self.calc_two_phase_flow()
+        if update_flow:
+            self.calc_flow_velocity()
+            self.calc_pressure()
+
+    def update_heat(self, wall_temp, update_fluid=False, channel_factor=1.0):
+        self.calc_heat_transfer_coeff()
+        self.calc_heat_capacitance(factor=channel_factor)
+        self.calc_heat_transfer(wall_temp)
+        if update_fluid:
+            self.update_fluids()
+
+    def update_fluids(self):
+        if self.gas_mixture:
+            self.fluid_bank.update(self.temperature, self.pressure,
+                                   self.mole_flow)
+        else:
+            self.fluid_bank.update(self.temperature, self.pressure)
+
+    def calc_mass_balance(self, mass_flow_in=None, mass_source=None):
+        """
+        Calculates the mass balance of all channels
+        :param mass_flow_in: scalar or 1D array of channel-wise total inlet
+                             mass flows
+        :param mass_source: stacked array of the discretized mass sources
+        :return: None
+        """
+        if mass_flow_in is not None:
+            mass_flow_in = \
+                np.broadcast_to(np.asarray(mass_flow_in, dtype=float),
+                                (self.n_channels,))
+        if mass_source is not None:
+            self.mass_source[:] = mass_source
+        if self.gas_mixture:
+            mw = self.channel.fluid.species.mw
+            if mass_flow_in is not None:
+                mass_fraction_in = \
+                    self.inlet(self.fluid_array('mass_fraction'))
+                self.mass_flow[:] = \
+                    (mass_fraction_in * mass_flow_in[:, None])[:, :, None]
+            if mass_source is not None:
+                self.mole_source[:] = self.mass_source / mw[:, None]
+            g_func.add_source(self.mass_flow, self.mass_source,
+                              self.flow_direction)
+            self.mass_flow.clip(min=0, out=self.mass_flow)
+            self.mass_flow_total[:], self.mole_flow[:], \
+                self.mole_flow_total[:] = \
+                calc_species_flows(self.mass_flow, mw)
+        else:
+            if mass_flow_in is not None:
+                self.mass_flow_total[:] = mass_flow_in[:, None]
+            g_func.add_source(self.mass_flow_total, self.mass_source,
+                              self.flow_direction)
+            self.mass_flow_total.clip(min=0, out=self.mass_flow_total)
+
+    def calc_two_phase_flow(self):
+        """
+        Calculates the condensed phase flow, condensation rates and heat
+        """
+        fluid = self.channel.fluid
+        self.mole_flow_gas_total[:], self.mass_flow_gas_total[:], \
+            self.mole_flow_gas[:], self.mass_flow_gas[:], \
+            self.mole_flow_liq[:] = \
+            calc_two_phase_flow(self.mole_flow, self.mole_flow_total,
+                                self.mass_flow_total,
+                                self.fluid_array('liquid_mole_fraction'),
+                                self.fluid_array('liquid_mass_fraction'),
+                                self.fluid_array('gas.mole_fraction'),
+                                self.fluid_array('gas.mass_fraction'))
+        self.cond_rate_ele[:] = \
+            calc_condensation_rate(self.mole_flow_liq[:, fluid.id_pc],
+                                   self.flow_direction[:, None])
+        vaporization_enthalpy = \
+            fluid.phase_change_species.calc_vaporization_enthalpy(
+                self.temp_ele)
+        self.condensation_heat[:] = self.cond_rate_ele * vaporization_enthalpy
+
+    def calc_flow_velocity(self):
+        if self.two_phase:
+            mass_flow = self.mass_flow_gas_total
+        else:
+            mass_flow = self.mass_flow_total
+        vol_flow, self.velocity[:], self.reynolds[:] = \
+            calc_flow_velocity(mass_flow, self.fluid_array('density'),
+                               self.fluid_array('viscosity'),
+                               self.cross_area, self.d_h)
+        self.vol_flow[:] = vol_flow
+        if self.two_phase:
+            self.vol_flow_gas[:] = vol_flow
+
+    def calc_pressure_drop(self, density):
+        """
+        Calculates the element-wise pressure drop in all channels
+        """
+        dp = np.zeros((self.n_channels, self.n_ele))
+        for i, zeta in enumerate(self.channel.zetas):
+            if isinstance(zeta, fr.WallFrictionFlowResistance):
+                value = zeta.calc_value(self.reynolds, self.f_reynolds[i],
+                                        self.d_h)
+            else:
+                value = zeta.value
+            dp += zeta.calc_element_pressure_drop(density, self.velocity,
+                                                  value)
+        dp_dyn = calc_dynamic_pressure_drop(density, self.velocity,
+                                            self.flow_direction[:, None])
+        return dp + dp_dyn
+
+    def calc_pressure(self):
+        dp = self.calc_pressure_drop(self.fluid_array('density'))
+        self.pressure[:] = self.p_out[:, None]
+        g_func.add_source(self.pressure, dp, -self.flow_direction)
+
+    def calc_heat_transfer_coeff(self):
+        """
+        Calculates the heat transfer coefficients of all channels
+        """
+        self.k_coeff[:] = \
+            calc_heat_transfer_coeff(self.reynolds,
+                                     self.fluid_array('viscosity'),
+                                     self.fluid_array('specific_heat'),
+                                     self.fluid_array('thermal_conductivity'),
+                                     self.d_h, self.channel.length,
+                                     self.surface_area)
 
     def calc_heat_capacitance(self, factor=1.0):
         self.g_fluid[:] = \
-            factor * self.mass_flow_total * self.fluid.specific_heat
+            factor * self.mass_flow_total * self.fluid_array('specific_heat')
+
+    def calc_heat_transfer(self, wall_temp):
+        """
+        Calculates the heat transfer to the fluids and their temperature
+        variation for the given wall temperatures
+        :param wall_temp: scalar or stacked element-based array
+        :return: stacked heat array
+        """
+        wall_temp = np.broadcast_to(np.asarray(wall_temp, dtype=float),
+                                    self.temp_ele.shape)
+        g_fluid = ip.interpolate_along_axis(self.g_fluid, axis=-1)
+        fluid_temp, heat = \
+            g_func.calc_temp_heat_transfer(wall_temp, self.temperature,
+                                           g_fluid, self.k_coeff,
+                                           self.flow_direction)
+        self.wall_temp[:] = wall_temp
+        self.heat[:] = heat
+        self.temp_ele[:] = ip.interpolate_along_axis(self.temperature, axis=-1)
+        return heat
@@ -0,0 +1,58 @@
+# general imports
+import numpy as np
+
+
+class ConvergenceMonitor:
+    """
+    Watchdog for the outer iteration of the stack system, which detects
+    divergence, oscillation or stagnation from the trend of the recent
+    residuals
+    """
+    def __init__(self, monitor_dict, tolerance):
+        self.tolerance = tolerance
+        # convergence criteria of the monitored iteration
+        self.window = max(monitor_dict.get('window', 10), 3)
+        # number of recent iterations used for the trend analysis
+        self.divergence_factor = monitor_dict.get('divergence_factor', 1e3)
+        # residual increase relative to the minimum residual of the current
+        # operating point indicating divergence
+        self.stagnation_slope = monitor_dict.get('stagnation_slope', 1e-3)
+        # minimum decrease of the residual in decades per iteration
+        self.oscillation_ratio = monitor_dict.get('oscillation_ratio', 0.8)
+        # minimum share of sign changes between consecutive residual
+        # differences indicating oscillation
+        self.residuals = []
+        self.min_residual = None
+
+    def reset(self):
+        self.residuals = []
+        self.min_residual = None
+
+    def update(self, residual):
+        """
+        Adds the residual of the last iteration and returns the detected
+        event ('divergence', 'oscillation', or 'stagnation') or None
+        """
+        residual = max(residual, np.finfo(float).tiny)
+        self.residuals.append(residual)
+        if self.min_residual is None or residual < self.min_residual:
+            self.min_residual = residual
+        if not np.isfinite(residual) \
+                or residual > self.divergence_factor * self.min_residual:
+            return 'divergence'
+        if len(self.residuals) < self.window or residual < self.tolerance:
+            return None
+        log_residuals = np.log10(self.residuals[-self.window:])
+        slope = np.polyfit(np.arange(self.window), log_residuals, 1)[0]
+        differences = np.diff(log_residuals)
+        sign_changes = \
+            np.count_nonzero(np.diff(np.sign(differences)) != 0)
+        if sign_changes >= self.oscillation_ratio * (self.window - 2) \
+                and slope > -self.stagnation_slope:
+            return 'oscillation'
+        elif slope > self.stagnation_slope:
+            return 'divergence'
+        elif slope > -self.stagnation_slope:
+            return 'stagnation'
+        else:
+            return None
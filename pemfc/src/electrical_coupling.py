@@ -1,10 +1,9 @@
 # general imports
 import numpy as np
 from scipy import sparse
-from scipy.sparse.linalg import spsolve
 
 # local module imports
-from . import matrix_functions as mtx
+from . import matrix_functions as mtx, linear_solver
 
 
 class ElectricalCoupling:
@@ -12,6 +11,8 @@ class ElectricalCoupling:
     def __init__(self, stack):
         self.stack = stack
         self.cells = stack.cells
+        self.cell_arrays = stack.cell_arrays
+        # struct-of-arrays storage of the cell variables
         # Handover
         self.n_cells = self.stack.n_cells
         # number of the stack cells
@@ -49,14 +50,23 @@ class ElectricalCoupling:
             # width of the channel
 
             self.solve_sparse = True
+            self.linear_solver = linear_solver.factory(
+                stack.settings['stack'].get('electrical_linear_solver', {}))
+            # solver for the sparse linear system of the electrical potentials
             cell_mat_x_list = [cell.elec_x_mat_const for cell in self.cells]
 
-            self.mat_const = mtx.block_diag_overlap(cell_mat_x_list,
-                                                    (self.n_ele, self.n_ele))
+            if self.solve_sparse:
+                self.mat_const = mtx.block_diag_overlap(
+                    cell_mat_x_list, (self.n_ele, self.n_ele),
+                    sparse_format='csr')
+            else:
+                self.mat_const = mtx.block_diag_overlap(
+                    [mat.toarray() for mat in cell_mat_x_list],
+                    (self.n_ele, self.n_ele))
             self.mat_const = \
                 self.mat_const[self.n_ele:-self.n_ele, self.n_ele:-self.n_ele]
             if self.solve_sparse:
-                self.mat_const = sparse.csr_matrix(self.mat_const)
+                self.init_sparse_pattern()
 
     def update(self, current_density=None, voltage=None):
         """
@@ -70,12 +80,10 @@ class ElectricalCoupling:
         if voltage is not None:
             self.v_tar = voltage
             self.v_loss_tar = self.e_0_stack - self.v_tar
-        conductance_z = \
-            np.asarray([cell.conductance_z for cell in self.cells]).flatten()
+        conductance_z = self.cell_arrays.conductance_z.flatten()
         # conductance = (self.c_width * self.dx / resistance).flatten()
         # conductance = 1.0 / self.resistance
-        active_area = \
-            np.array([cell.active_area_dx for cell in self.cells]).flatten()
+        active_area = self.cell_arrays.active_area_dx.flatten()
         if self.n_cells > 1:
             self.update_mat(conductance_z)
             self.rhs[:self.n_ele] = self.calc_boundary_condition()
@@ -84,29 +92,63 @@ class ElectricalCoupling:
         else:
             i_bc = self.calc_boundary_condition()
             self.i_cd[:] = - i_bc / active_area
-            v_diff = - i_bc / np.array([cell.conductance_z
-                                        for cell in self.cells]).flatten()
+            v_diff = - i_bc / conductance_z
             v_diff = v_diff.reshape((self.n_cells, self.n_ele))
             self.update_cell_voltage(v_diff)
 
+    def init_sparse_pattern(self):
+        """
+        Creates the sparse conductance matrix with the fixed sparsity pattern
+        of the constant in-plane and the dynamic through-plane conductances
+        and the positions of the dynamic entries in its data array
+        """
+        n = self.mat_const.shape[0]
+        diag_ids = np.arange(n)
+        off_ids = np.arange(n - self.n_ele)
+        pattern = abs(self.mat_const) + sparse.diags(
+            [np.ones(n), np.ones(n - self.n_ele), np.ones(n - self.n_ele)],
+            [0, self.n_ele, -self.n_ele], format='csr')
+        pattern = sparse.csr_matrix(pattern)
+        pattern.sort_indices()
+        self.mat = pattern
+        # constant part of the matrix data
+        const_coo = self.mat_const.tocoo()
+        self.mat_const_data = np.zeros(pattern.nnz)
+        self.mat_const_data[mtx.csr_data_index(
+            pattern, const_coo.row, const_coo.col)] = const_coo.data
+        # positions of the diagonal, upper and lower through-plane entries
+        self.diag_index = mtx.csr_data_index(pattern, diag_ids, diag_ids)
+        self.upper_index = \
+            mtx.csr_data_index(pattern, off_ids, off_ids + self.n_ele)
+        self.lower_index = \
+            mtx.csr_data_index(pattern, off_ids + self.n_ele, off_ids)
+
     def update_mat(self, conductance):
         """
         Updates the conductance matrix
         """
-        cell_c_mid = \
-            np.hstack((conductance[:-self.n_ele] + conductance[self.n_ele:]))
-        mat_dyn = \
-            - np.diag(cell_c_mid, 0) \
-            + np.diag(conductance[:-self.n_ele][self.n_ele:], self.n_ele) \
-            + np.diag(conductance[:-self.n_ele][self.n_ele:], -self.n_ele)
+        n = len(conductance) - self.n_ele
+        cell_c_mid = self.stack.workspace.empty((id(self), 'mid conductance'),
+                                                n)
+        np.add(conductance[:-self.n_ele], conductance[self.n_ele:],
+               out=cell_c_mid)
         if self.solve_sparse:
-            mat_dyn = sparse.csr_matrix(mat_dyn)
-        self.mat = self.mat_const + mat_dyn
+            # update the data of the matrix with fixed sparsity pattern
+            data = self.mat.data
+            data[:] = self.mat_const_data
+            data[self.diag_index] -= cell_c_mid
+            data[self.upper_index] += conductance[:-self.n_ele][self.n_ele:]
+            data[self.lower_index] += conductance[:-self.n_ele][self.n_ele:]
+        else:
+            mat_dyn = \
+                - np.diag(cell_c_mid, 0) \
+                + np.diag(conductance[:-self.n_ele][self.n_ele:], self.n_ele) \
+                + np.diag(conductance[:-self.n_ele][self.n_ele:], -self.n_ele)
+            self.mat = self.mat_const + mat_dyn
 
     def calc_voltage_loss(self):
-        v_loss = \
-            np.asarray([np.average(cell.v_loss, weights=cell.active_area_dx)
-                        for cell in self.cells])
+        v_loss = np.average(self.cell_arrays.v_loss, axis=-1,
+                            weights=self.cell_arrays.active_area_dx)
         v_loss_total = np.sum(v_loss)
         return v_loss, v_loss_total
 
@@ -133,7 +175,7 @@ class ElectricalCoupling:
         """
         self.v_end_plate[:] = - self.rhs[:self.n_ele] / conductance[:self.n_ele]
         if self.solve_sparse:
-            v_new = spsolve(self.mat, self.rhs)
+            v_new = self.linear_solver.solve(self.mat, self.rhs)
             # mat_const = self.mat_const.toarray()
             # mat = self.mat.toarray()
         else:
@@ -146,7 +188,13 @@ class ElectricalCoupling:
         return np.reshape(i_ca_vec.flatten(), (self.n_cells, self.n_ele))
 
     def update_cell_voltage(self, v_diff):
-        for i, cell in enumerate(self.cells):
-            cell.v[:] = cell.e_0 - v_diff[i]
-            # cell.v_loss[:] = v_diff[i]
-            cell.update_voltage_loss(v_diff[i])
+        """
+        Sets the cell voltages and scales the voltage losses of all cells
+        to the voltage differences from the electrical coupling
+        """
+        cell_arrays = self.cell_arrays
+        cell_arrays.v[:] = cell_arrays.e_0[:, None] - v_diff
+        v_loss_factor = v_diff / cell_arrays.v_loss
+        cell_arrays.v_loss[:] *= v_loss_factor
+        cell_arrays.half_cell_v_loss[:] *= v_loss_factor[:, None, :]
+        cell_arrays.membrane_v_loss[:] *= v_loss_factor
@@ -4,7 +4,7 @@ from abc import ABC, abstractmethod
 
 # local module imports
 from . import interpolation as ip, global_functions as g_func, \
-    channel as chl, output_object as oo
+    channel as chl, output_object as oo, workspace as ws
 
 
 class ParallelFlowCircuit(ABC, oo.OutputObject):
@@ -54,6 +54,12 @@ class ParallelFlowCircuit(ABC, oo.OutputObject):
         self.manifolds[1].fluid.name = self.manifolds[1].name + ': ' \
             + self.manifolds[1].fluid.TYPE_NAME
         self.channels = channels
+        self.channel_bank = kwargs.get('channel_bank', None)
+        # batched container of the channels (ChannelBank) or None
+        self.workspace = kwargs.get('workspace', None)
+        if self.workspace is None:
+            self.workspace = ws.Workspace()
+        # pool of preallocated temporary arrays (shared within the stack)
         self.manifolds[0].flow_direction = 1
         self.shape = dict_flow_circuit.get('shape', 'U')
         if self.shape not in ('U', 'Z'):
@@ -70,6 +76,13 @@ class ParallelFlowCircuit(ABC, oo.OutputObject):
 
         self.n_channels = len(self.channels)
         self.n_subchannels = n_subchannels
+        channel_weights = kwargs.get('channel_weights', None)
+        if channel_weights is None:
+            channel_weights = np.ones(self.n_channels)
+        self.channel_weights = np.asarray(channel_weights, dtype=float)
+        # number of cells represented by each channel (reduced-order stacks)
+        self.channel_multiplier = self.n_subchannels * self.channel_weights
+        # number of parallel channels connected to each manifold junction
         self.tolerance = dict_flow_circuit.get('tolerance', 1e-6)
         self.max_iter = dict_flow_circuit.get('max_iter', 20)
         self.min_iter = dict_flow_circuit.get('min_iter', 3)
@@ -78,8 +91,8 @@ class ParallelFlowCircuit(ABC, oo.OutputObject):
         self.mass_flow_in = \
             self.manifolds[0].mass_flow_total[self.manifolds[0].id_in]
         self.vol_flow_in = 0.0
-        self.channel_mass_flow = \
-            np.ones(self.n_channels) * self.mass_flow_in / self.n_channels
+        self.channel_mass_flow = self.mass_flow_in * self.channel_weights \
+            / np.sum(self.channel_weights)
         self.channel_vol_flow = np.zeros(self.channel_mass_flow.shape)
 
         self.channel_length = \
@@ -99,7 +112,8 @@ class ParallelFlowCircuit(ABC, oo.OutputObject):
         if inlet_mass_flow is not None:
             if self.initialize:
                 # homogeneous distribution
-                self.channel_mass_flow[:] = inlet_mass_flow / self.n_channels
+                self.channel_mass_flow[:] = inlet_mass_flow \
+                    * self.channel_weights / np.sum(self.channel_weights)
             else:
                 # use previous distribution scaled to new mass flow
                 self.channel_mass_flow[:] *= inlet_mass_flow / self.mass_flow_in
@@ -109,7 +123,8 @@ class ParallelFlowCircuit(ABC, oo.OutputObject):
             self.vol_flow_in = \
                 inlet_mass_flow / self.manifolds[0].fluid.density[id_in]
 
-        channel_vol_flow_old = np.zeros(self.channel_vol_flow.shape)
+        channel_vol_flow_old = self.workspace.empty(
+            (id(self), 'channel volume flow'), self.channel_vol_flow.shape)
         channel_vol_flow_old[:] = 1e8
         if calc_distribution is None:
             calc_distribution = self.calc_distribution
@@ -140,8 +155,10 @@ class ParallelFlowCircuit(ABC, oo.OutputObject):
         else:
             self.update_channels()
         try:
+            cell_mass_flow = self.channel_mass_flow / self.channel_weights
             self.normalized_flow_distribution[:] = \
-                self.channel_mass_flow / np.average(self.channel_mass_flow)
+                cell_mass_flow / np.average(cell_mass_flow,
+                                            weights=self.channel_weights)
         except FloatingPointError:
             self.normalized_flow_distribution[:] = 0.0
 
@@ -151,39 +168,70 @@ class ParallelFlowCircuit(ABC, oo.OutputObject):
 
     def update_channels(self):
         if self.initialize:
-            channel_mass_flow_in = np.ones(self.n_channels) \
-                * self.mass_flow_in / self.n_channels
+            channel_mass_flow_in = self.mass_flow_in * self.channel_weights \
+                / np.sum(self.channel_weights)
             channel_mass_flow_out = channel_mass_flow_in
         else:
             channel_mass_flow_in = self.channel_mass_flow
-            channel_mass_flow_out = \
-                np.array([channel.mass_flow_total[channel.id_out]
-                          for channel in self.channels])
-            channel_mass_flow_out *= self.n_subchannels
+            if self.channel_bank is not None:
+                channel_mass_flow_out = \
+                    self.channel_bank.outlet(self.channel_bank.mass_flow_total)
+            else:
+                channel_mass_flow_out = self.workspace.empty(
+                    (id(self), 'outlet mass flow'), self.n_channels)
+                for i, channel in enumerate(self.channels):
+                    channel_mass_flow_out[i] = \
+                        channel.mass_flow_total[channel.id_out]
+            channel_mass_flow_out *= self.channel_multiplier
 
         if self.multi_component:
-            mass_fraction = \
-                np.array([channel.fluid.mass_fraction[:, channel.id_out]
-                          for channel in self.channels]).transpose()
+            if self.channel_bank is not None:
+                mass_fraction = self.channel_bank.outlet(
+                    self.channel_bank.fluid_array('mass_fraction')).transpose()
+            else:
+                mass_fraction = self.workspace.empty(
+                    (id(self), 'outlet mass fraction'),
+                    (self.channels[0].fluid.n_species, self.n_channels))
+                for i, channel in enumerate(self.channels):
+                    mass_fraction[:, i] = \
+                        channel.fluid.mass_fraction[:, channel.id_out]
         else:
             mass_fraction = 1.0
 
         mass_source = channel_mass_flow_out * mass_fraction
         # mass_source = self.channel_mass_flow * mass_fraction
-        channel_enthalpy_out = \
-            np.asarray([chnl.g_fluid[chnl.id_out] * chnl.temperature[chnl.id_out]
-                        for chnl in self.channels]) * self.n_subchannels
+        if self.channel_bank is not None:
+            channel_enthalpy_out = \
+                self.channel_bank.outlet(self.channel_bank.g_fluid) \
+                * self.channel_bank.outlet(self.channel_bank.temperature) \
+                * self.channel_multiplier
+        else:
+            channel_enthalpy_out = self.workspace.empty(
+                (id(self), 'outlet enthalpy'), self.n_channels)
+            for i, chnl in enumerate(self.channels):
+                channel_enthalpy_out[i] = \
+                    chnl.g_fluid[chnl.id_out] * chnl.temperature[chnl.id_out]
+            channel_enthalpy_out *= self.channel_multiplier
         self.manifolds[1].update(mass_flow_in=0.0, mass_source=mass_source,
                                  update_heat=False,
                                  enthalpy_source=channel_enthalpy_out)
 
         # Channel update
-        for i, channel in enumerate(self.channels):
-            channel.p_out = ip.interpolate_1d(self.manifolds[1].pressure)[i]
-            channel.temperature[channel.id_in] = self.manifolds[0].temp_ele[i]
-            channel.update(mass_flow_in=
-                           channel_mass_flow_in[i]/self.n_subchannels,
-                           update_heat=False)
+        if self.channel_bank is not None:
+            bank = self.channel_bank
+            bank.p_out[:] = ip.interpolate_1d(self.manifolds[1].pressure)
+            bank.temperature[bank.rows, bank.id_in] = \
+                self.manifolds[0].temp_ele
+            bank.update(
+                mass_flow_in=channel_mass_flow_in / self.channel_multiplier)
+        else:
+            for i, channel in enumerate(self.channels):
+                channel.p_out = ip.interpolate_1d(self.manifolds[1].pressure)[i]
+                channel.temperature[channel.id_in] = \
+                    self.manifolds[0].temp_ele[i]
+                channel.update(mass_flow_in=channel_mass_flow_in[i]
+                               / self.channel_multiplier[i],
+                               update_heat=False)
 
         # Inlet header update
         id_in = self.channels[-1].id_in
@@ -205,9 +253,9 @@ class ParallelFlowCircuit(ABC, oo.OutputObject):
 class KohFlowCircuit(ParallelFlowCircuit):
 
     def __init__(self, dict_flow_circuit, manifolds, channels,
-                 n_subchannels=1.0):
+                 n_subchannels=1.0, **kwargs):
         super().__init__(dict_flow_circuit, manifolds, channels,
-                         n_subchannels)
+                         n_subchannels, **kwargs)
         # Distribution factor
         self.alpha = np.ones(self.n_channels)
         id_in = self.channels[-1].id_in
@@ -220,6 +268,36 @@ class KohFlowCircuit(ParallelFlowCircuit):
         self.visc_channel = np.zeros(self.n_channels)
         self.dp_channel = np.zeros(self.n_channels)
 
+    def update_channel_data(self):
+        """
+        Updates the channel pressure drops, average volume flows and
+        viscosities
+        """
+        if self.channel_bank is not None:
+            bank = self.channel_bank
+            self.dp_channel[:] = \
+                bank.inlet(bank.pressure) - bank.outlet(bank.pressure)
+            self.channel_vol_flow[:] = np.average(bank.vol_flow, axis=-1)
+            self.visc_channel[:] = \
+                np.average(bank.fluid_array('viscosity'), axis=-1)
+        else:
+            for i, channel in enumerate(self.channels):
+                self.dp_channel[i] = channel.pressure[channel.id_in] \
+                    - channel.pressure[channel.id_out]
+                self.channel_vol_flow[i] = np.average(channel.vol_flow)
+                self.visc_channel[i] = np.average(channel.fluid.viscosity)
+
+    def get_channel_inlet_density(self):
+        if self.channel_bank is not None:
+            return self.channel_bank.inlet(
+                self.channel_bank.fluid_array('density'))
+        else:
+            density = self.workspace.empty((id(self), 'inlet density'),
+                                           self.n_channels)
+            for i, channel in enumerate(self.channels):
+                density[i] = channel.fluid.density[channel.id_in]
+            return density
+
     def single_loop(self, inlet_mass_flow=None, update_channels=True):
         """
         Update the flow circuit
@@ -228,16 +306,7 @@ class KohFlowCircuit(ParallelFlowCircuit):
             self.mass_flow_in = inlet_mass_flow
         if update_channels:
             self.update_channels()
-            self.dp_channel[:] = \
-                np.array([channel.pressure[channel.id_in] - channel.pressure[channel.id_out]
-                          for channel in self.channels])
-            self.channel_vol_flow[:] = \
-                np.array([np.average(channel.vol_flow)
-                          for channel in self.channels])
-        # if np.min(np.abs(vol_flow_channel)) > g_par.SMALL:
-            self.visc_channel[:] = \
-                np.array([np.average(channel.fluid.viscosity)
-                          for channel in self.channels])
+            self.update_channel_data()
         # velocity = np.array([np.average(channel.velocity)
         #                      for channel in self.channels])
         p_in = ip.interpolate_1d(self.manifolds[0].pressure)
@@ -250,16 +319,16 @@ class KohFlowCircuit(ParallelFlowCircuit):
                 * self.visc_channel * self.l_by_a
         self.dp_ref = np.maximum(self.dp_channel[-1], 1e-3)
         self.alpha[:] = (p_in - p_out) / self.dp_ref
-        self.dp_ref = self.vol_flow_in / np.sum(self.alpha) * self.l_by_a \
+        self.dp_ref = self.vol_flow_in \
+            / np.sum(self.alpha * self.channel_weights) * self.l_by_a \
             * self.visc_channel[-1] / self.k_perm[-1] / self.n_subchannels
         p_in += self.dp_ref \
             + self.manifolds[1].pressure[self.manifolds[1].id_out] \
             - self.manifolds[0].p_out
         self.alpha[:] = (p_in - p_out) / self.dp_ref
         self.channel_vol_flow[:] = (p_in - p_out) * self.k_perm \
-            / self.l_by_a * self.n_subchannels / self.visc_channel
-        density = np.array([channel.fluid.density[channel.id_in]
-                            for channel in self.channels])
+            / self.l_by_a * self.channel_multiplier / self.visc_channel
+        density = self.get_channel_inlet_density()
         self.channel_mass_flow[:] = self.channel_vol_flow * density
         mass_flow_correction = \
             self.mass_flow_in / np.sum(self.channel_mass_flow)
@@ -269,9 +338,9 @@ class KohFlowCircuit(ParallelFlowCircuit):
 class ModifiedKohFlowCircuit(KohFlowCircuit):
 
     def __init__(self, dict_flow_circuit, manifolds, channels,
-                 n_subchannels=1.0):
+                 n_subchannels=1.0, **kwargs):
         super().__init__(dict_flow_circuit, manifolds, channels,
-                         n_subchannels)
+                         n_subchannels, **kwargs)
         self.urf = dict_flow_circuit.get('underrelaxation_factor', 0.5)
 
     def single_loop(self, inlet_mass_flow=None, update_channels=True):
@@ -282,17 +351,7 @@ class ModifiedKohFlowCircuit(KohFlowCircuit):
             self.mass_flow_in = inlet_mass_flow
         if update_channels:
             self.update_channels()
-            self.dp_channel[:] = \
-                np.array([channel.pressure[channel.id_in]
-                          - channel.pressure[channel.id_out]
-                          for channel in self.channels])
-            self.channel_vol_flow[:] = \
-                np.array([np.average(channel.vol_flow)
-                          for channel in self.channels])
-        # if np.min(np.abs(vol_flow_channel)) > g_par.SMALL:
-            self.visc_channel[:] = \
-                np.array([np.average(channel.fluid.viscosity)
-                          for channel in self.channels])
+            self.update_channel_data()
         # velocity = np.array([np.average(channel.velocity)
         #                      for channel in self.channels])
         p_in = ip.interpolate_1d(self.manifolds[0].pressure)
@@ -305,9 +364,9 @@ class ModifiedKohFlowCircuit(KohFlowCircuit):
         #         * self.visc_channel * self.l_by_a
         self.alpha[:] = (p_in - p_out) / self.dp_channel
         self.channel_vol_flow[:] *= (self.urf + (1.0 - self.urf) * self.alpha)
-        density = np.array([channel.fluid.density[channel.id_in]
-                            for channel in self.channels])
-        self.channel_mass_flow[:] = self.channel_vol_flow * density
+        density = self.get_channel_inlet_density()
+        self.channel_mass_flow[:] = \
+            self.channel_vol_flow * density * self.channel_weights
         mass_flow_correction = \
             self.mass_flow_in / np.sum(self.channel_mass_flow)
         self.channel_mass_flow[:] *= mass_flow_correction
@@ -315,15 +374,15 @@ class ModifiedKohFlowCircuit(KohFlowCircuit):
 
 class WangFlowCircuit(ParallelFlowCircuit):
     def __init__(self, dict_flow_circuit, manifolds, channels,
-                 n_subchannels=1.0):
+                 n_subchannels=1.0, **kwargs):
         super().__init__(dict_flow_circuit, manifolds, channels,
-                         n_subchannels)
+                         n_subchannels, **kwargs)
 
         # self.zeta = np.zeros(self.n_channels)
         self.xsi = 1.0
         self.H = self.manifolds[0].cross_area / self.manifolds[1].cross_area
         F_c = np.array([np.average(channel.cross_area)
-                        for channel in self.channels])
+                        for channel in self.channels]) * self.channel_weights
         # print('F_c: ', F_c)
         sum_Fc = g_func.add_source(np.copy(F_c), F_c[1:], direction=-1)
         # print('sum_Fc: ', sum_Fc)
@@ -463,7 +522,8 @@ class WangFlowCircuit(ParallelFlowCircuit):
 
 
 def factory(dict_circuit, dict_in_manifold, dict_out_manifold,
-            channels, channel_multiplier=1.0):
+            channels, channel_multiplier=1.0, channel_weights=None,
+            workspace=None):
     if not isinstance(channels, (list, tuple)):
         raise TypeError('argument channels must be a list of type Channel')
     if not isinstance(channels[0], chl.Channel):
@@ -477,5 +537,14 @@ def factory(dict_circuit, dict_in_manifold, dict_out_manifold,
     manifolds = [chl.Channel(dict_in_manifold, in_manifold_fluid),
                  chl.Channel(dict_out_manifold, out_manifold_fluid)]
 
+    if dict_circuit.get('channel_bank', False) \
+            and chl.ChannelBank.is_compatible(channels):
+        channel_bank = chl.ChannelBank(channels)
+    else:
+        channel_bank = None
+
     return ParallelFlowCircuit(dict_circuit, manifolds, channels,
-                               n_subchannels=channel_multiplier)
+                               n_subchannels=channel_multiplier,
+                               channel_bank=channel_bank,
+                               channel_weights=channel_weights,
+                               workspace=workspace)
@@ -39,9 +39,22 @@ class ConstantFlowResistance(FlowResistance):
         self.value = zeta_dict['value']
 
     def calc_pressure_drop(self):
-        dp_node = 0.5 * self.channel.fluid.density * self.value \
-                  * self.channel.velocity ** 2.0
-        return ip.interpolate_1d(dp_node)
+        return self.calc_element_pressure_drop(self.channel.fluid.density,
+                                               self.channel.velocity)
+
+    def calc_element_pressure_drop(self, density, velocity, value=None):
+        """
+        Element-wise pressure drop for node-based density and velocity
+        arrays, the last axis is the channel axis
+        """
+        if value is None:
+            value = self.value
+        if np.ndim(value) > 0:
+            # element-wise resistance values
+            dp_node = 0.5 * density * velocity ** 2.0
+            return ip.interpolate_along_axis(dp_node, axis=-1) * value
+        dp_node = 0.5 * density * value * velocity ** 2.0
+        return ip.interpolate_along_axis(dp_node, axis=-1)
 
 
 class WallFrictionFlowResistance(FlowResistance):
@@ -52,7 +65,35 @@ class WallFrictionFlowResistance(FlowResistance):
 
     def update(self):
         # reynolds = ip.interpolate_1d(self.channel.reynolds)
-        reynolds = self.channel.reynolds
+        self.value[:] = self.calc_value(self.channel.reynolds)
+
+    def calc_laminar_constant(self):
+        """
+        Returns the product of laminar Darcy friction factor and reynolds
+        number for the cross-sectional shape of the channel
+        """
+        if self.channel.aspect_ratio == 1.0:
+            return 64.0
+        elif self.channel.cross_shape == 'rectangular':
+            eps = self.channel.aspect_ratio
+            return 4.0 * 24.0 \
+                / ((1.0 + eps) ** 2.0
+                   * (1.0 - (192.0 * eps / np.pi ** 5.0
+                             * np.tanh(np.pi / (2.0 * eps)))))
+        elif self.channel.cross_shape in ('triangular', 'trapezoidal'):
+            return 64.0
+        else:
+            raise NotImplementedError
+
+    def calc_value(self, reynolds, f_reynolds=None, d_h=None):
+        """
+        Node-wise resistance values for the given reynolds array, the last
+        axis is the channel axis. The laminar constant f_reynolds and the
+        hydraulic diameter d_h of the channel can be replaced by arrays
+        broadcastable to the reynolds array.
+        """
+        if d_h is None:
+            d_h = self.channel.d_h
         lam = reynolds < 2200.0
         turb = np.invert(lam)
         lam_id = np.where(lam)
@@ -62,21 +103,12 @@ class WallFrictionFlowResistance(FlowResistance):
         factor = np.zeros(reynolds.shape)
         if np.any(lam):
             reynolds_lam = reynolds[lam_id]
-            if self.channel.aspect_ratio == 1.0:
-                f_reynolds = 64.0
-            elif self.channel.cross_shape == 'rectangular':
-                eps = self.channel.aspect_ratio
-                f_reynolds = 4.0 * 24.0 \
-                    / ((1.0 + eps) ** 2.0
-                       * (1.0 - (192.0 * eps / np.pi ** 5.0
-                                 * np.tanh(np.pi / (2.0 * eps)))))
-            elif self.channel.cross_shape in ('triangular', 'trapezoidal'):
-                f_reynolds = 64.0
-            else:
-                raise NotImplementedError
-
+            if f_reynolds is None:
+                f_reynolds = self.calc_laminar_constant()
+            f_reynolds = np.broadcast_to(f_reynolds, reynolds.shape)[lam_id]
             factor[lam_id] = \
-                np.divide(f_reynolds, reynolds_lam, where=reynolds_lam > 0.0)
+                np.divide(f_reynolds, reynolds_lam, where=reynolds_lam > 0.0,
+                          out=np.zeros(reynolds_lam.shape))
 
         if np.any(turb):
             reynolds_turb = reynolds[turb_id]
@@ -85,18 +117,28 @@ class WallFrictionFlowResistance(FlowResistance):
             else:
                 raise NotImplementedError
         np.seterr(under='ignore')
-        self.value[:] = self.channel.dx_node / self.channel.d_h * factor
-        self.value[np.isnan(self.value)] = 0.0
-        self.value[self.value < constants.SMALL] = 0.0
+        value = self.channel.dx_node / d_h * factor
+        value[np.isnan(value)] = 0.0
+        value[value < constants.SMALL] = 0.0
         np.seterr(under='raise')
+        return value
 
     def calc_pressure_drop(self):
-        dp_node = 0.5 * self.channel.fluid.density * self.value \
-                  * self.channel.velocity ** 2.0
+        return self.calc_element_pressure_drop(self.channel.fluid.density,
+                                               self.channel.velocity)
+
+    def calc_element_pressure_drop(self, density, velocity, value=None):
+        """
+        Element-wise pressure drop for node-based density and velocity
+        arrays, the last axis is the channel axis
+        """
+        if value is None:
+            value = self.value
+        dp_node = 0.5 * density * value * velocity ** 2.0
         # weighting according to dx and dx_node lengths for element-wise
         # pressure drop
-        dp_node_1 = dp_node[:-1]
-        dp_node_2 = dp_node[1:]
+        dp_node_1 = dp_node[..., :-1]
+        dp_node_2 = dp_node[..., 1:]
         dx_node_1 = self.channel.dx_node[:-1]
         dx_node_2 = self.channel.dx_node[1:]
         dx = self.channel.dx
@@ -1,6 +1,7 @@
 # general imports
 import numpy as np
 from abc import ABC, abstractmethod
+from operator import attrgetter
 
 # local module imports
 from .output_object import OutputObject
@@ -12,6 +13,11 @@ class OneDimensionalFluid(ABC, OutputObject):
     PROPERTY_NAMES = ['Density', 'Specific Heat', 'Viscosity',
                       'Thermal Conductivity']
     TYPE_NAME = 'Base Fluid'
+    ARRAY_NAMES = ['_temperature', '_pressure']
+    # names of the node-based arrays (nodes along the first axis) besides
+    # the property arrays
+    PHASE_NAMES = []
+    # names of the fluid attributes representing individual phases
 
     def __init__(self, nx, name, temperature=298.15, pressure=101325.0,
                  **kwargs):
@@ -264,6 +270,9 @@ class IncompressibleFluid(OneDimensionalFluid):
 class GasMixture(OneDimensionalFluid):
 
     TYPE_NAME = 'Gas Mixture'
+    ARRAY_NAMES = OneDimensionalFluid.ARRAY_NAMES \
+        + ['species_viscosity', '_mole_fraction', '_mass_fraction',
+           '_concentration', 'mw']
 
     def __init__(self, nx, name, species_dict, mole_fractions,
                  temperature=298.15, pressure=101325.0, **kwargs):
@@ -280,7 +289,7 @@ class GasMixture(OneDimensionalFluid):
         species_names = list(species_dict.keys())
         # self.n_species = len(species_names)
         self.gas_constant = constants.GAS_CONSTANT
-        self.species = species.GasProperties(species_names)
+        self.species = species.GasProperties.get(species_names)
         self.n_species = len(self.species.names)
         self.species_viscosity = \
             self.species.calc_viscosity(self._temperature).transpose()
@@ -413,7 +422,7 @@ class GasMixture(OneDimensionalFluid):
         Calculates the heat conductivity of a gas mixture,
         according to Wilkes equation.
         """
-        self._mole_fraction[1:] = np.maximum(1e-16, self._mole_fraction[1:])
+        self._mole_fraction[:] = np.maximum(1e-16, self._mole_fraction)
         wilke_coeffs = self.calc_wilke_coefficients()
         lambda_species = \
             self.species.calc_thermal_conductivity(temperature, pressure)
@@ -479,6 +488,10 @@ class GasMixture(OneDimensionalFluid):
 class TwoPhaseMixture(OneDimensionalFluid):
 
     TYPE_NAME = 'Two-Phase Mixture'
+    ARRAY_NAMES = OneDimensionalFluid.ARRAY_NAMES \
+        + ['_mole_fraction', '_mass_fraction', 'mw', 'liquid_mass_fraction',
+           'liquid_mole_fraction', 'humidity', 'saturation_pressure']
+    PHASE_NAMES = ['gas', 'liquid']
 
     def __init__(self, nx, name, species_dict, mole_fractions,
                  liquid_props=None, temperature=298.15, pressure=101325.0,
@@ -503,12 +516,14 @@ class TwoPhaseMixture(OneDimensionalFluid):
              if 'gas' and 'liquid' in species_dict[key]]
         if liquid_props is None:
             liquid_props = \
-                species.IncompressibleProperties(phase_change_species_names[0])
+                species.IncompressibleProperties.get(
+                    phase_change_species_names[0])
             self.phase_change_species = \
-                species.PhaseChangeProperties({liquid_props.name: liquid_props})
+                species.PhaseChangeProperties.get(
+                    {liquid_props.name: liquid_props})
         elif isinstance(liquid_props, dict):
             self.phase_change_species = \
-                species.PhaseChangeProperties(liquid_props)
+                species.PhaseChangeProperties.get(liquid_props)
         else:
             raise TypeError('Data for PhaseChangeSpecies object '
                             'can only be provided as dictionary with species '
@@ -560,6 +575,15 @@ class TwoPhaseMixture(OneDimensionalFluid):
         self.gas.rescale(new_nx)
         self.liquid.rescale(new_nx)
         super().rescale(new_nx)
+
+    def link_phase_arrays(self):
+        """
+        Uses the temperature and pressure arrays of the mixture for the
+        individual phases
+        """
+        for phase in (self.gas, self.liquid):
+            phase._temperature = self._temperature
+            phase._pressure = self._pressure
     # @property
     # def mole_fraction_gas(self):
     #     return self._mole_fraction_gas.transpose()
@@ -733,6 +757,96 @@ class TwoPhaseMixture(OneDimensionalFluid):
             self._mole_fraction[:, self.id_pc] * self._pressure / p_sat
 
 
+class FluidBank:
+    """
+    Batched container for the fluids of multiple channels with identical type,
+    species and discretization. A single fluid of the same type holding the
+    concatenated nodes of all fluids evaluates the properties of all fluids
+    in one pass. The arrays of the individual fluids are replaced by views
+    into the arrays of this batch fluid, so that they can still be used and
+    updated individually. Node-based arrays with a leading fluid axis are
+    provided by get_array().
+    """
+    def __init__(self, fluids):
+        fluid = fluids[0]
+        for other in fluids:
+            if type(other) is not type(fluid) or other.nodes != fluid.nodes:
+                raise ValueError('fluids of FluidBank must be of identical '
+                                 'type and discretization')
+            if hasattr(fluid, 'species') \
+                    and other.species.names != fluid.species.names:
+                raise ValueError('fluids of FluidBank must consist of '
+                                 'identical species')
+        self.fluids = list(fluids)
+        self.n_fluids = len(self.fluids)
+        self.nodes = fluid.nodes
+        self.fluid = fluid.copy()
+        self.fluid.name = fluid.name + ': Batch'
+        self.bind_arrays(self.fluid, self.fluids)
+        if isinstance(self.fluid, TwoPhaseMixture):
+            for item in [self.fluid] + self.fluids:
+                item.link_phase_arrays()
+
+    def bind_arrays(self, batch_fluid, fluids):
+        """
+        Replaces the node-based arrays of the batch fluid by the
+        concatenated arrays of the fluids and the arrays of the fluids by
+        views into these arrays
+        """
+        def bind(array_list):
+            array = np.concatenate(array_list, axis=0)
+            views = [array[i * self.nodes:(i + 1) * self.nodes]
+                     for i in range(self.n_fluids)]
+            for item, old_array, view in zip(fluids, array_list, views):
+                # 2D print data consists of rows of the transposed arrays
+                item.replace_print_data(old_array, view.transpose())
+            return array, views
+
+        for name in batch_fluid.ARRAY_NAMES:
+            array, views = bind([getattr(item, name) for item in fluids])
+            setattr(batch_fluid, name, array)
+            for item, view in zip(fluids, views):
+                setattr(item, name, view)
+        for key in batch_fluid.property:
+            array, views = bind([item.property[key] for item in fluids])
+            batch_fluid.property[key] = array
+            for item, view in zip(fluids, views):
+                item.property[key] = view
+        batch_fluid.nodes = self.n_fluids * self.nodes
+        if hasattr(batch_fluid, 'array_shape_2d'):
+            batch_fluid.array_shape_2d = \
+                (batch_fluid.nodes,) + batch_fluid.array_shape_2d[1:]
+        for name in batch_fluid.PHASE_NAMES:
+            self.bind_arrays(getattr(batch_fluid, name),
+                             [getattr(item, name) for item in fluids])
+
+    def get_array(self, name):
+        """
+        Returns the node-based array (e.g. 'density' or 'gas.mole_fraction')
+        of the batch fluid with a leading fluid axis as view
+        """
+        array = attrgetter(name)(self.fluid)
+        array = array.reshape(array.shape[:-1] + (self.n_fluids, self.nodes))
+        return np.moveaxis(array, -2, 0)
+
+    def update(self, temperature, pressure, mole_composition=None,
+               *args, **kwargs):
+        """
+        Updates all fluids with the provided arrays with a leading fluid axis
+        :param temperature: 2D array (fluids x nodes)
+        :param pressure: 2D array (fluids x nodes)
+        :param mole_composition: 3D array (fluids x species x nodes)
+        """
+        temperature = np.reshape(temperature, -1)
+        pressure = np.reshape(pressure, -1)
+        if mole_composition is not None:
+            mole_composition = np.moveaxis(mole_composition, 0, 1)
+            mole_composition = \
+                np.reshape(mole_composition, (mole_composition.shape[0], -1))
+        self.fluid.update(temperature, pressure, mole_composition,
+                          *args, **kwargs)
+
+
 def liquid_factory(nx, name, liquid_props, temperature, pressure):
     if isinstance(liquid_props, species.ConstantProperties):
         return ConstantFluid(nx, name, liquid_props, temperature, pressure)
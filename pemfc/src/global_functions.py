@@ -44,36 +44,31 @@ def fill_transposed(in_array, shape):
     return transposed_array.transpose()
 
 
-def add_source(var, source, direction=1, tri_mtx=None):
+def add_source(var, source, direction=1):
     """
-    Add discrete 1d source of length n-1 to var of length n
-    :param var: 1d array of quantity variable
-    :param source: 1d array of source to add to var
+    Add discrete 1d source of length n-1 to var of length n along the last
+    axis, leading axes (e.g. species or channels) are processed row-wise
+    :param var: array of quantity variable, last axis: nodes
+    :param source: array of source to add to var, last axis: elements
     :param direction: flow direction (1: along array counter, -1: opposite to
-    array counter)
-    :param tri_mtx: if triangle matrix (2D array, nxn) is not provided,
-    it will be created temporarily
+    array counter) or 1d array of row-wise flow directions for the first axis
     :return:
     """
-    n = len(var) - 1
-    if len(source) != n:
+    if source.shape[-1] != var.shape[-1] - 1:
         raise ValueError('parameter source must be of length (var-1)')
-    if direction == 1:
-        if tri_mtx is None:
-            ones = np.zeros((n, n))
-            ones.fill(1.0)
-            fwd_mat = np.tril(ones)
-        else:
-            fwd_mat = tri_mtx
-        var[1:] += np.matmul(fwd_mat, source)
+    if np.ndim(direction) > 0:
+        direction = np.asarray(direction)
+        if not np.all(np.isin(direction, (-1, 1))):
+            raise ValueError('parameter direction must be either 1 or -1')
+        for value in (1, -1):
+            rows = direction == value
+            if np.any(rows):
+                var[rows] = add_source(var[rows], source[rows], value)
+    elif direction == 1:
+        var[..., 1:] += np.cumsum(source, axis=-1)
     elif direction == -1:
-        if tri_mtx is None:
-            ones = np.zeros((n, n))
-            ones.fill(1.0)
-            bwd_mat = np.triu(ones)
-        else:
-            bwd_mat = tri_mtx
-        var[:-1] += np.matmul(bwd_mat, source)
+        var[..., :-1] += \
+            np.flip(np.cumsum(np.flip(source, axis=-1), axis=-1), axis=-1)
     else:
         raise ValueError('parameter direction must be either 1 or -1')
     return var
@@ -161,44 +156,61 @@ def construct_empty_stack_array(cell_array, n_cells):
 
 def calc_temp_heat_transfer(wall_temp, fluid_temp, capacity_rate, heat_coeff,
                             flow_direction):
+    """
+    Calculates the fluid temperatures and the heat transfer for the
+    element-wise wall temperatures of a single channel (1D arrays with scalar
+    flow direction) or several channels (2D arrays, rows: channels, with
+    row-wise flow directions). The sequential loop along the flow path is
+    vectorized across the rows, fluid_temp is updated in place.
+    """
     wall_temp = np.asarray(wall_temp)
     fluid_temp = np.asarray(fluid_temp)
     capacity_rate = np.asarray(capacity_rate)
     heat_coeff = np.asarray(heat_coeff)
     assert capacity_rate.shape == wall_temp.shape
     assert heat_coeff.shape == wall_temp.shape
-    fluid_temp_avg = np.asarray(fluid_temp[:-1] + fluid_temp[1:]) * .5
-    id_range = range(len(wall_temp))
-    if flow_direction == -1:
-        id_range = reversed(id_range)
-    for i in id_range:
-        fluid_avg = fluid_temp_avg[i]
-        fluid_out_old = 5e5
-        error = 1e3
-        iter = 0
-        itermax = 10
-        while error > 1e-4 and iter <= itermax:
-            if flow_direction == -1:
-                fluid_in = fluid_temp[i + 1]
-            else:
-                fluid_in = fluid_temp[i]
-            delta_temp = wall_temp[i] - fluid_avg
-            q = heat_coeff[i] * delta_temp
-            fluid_out = fluid_in + q / capacity_rate[i]
-            if fluid_in < wall_temp[i]:
-                fluid_out = np.minimum(wall_temp[i] - 1e-3, fluid_out)
-            else:
-                fluid_out = np.maximum(wall_temp[i] + 1e-3, fluid_out)
-            fluid_avg = (fluid_in + fluid_out) * 0.5
+    if wall_temp.ndim == 1:
+        fluid_temp_2d, heat = \
+            calc_temp_heat_transfer(wall_temp[None], fluid_temp[None],
+                                    capacity_rate[None], heat_coeff[None],
+                                    np.atleast_1d(flow_direction))
+        return fluid_temp_2d[0], heat[0]
+    # sort all rows along their flow direction
+    bwd = (np.asarray(flow_direction) == -1)[:, None]
+    wall_temp_f = np.where(bwd, wall_temp[:, ::-1], wall_temp)
+    fluid_temp_f = np.where(bwd, fluid_temp[:, ::-1], fluid_temp)
+    capacity_rate_f = np.where(bwd, capacity_rate[:, ::-1], capacity_rate)
+    heat_coeff_f = np.where(bwd, heat_coeff[:, ::-1], heat_coeff)
+    fluid_temp_avg = (fluid_temp_f[:, :-1] + fluid_temp_f[:, 1:]) * .5
+    itermax = 10
+    for i in range(wall_temp_f.shape[-1]):
+        fluid_in = fluid_temp_f[:, i]
+        wall = wall_temp_f[:, i]
+        fluid_avg = fluid_temp_avg[:, i]
+        fluid_out = np.zeros(fluid_in.shape)
+        fluid_out_old = np.full(fluid_in.shape, 5e5)
+        active = np.ones(fluid_in.shape, dtype=bool)
+        for j in range(itermax + 1):
+            delta_temp = wall - fluid_avg
+            q = heat_coeff_f[:, i] * delta_temp
+            fluid_out_new = fluid_in + q / capacity_rate_f[:, i]
+            fluid_out_new = \
+                np.where(fluid_in < wall,
+                         np.minimum(wall - 1e-3, fluid_out_new),
+                         np.maximum(wall + 1e-3, fluid_out_new))
+            fluid_out = np.where(active, fluid_out_new, fluid_out)
+            fluid_avg = np.where(active, (fluid_in + fluid_out) * 0.5,
+                                 fluid_avg)
             error = np.abs(fluid_out_old - fluid_out) / fluid_out
-            fluid_out_old = np.copy(fluid_out)
-            iter += 1
-        if flow_direction == -1:
-            fluid_temp[i] = fluid_out
-        else:
-            fluid_temp[i + 1] = fluid_out
-    fluid_temp_avg = np.asarray(fluid_temp[:-1] + fluid_temp[1:]) * .5
-    heat = heat_coeff * (wall_temp - fluid_temp_avg)
+            fluid_out_old[:] = fluid_out
+            active &= error > 1e-4
+            if not np.any(active):
+                break
+        fluid_temp_f[:, i + 1] = fluid_out
+    fluid_temp_avg = (fluid_temp_f[:, :-1] + fluid_temp_f[:, 1:]) * .5
+    heat = heat_coeff_f * (wall_temp_f - fluid_temp_avg)
+    fluid_temp[:] = np.where(bwd, fluid_temp_f[:, ::-1], fluid_temp_f)
+    heat = np.where(bwd, heat[:, ::-1], heat)
     return fluid_temp, heat
 
 
@@ -0,0 +1,151 @@
+# general imports
+import copy
+import numpy as np
+
+# local module imports
+from . import reduced_order
+
+
+def interpolate_channel(values, x, x_new):
+    """
+    Linear interpolation of values along the channel axis (last axis),
+    constant extrapolation beyond the outer positions
+    :param values: array with the values at the positions x as last axis
+    :param x: positions of the values along the channel
+    :param x_new: positions to interpolate the values at
+    :return: array with the interpolated values as last axis
+    """
+    result = reduced_order.interpolate_cells(
+        np.moveaxis(np.asarray(values), -1, 0), x, x_new)
+    return np.moveaxis(result, 0, -1)
+
+
+def prolongate_channel(values, x, x_new, extensive=False):
+    """
+    Interpolates node or element values (last axis) of a channel with the
+    node coordinates x to a channel with the node coordinates x_new.
+    Extensive element values (e.g. sources) are interpolated per length and
+    scaled with the new element lengths.
+    """
+    if np.shape(values)[-1] == len(x):
+        return interpolate_channel(values, x, x_new)
+    dx = np.diff(x)
+    dx_new = np.diff(x_new)
+    if extensive:
+        values = values / dx
+    values = interpolate_channel(values, 0.5 * (x[:-1] + x[1:]),
+                                 0.5 * (x_new[:-1] + x_new[1:]))
+    if extensive:
+        values *= dx_new
+    return values
+
+
+def set_nodes(settings, n_nodes):
+    """
+    Sets the number of nodes along the channel axis in all sub-dictionaries
+    of the settings tree
+    """
+    for key, value in settings.items():
+        if key == 'nodes':
+            settings[key] = n_nodes
+        elif isinstance(value, dict):
+            set_nodes(value, n_nodes)
+
+
+class GridSequence:
+    """
+    Sequence of discretizations of the flow channels for the coarse-to-fine
+    solution of an operating point (grid sequencing). The coarse levels
+    reduce the number of elements by the coarsening factor from level to
+    level and are converged to a looser criterion, each finer level starts
+    from the solution of the previous level interpolated along the channels.
+    The low-frequency errors of the initial distributions are thereby
+    removed on the cheap coarse levels.
+    """
+    def __init__(self, grid_dict, n_nodes):
+        n_levels = max(int(grid_dict.get('levels', 2)), 1)
+        # number of levels including the target discretization
+        factor = max(grid_dict.get('coarsening_factor', 2.0), 1.0)
+        # ratio of the number of elements of consecutive levels
+        self.min_elements = max(int(grid_dict.get('minimum_elements', 5)), 1)
+        # minimum number of elements of the coarsest level
+        self.criteria = grid_dict.get('iteration_criteria', None)
+        # convergence criteria of the coarse levels (None: criteria of the
+        # target level)
+        n_ele = n_nodes - 1
+        elements = \
+            [max(int(round(n_ele / factor ** i)), self.min_elements)
+             for i in range(n_levels - 1, 0, -1)]
+        self.n_nodes = sorted(set(n + 1 for n in elements
+                                  if n < n_ele)) + [n_nodes]
+        # number of nodes of the levels from coarse to fine
+        self.iterations = []
+        # number of iterations of each level for each operating point
+
+    @property
+    def n_levels(self):
+        return len(self.n_nodes)
+
+    def remove_levels(self, levels):
+        """
+        Removes the provided coarse levels from the sequence
+        """
+        self.n_nodes = [n_nodes for level, n_nodes in enumerate(self.n_nodes)
+                        if level not in levels or level == self.n_levels - 1]
+
+    @staticmethod
+    def get_stack_settings(settings, n_nodes):
+        """
+        Returns a copy of the settings for the stack with the provided
+        number of nodes along the channels
+        """
+        settings = copy.deepcopy(settings)
+        set_nodes(settings, n_nodes)
+        return settings
+
+    @staticmethod
+    def prolongate_state(coarse_stack, fine_stack):
+        """
+        Initializes the fine stack with the solution of the coarse stack
+        (current density, layer temperatures, channel and flow circuit
+        variables) interpolated along the channels, the element values of
+        the channels are extensive (sources, heat). The manifold and flow
+        distribution variables along the stack axis are copied.
+        """
+        x = coarse_stack.cells[0].cathode.channel.x
+        x_new = fine_stack.cells[0].cathode.channel.x
+        temp_sys = fine_stack.temp_sys
+        temp_sys.set_layer_temperatures(
+            prolongate_channel(coarse_stack.cell_arrays.temp_layer,
+                               x, x_new))
+        fine_stack.set_state(
+            {'i_cd': prolongate_channel(coarse_stack.i_cd, x, x_new),
+             'temp_layer_vec': np.copy(temp_sys.temp_layer_vec),
+             'channel_mass_flow':
+                 [circuit.channel_mass_flow
+                  for circuit in coarse_stack.flow_circuits
+                  if circuit is not None]})
+        if not fine_stack.current_control:
+            fine_stack.v_stack = coarse_stack.v_stack
+        circuits = zip(coarse_stack.flow_circuits, fine_stack.flow_circuits)
+        for coarse_circuit, fine_circuit in circuits:
+            if coarse_circuit is None:
+                continue
+            for name in fine_stack.circuit_state_names:
+                value = getattr(coarse_circuit, name, None)
+                if isinstance(value, np.ndarray) and value.shape \
+                        == np.shape(getattr(fine_circuit, name, None)):
+                    getattr(fine_circuit, name)[:] = value
+        channels = zip(coarse_stack.get_state_channels(),
+                       fine_stack.get_state_channels())
+        for (prefix, coarse_channel), (_, fine_channel) in channels:
+            for name in fine_stack.channel_state_names:
+                value = getattr(coarse_channel, name, None)
+                if not isinstance(value, np.ndarray):
+                    continue
+                if coarse_channel.n_nodes != fine_channel.n_nodes:
+                    value = prolongate_channel(value, coarse_channel.x,
+                                               fine_channel.x,
+                                               extensive=True)
+                getattr(fine_channel, name)[:] = value
+            fine_stack.update_channel_fluid(fine_channel)
@@ -5,7 +5,8 @@ from scipy import optimize
 
 # local module imports
 from . import interpolation as ip, layers as layers, constants, \
-    global_functions as g_func, fluid as fluids, flow_field as ff
+    global_functions as g_func, fluid as fluids, flow_field as ff, \
+    workspace as ws
 
 warnings.filterwarnings("ignore")
 
@@ -15,8 +16,13 @@ class HalfCell:
     # Class variables constant across all instances of the class
     # (under construction)
 
-    def __init__(self, halfcell_dict, cell_dict, channel, number=None):
+    def __init__(self, halfcell_dict, cell_dict, channel, number=None,
+                 workspace=None):
         self.number = number
+        if workspace is None:
+            workspace = ws.Workspace()
+        self.workspace = workspace
+        # pool of preallocated temporary arrays (shared within the stack)
         self.name = halfcell_dict['name']
         self.n_nodes = channel.n_nodes
         n_ele = self.n_nodes - 1
@@ -144,18 +150,9 @@ class HalfCell:
         self.i_star = self.prot_con_cl * self.tafel_slope / self.th_cl
         # characteristic current density, see (Kulikovsky, 2013)
 
-        # concentration at channel inlet
-        self.conc_in = None
-
-        # limiting current density due to diffusion through the gdl
-        # at channel inlet (calculated when inlet concentration is known)
-        self.i_lim_star = None
         # numerical parameter for tangent line extension at limiting current
         self.conc_eps = halfcell_dict['c_eps']
         self.delta_i = halfcell_dict['delta_i']
-        # critical local current density where Kulikovsky model transitions
-        # into linear tangent line near limiting current
-        self.i_crit = np.zeros(n_ele)
 
         # self.v_loss_act = np.zeros(n_ele)
         # # activation voltage loss
@@ -207,11 +204,9 @@ class HalfCell:
             self.update_voltage_loss(corrected_current_density)
 
             # calculate stoichiometry
-            current = np.sum(current_density * self.flow_field.active_area_dx)
-            self.inlet_stoi = \
-                self.channel.mole_flow[self.id_fuel, self.channel.id_in] \
-                * self.faraday * self.n_charge \
-                / (current * abs(self.n_stoi[self.id_fuel]))
+            self.inlet_stoi = self.calc_inlet_stoichiometry(
+                current_density,
+                self.channel.mole_flow[self.id_fuel, self.channel.id_in])
             if current_control and self.inlet_stoi < 1.0:
                 raise ValueError('stoichiometry of cell {0} '
                                  'becomes smaller than one: {1:0.3f}'
@@ -262,22 +257,50 @@ class HalfCell:
         mass_flow_in = mole_flow_in * self.channel.fluid.species.mw
         return mass_flow_in, mole_flow_in
 
-    def calc_mass_source(self, current_density):
-        mole_source = np.zeros((self.channel.fluid.n_species, self.n_ele))
-
-        for i in range(len(mole_source)):
-            mole_source[i] = \
-                current_density * self.flow_field.active_area_dx \
+    def calc_mass_source(self, current_density, active_area_dx=None,
+                         w_cross_flow=None, flow_direction=None):
+        """
+        Calculates the mass and mole sources of the species in the channel
+        (species x elements). The current density and the optional element
+        properties may have a leading cell axis to calculate the sources of
+        several identical half cells at once (cells x species x elements).
+        """
+        if active_area_dx is None:
+            active_area_dx = self.flow_field.active_area_dx
+        if w_cross_flow is None:
+            w_cross_flow = self.w_cross_flow
+        if flow_direction is None:
+            flow_direction = self.channel.flow_direction
+        shape = np.shape(current_density)[:-1] \
+            + (self.channel.fluid.n_species, self.n_ele)
+        mole_source = self.workspace.empty((id(self), 'mole source'), shape)
+        mass_source = self.workspace.empty((id(self), 'mass source'), shape)
+
+        for i in range(shape[-2]):
+            mole_source[..., i, :] = \
+                current_density * active_area_dx \
                 * self.n_stoi[i] / (self.n_charge * self.faraday)
 
         # water cross flow
-        mole_source[self.id_h2o] += \
-            self.flow_field.active_area_dx * self.w_cross_flow \
-            * self.channel.flow_direction
-        mass_source = (mole_source.transpose()
-                       * self.channel.fluid.species.mw).transpose()
+        mole_source[..., self.id_h2o, :] += \
+            active_area_dx * w_cross_flow * flow_direction
+        np.multiply(mole_source, self.channel.fluid.species.mw[:, None],
+                    out=mass_source)
         return mass_source, mole_source
 
+    def calc_inlet_stoichiometry(self, current_density, mole_flow_in,
+                                 active_area_dx=None):
+        """
+        Calculates the stoichiometry of the reactant at the channel inlet
+        from the inlet mole flow of the reactant, optionally for several
+        cells with a leading cell axis of the current density
+        """
+        if active_area_dx is None:
+            active_area_dx = self.flow_field.active_area_dx
+        current = np.sum(current_density * active_area_dx, axis=-1)
+        return mole_flow_in * self.faraday * self.n_charge \
+            / (current * abs(self.n_stoi[self.id_fuel]))
+
     def calc_fuel_flow(self, current_density, stoi=None):
         """
         Calculates the reactant molar flow [mol/s]
@@ -321,9 +344,14 @@ class HalfCell:
             + self.calc_plate_loss(current_density)
         self.updated_v_loss = True
 
-    def calc_plate_loss(self, current_density):
-        current = current_density * self.flow_field.active_area_dx
-        v_loss_bpp = current / self.bpp.electrical_conductance[0]
+    def calc_plate_loss(self, current_density, active_area_dx=None,
+                        conductance=None):
+        if active_area_dx is None:
+            active_area_dx = self.flow_field.active_area_dx
+        if conductance is None:
+            conductance = self.bpp.electrical_conductance[0]
+        current = current_density * active_area_dx
+        v_loss_bpp = current / conductance
         # self.v_loss_bpp[:] = current / self.bpp.electrical_conductance[0]
         return v_loss_bpp
 
@@ -386,58 +414,57 @@ class HalfCell:
         #     v_loss_gdl_diff[np.argwhere(nan_list)[0, 0]:] = 1.e50
         return v_loss_gdl_diff
 
-    def calc_electrode_loss(self, current_density):
-        conc = self.channel.fluid.gas.concentration[self.id_fuel]
-        conc_ele = ip.interpolate_1d(conc)
-        conc_ref = conc[self.channel.id_in]
-        conc_star = conc_ele / conc_ref
-        # if self.channel.flow_direction == 1:
-        #     conc_in = conc[:-1]
-        # else:
-        #     conc_in = conc[1:]
-        conc_in = conc[self.channel.id_in]
-        if conc_in != self.conc_in:
-            self.i_lim_star = self.n_charge * self.faraday * conc_in \
-                              * self.diff_coeff_gdl / self.th_gdl
-            self.conc_in = conc_in
-        self.i_crit[:] = self.i_lim_star * (conc_ele - self.conc_eps) / conc_ref
-        id_lin = np.argwhere(current_density >= self.i_crit)
-        id_reg = np.argwhere(current_density < self.i_crit)
-        if len(id_lin) > 0:
-            i_crit = self.i_crit[id_lin][0]
-            conc_crit = conc_ele[id_lin][0]
-            conc_crit = \
-                np.vstack((conc_crit, conc_crit, conc_crit))
-            i_crit = np.vstack(
-                (i_crit - self.delta_i, i_crit, i_crit + self.delta_i))
-            conc_crit = conc_crit.transpose()
-            i_crit = i_crit.transpose()
-            eta_crit = \
-                self.calc_electrode_loss_kulikovsky(i_crit, conc_crit, conc_ref,
-                                                    update_members=False)
-            grad_eta = np.gradient(eta_crit, self.delta_i, axis=-1)[:, 1]
-            b = eta_crit[:, 1] - grad_eta * i_crit[:, 1]
-            eta_lin = grad_eta * current_density[id_lin] + b
-            eta_reg = \
-                self.calc_electrode_loss_kulikovsky(current_density[id_reg],
-                                                    conc_ele[id_reg], conc_ref,
-                                                    update_members=False)
-            eta = np.zeros(self.n_ele)
-            eta[id_lin] = eta_lin
-            eta[id_reg] = eta_reg
-            return eta
-        else:
-            return self.calc_electrode_loss_kulikovsky(current_density,
-                                                       conc_ele,
-                                                       conc_ref)
+    def calc_electrode_loss(self, current_density, conc=None, id_in=None):
+        """
+        Calculates the electrode voltage losses from the reactant
+        concentration at the nodes of the channel. Beyond the critical
+        current density the losses are extrapolated linearly from the first
+        critical element. The current density and the concentration may have
+        a leading cell axis together with the inlet node ids of the cells to
+        calculate the losses of several identical half cells at once.
+        """
+        if conc is None:
+            conc = self.channel.fluid.gas.concentration[self.id_fuel]
+            id_in = self.channel.id_in
+        shape = np.shape(current_density)
+        current_density = np.reshape(current_density, (-1, shape[-1]))
+        conc = np.reshape(conc, (-1, np.shape(conc)[-1]))
+        rows = np.arange(len(conc))
+        conc_ele = ip.interpolate_along_axis(conc, axis=-1)
+        conc_ref = conc[rows, np.reshape(id_in, -1)][:, None]
+        i_lim_star = self.n_charge * self.faraday * conc_ref \
+            * self.diff_coeff_gdl / self.th_gdl
+        i_crit = i_lim_star * (conc_ele - self.conc_eps) / conc_ref
+        linear = current_density >= i_crit
+        regular = np.logical_not(linear)
+        eta = np.zeros(current_density.shape)
+        eta[regular] = self.calc_electrode_loss_kulikovsky(
+            current_density[regular], conc_ele[regular],
+            np.broadcast_to(conc_ref, eta.shape)[regular],
+            i_lim_star=np.broadcast_to(i_lim_star, eta.shape)[regular])
+        ids = np.flatnonzero(np.any(linear, axis=-1))
+        if len(ids) > 0:
+            first = np.argmax(linear[ids], axis=-1)
+            i_crit = i_crit[ids, first]
+            i_crit = np.stack((i_crit - self.delta_i, i_crit,
+                               i_crit + self.delta_i), axis=-1)
+            conc_crit = np.repeat(conc_ele[ids, first][:, None], 3, axis=-1)
+            eta_crit = self.calc_electrode_loss_kulikovsky(
+                i_crit, conc_crit, conc_ref[ids], i_lim_star=i_lim_star[ids])
+            grad_eta = np.gradient(eta_crit, self.delta_i, axis=-1)[:, 1:2]
+            b = eta_crit[:, 1:2] - grad_eta * i_crit[:, 1:2]
+            eta_lin = grad_eta * current_density[ids] + b
+            eta[ids] = np.where(linear[ids], eta_lin, eta[ids])
+        return eta.reshape(shape)
 
     def calc_electrode_loss_kulikovsky(self, current_density, conc, conc_ref,
-                                       update_members=True):
+                                       i_lim_star):
         """
-        Calculates the full voltage losses of the electrode
+        Calculates the full voltage losses of the electrode with the
+        limiting current density at the channel inlet (Kulikovsky, 2013)
         """
         conc_star = conc / conc_ref
-        var = 1. - current_density / (self.i_lim_star * conc_star)
+        var = 1. - current_density / (i_lim_star * conc_star)
         # var = np.where(var0 < 1e-4, 1e-4, var0)
         v_loss = np.zeros(current_density.shape)
         if self.calc_act_loss:
@@ -0,0 +1,715 @@
+# general imports
+import inspect
+import numpy as np
+from abc import ABC, abstractmethod
+from scipy import linalg as sp_la
+from scipy import sparse
+from scipy.sparse import linalg as sp_linalg
+
+# local module imports
+from . import parallel
+
+# keyword of the relative tolerance of the iterative solvers, renamed from
+# tol to rtol in SciPy 1.12
+RTOL_KEYWORD = \
+    'rtol' if 'rtol' in inspect.signature(sp_linalg.cg).parameters else 'tol'
+
+
+class LinearSolver(ABC):
+    """
+    Base class for the solution of the sparse linear systems A x = b of the
+    stack (temperatures, electrical potentials), which are solved once in
+    each outer iteration. The sparsity pattern of A is constant and its
+    values change only slightly between the outer iterations, so that
+    orderings, factorizations and preconditioners can be reused.
+    """
+    def __init__(self, solver_dict):
+        self.n_solutions = 0
+        # number of solved systems
+        self.n_factorizations = 0
+        # number of computed factorizations or preconditioners
+        self.x = None
+        # solution of the previous system
+        self.residual = None
+        # residual of the previous outer iteration (None: first iteration of
+        # an operating point), set by the stack before each update
+
+    def reset(self):
+        """
+        Discards the reused data, e.g. after a change of the sparsity pattern
+        """
+        self.x = None
+
+    def solve(self, matrix, rhs):
+        x = self.calc_solution(matrix, rhs)
+        self.n_solutions += 1
+        self.x = np.copy(x)
+        return x
+
+    @abstractmethod
+    def calc_solution(self, matrix, rhs):
+        pass
+
+
+class SparseDirectSolver(LinearSolver):
+    """
+    SciPy sparse direct solver (spsolve), which computes the ordering and the
+    factorization of the matrix anew for each system
+    """
+    def calc_solution(self, matrix, rhs):
+        self.n_factorizations += 1
+        return sp_linalg.spsolve(matrix, rhs)
+
+
+class LUSolver(LinearSolver):
+    """
+    Sparse LU factorization (SuperLU). The fill-reducing column ordering of
+    the first factorization is reused for all following factorizations
+    (symbolic reuse). A factorization is reused for the given number of
+    systems, the solutions with an outdated factorization are corrected by
+    iterative refinement with the current matrix. If the refinement does not
+    reach the tolerance, the matrix is factorized anew.
+    """
+    def __init__(self, solver_dict):
+        super().__init__(solver_dict)
+        self.refactor_interval = \
+            max(int(solver_dict.get('refactor_interval', 1)), 1)
+        # number of systems solved with the same factorization
+        self.tolerance = solver_dict.get('tolerance', [1e-10, 1e-6])[0]
+        # relative residual of the solutions with outdated factorization
+        self.max_refinements = solver_dict.get('max_refinements', 10)
+        # maximum number of refinement steps
+        self.column_ids = None
+        # reused column permutation
+        self.lu = None
+        self.permuted = False
+        # True if the factorization is of the column-permuted matrix
+        self.age = 0
+        # number of systems solved with the current factorization
+
+    def reset(self):
+        super().reset()
+        self.column_ids = None
+        self.lu = None
+
+    def factorize(self, matrix):
+        matrix = sparse.csc_matrix(matrix)
+        if self.column_ids is None or len(self.column_ids) != matrix.shape[1]:
+            self.lu = sp_linalg.splu(matrix, permc_spec='COLAMD')
+            self.column_ids = np.argsort(self.lu.perm_c)
+            self.permuted = False
+        else:
+            self.lu = sp_linalg.splu(matrix[:, self.column_ids],
+                                     permc_spec='NATURAL')
+            self.permuted = True
+        self.age = 0
+        self.n_factorizations += 1
+
+    def lu_solve(self, rhs):
+        if not self.permuted:
+            return self.lu.solve(rhs)
+        x = np.empty_like(rhs)
+        x[self.column_ids] = self.lu.solve(rhs)
+        return x
+
+    def calc_solution(self, matrix, rhs):
+        if self.lu is None or self.age >= self.refactor_interval \
+                or self.lu.shape != matrix.shape:
+            self.factorize(matrix)
+            self.age += 1
+            return self.lu_solve(rhs)
+        self.age += 1
+        x = self.lu_solve(rhs)
+        rhs_norm = max(np.linalg.norm(rhs), np.finfo(float).tiny)
+        for i in range(self.max_refinements):
+            residual = rhs - matrix @ x
+            if np.linalg.norm(residual) <= self.tolerance * rhs_norm:
+                return x
+            x += self.lu_solve(residual)
+        self.factorize(matrix)
+        self.age += 1
+        return self.lu_solve(rhs)
+
+
+def position_matrix(matrix):
+    """
+    Returns a matrix with the sparsity pattern of the provided CSR matrix and
+    the positions of the entries in its data array (starting at one) as
+    values, the positions of the entries of any sub-matrix are obtained by
+    slicing this matrix
+    """
+    return sparse.csr_matrix(
+        (np.arange(1, matrix.nnz + 1, dtype=float),
+         matrix.indices, matrix.indptr), shape=matrix.shape)
+
+
+def data_index(block):
+    """
+    Returns the positions of the entries of a sliced position matrix in the
+    data array of the original matrix
+    """
+    return block.data.astype(np.int64) - 1
+
+
+def sorted_csr(matrix):
+    """
+    Returns the matrix in CSR format with sorted indices
+    """
+    matrix = sparse.csr_matrix(matrix)
+    if not matrix.has_sorted_indices:
+        matrix = matrix.sorted_indices()
+    return matrix
+
+
+class BandedLU:
+    """
+    LU factorization of a banded matrix (LAPACK gbtrf) from its band
+    storage with the entry (i, j) in the row n_lower + n_upper + i - j
+    """
+    def __init__(self, band, n_lower, n_upper):
+        self.shape = (band.shape[1], band.shape[1])
+        self.n_lower = n_lower
+        self.n_upper = n_upper
+        self.lu, self.pivots, info = \
+            sp_la.lapack.dgbtrf(band, n_lower, n_upper)
+        if info > 0:
+            raise np.linalg.LinAlgError('singular matrix')
+
+    def solve(self, rhs):
+        x, info = sp_la.lapack.dgbtrs(self.lu, self.n_lower, self.n_upper,
+                                      rhs, self.pivots)
+        return x
+
+
+class BlockTridiagonalLU:
+    """
+    Block LU factorization of a block-tridiagonal matrix (block Thomas
+    algorithm) from the factorizations of the diagonal blocks and the
+    coupling blocks, which are given as dense arrays of their coupled rows
+    and columns (rows, cols, values). The Schur complement of the preceding
+    blocks only changes a block in the coupled rows and columns, it is
+    included by the Sherman-Morrison-Woodbury formula with a small dense
+    correction matrix instead of being added to the diagonal block, so that
+    the (banded) factorizations of the diagonal blocks are not filled in.
+    The storage and the effort of the factorization and of the solution
+    grow linearly with the number of blocks.
+    """
+    def __init__(self, diagonal, lower, upper):
+        self.n_blocks = len(diagonal)
+        self.offsets = np.cumsum([0] + [block.shape[0] for block in diagonal])
+        self.shape = (self.offsets[-1], self.offsets[-1])
+        self.lu = diagonal
+        # factorizations of the diagonal blocks
+        self.lower = lower
+        # coupling blocks (i + 1, i)
+        self.upper = upper
+        # coupling blocks (i, i + 1)
+        self.correction = []
+        # dense Woodbury correction matrices (I - M P_c^T D^-1 P_r)^-1 M of
+        # the Schur complements D - P_r M P_c^T of the diagonal blocks
+        coupling = None
+        for i in range(self.n_blocks):
+            coupling = self.factorize_block(i, coupling)
+
+    def factorize_block(self, i, coupling):
+        """
+        Calculates the Woodbury correction matrix of block i from the Schur
+        complement coupling M and returns the coupling of the following
+        block. The solutions of the diagonal
+        block with the unit vectors of the coupled rows (basis of the
+        Woodbury formula) and with the upper coupling block are calculated
+        together.
+        """
+        n_rows = self.lu[i].shape[0]
+        rows = self.lower[i - 1][0] if i > 0 else np.zeros(0, dtype=int)
+        cols = self.upper[i - 1][1] if i > 0 else np.zeros(0, dtype=int)
+        rhs = np.zeros((n_rows, len(rows)))
+        rhs[rows, np.arange(len(rows))] = 1.0
+        if i < self.n_blocks - 1:
+            upper_rows, upper_cols, upper_values = self.upper[i]
+            upper = np.zeros((n_rows, len(upper_cols)))
+            upper[upper_rows] = upper_values
+            rhs = np.hstack((rhs, upper))
+        if rhs.shape[1] > 0:
+            solution = self.lu[i].solve(rhs)
+        else:
+            solution = rhs
+        basis = solution[:, :len(rows)]
+        if len(rows) > 0 and len(cols) > 0:
+            self.correction.append(np.linalg.solve(
+                np.identity(len(rows)) - coupling @ basis[cols], coupling))
+        else:
+            self.correction.append(None)
+        if i == self.n_blocks - 1:
+            return None
+        # solution of the Schur complement of block i with the upper
+        # coupling block, only required in the columns of the following
+        # lower coupling block
+        _, lower_cols, lower_values = self.lower[i]
+        gain = solution[:, len(rows):]
+        if self.correction[i] is not None:
+            gain = gain[lower_cols] \
+                + basis[lower_cols] @ (self.correction[i] @ gain[cols])
+        else:
+            gain = gain[lower_cols]
+        return lower_values @ gain
+
+    def solve_block(self, i, rhs):
+        """
+        Solves the system of the Schur complement of block i,
+        (D - P_r M P_c^T) x = b, with the Woodbury formula
+        x = D^-1 (b + P_r (I - M P_c^T D^-1 P_r)^-1 M P_c^T D^-1 b)
+        """
+        x = self.lu[i].solve(rhs)
+        if self.correction[i] is None:
+            return x
+        rhs = np.array(rhs, dtype=float)
+        rhs[self.lower[i - 1][0]] += \
+            self.correction[i] @ x[self.upper[i - 1][1]]
+        return self.lu[i].solve(rhs)
+
+    def solve(self, rhs):
+        offsets = self.offsets
+        x = np.empty(self.shape[0])
+        # forward elimination
+        for i in range(self.n_blocks):
+            block_rhs = np.array(rhs[offsets[i]:offsets[i + 1]], dtype=float)
+            if i > 0:
+                rows, cols, values = self.lower[i - 1]
+                block_rhs[rows] -= values @ x[offsets[i - 1]:offsets[i]][cols]
+            x[offsets[i]:offsets[i + 1]] = self.solve_block(i, block_rhs)
+        # backward substitution
+        for i in range(self.n_blocks - 2, -1, -1):
+            rows, cols, values = self.upper[i]
+            block_rhs = np.zeros(offsets[i + 1] - offsets[i])
+            block_rhs[rows] = values @ x[offsets[i + 1]:offsets[i + 2]][cols]
+            x[offsets[i]:offsets[i + 1]] -= self.solve_block(i, block_rhs)
+        return x
+
+
+class BlockTridiagonalSolver(LUSolver):
+    """
+    Direct solver for block-tridiagonal matrices with banded diagonal blocks,
+    e.g. the temperature system of the stack, in which each cell is only
+    coupled to its neighbouring cells and the elements of a cell only to
+    their neighbouring elements along the channel. In contrast to a general
+    sparse LU factorization of the complete matrix, the factorization
+    follows the stack topology, so that the effort grows linearly with the
+    number of cells. The band storage of the diagonal blocks and the dense
+    coupling blocks are filled from the data array of the matrix with fixed
+    index arrays of the sparsity pattern. The factorizations are reused and
+    refined as in the LUSolver.
+    """
+    def __init__(self, solver_dict, block_sizes):
+        super().__init__(solver_dict)
+        self.offsets = np.cumsum([0] + list(block_sizes))
+        # start indices of the diagonal blocks
+        self.bands = None
+        # band storage and bandwidth of the diagonal blocks
+        self.lower = None
+        self.upper = None
+        # coupled rows, columns and dense values of the coupling blocks
+        self.fill_index = None
+        # arrays of the blocks with the flat positions of the entries and
+        # their positions in the data array of the matrix
+        self.nnz = None
+
+    def reset(self):
+        super().reset()
+        self.bands = None
+
+    def init_blocks(self, matrix):
+        """
+        Extracts the sparsity pattern of the blocks and the positions of
+        their entries in the data array of the matrix
+        """
+        if matrix.shape[0] != self.offsets[-1]:
+            raise ValueError('matrix size does not match the block sizes')
+        index = position_matrix(matrix)
+        offsets = self.offsets
+        n_blocks = len(offsets) - 1
+        ranges = [slice(offsets[i], offsets[i + 1]) for i in range(n_blocks)]
+        self.bands = []
+        self.lower = []
+        self.upper = []
+        self.fill_index = []
+        for i in range(n_blocks):
+            block = index[ranges[i], ranges[i]].tocoo()
+            n_band = int(np.max(np.abs(block.row - block.col), initial=0))
+            band = np.zeros((3 * n_band + 1, block.shape[1]))
+            flat_ids = np.ravel_multi_index(
+                (2 * n_band + block.row - block.col, block.col), band.shape)
+            self.bands.append((band, n_band))
+            self.fill_index.append((band, flat_ids, data_index(block)))
+            if i == n_blocks - 1:
+                break
+            for coupling, block in \
+                    ((self.lower, index[ranges[i + 1], ranges[i]]),
+                     (self.upper, index[ranges[i], ranges[i + 1]])):
+                block = block.tocoo()
+                rows = np.unique(block.row)
+                cols = np.unique(block.col)
+                values = np.zeros((len(rows), len(cols)))
+                flat_ids = np.ravel_multi_index(
+                    (np.searchsorted(rows, block.row),
+                     np.searchsorted(cols, block.col)), values.shape)
+                coupling.append((rows, cols, values))
+                self.fill_index.append((values, flat_ids, data_index(block)))
+        if sum(len(ids) for _, _, ids in self.fill_index) != matrix.nnz:
+            raise ValueError('matrix is not block-tridiagonal with the '
+                             'provided block sizes')
+        self.nnz = matrix.nnz
+
+    def factorize(self, matrix):
+        matrix = sorted_csr(matrix)
+        if self.bands is None or matrix.nnz != self.nnz:
+            self.init_blocks(matrix)
+        for values, flat_ids, ids in self.fill_index:
+            values.flat[flat_ids] = matrix.data[ids]
+        self.lu = BlockTridiagonalLU(
+            [BandedLU(band, n_band, n_band) for band, n_band in self.bands],
+            self.lower, self.upper)
+        self.permuted = False
+        self.age = 0
+        self.n_factorizations += 1
+
+
+class DomainDecompositionLU:
+    """
+    Factorization of a matrix, whose unknowns are partitioned into the
+    interior unknowns of subdomains and the separator unknowns between them
+    (non-overlapping domain decomposition). The interior systems of the
+    subdomains are only coupled by the separators, they are factorized and
+    solved independently and concurrently. The separator unknowns are solved
+    exactly from the sparse interface (Schur complement) system, so that
+    the solution equals the solution of the complete system.
+    """
+    def __init__(self, interior, separator, blocks, separator_matrix,
+                 thread_pool):
+        n_rows = sum(len(ids) for ids in interior) + len(separator)
+        self.shape = (n_rows, n_rows)
+        self.interior = interior
+        # interior unknowns of the subdomains
+        self.separator = separator
+        # separator unknowns
+        self.blocks = blocks
+        # interior matrix, interior-separator and separator-interior coupling
+        # matrices of the subdomains
+        self.thread_pool = thread_pool
+        results = thread_pool.map(self.factorize_subdomain, len(interior))
+        self.lu = [result[0] for result in results]
+        # factorizations of the interior matrices
+        rows, cols, values = [], [], []
+        for _, schur_rows, schur_cols, schur in results:
+            if schur is None:
+                continue
+            row_ids, col_ids = \
+                np.meshgrid(schur_rows, schur_cols, indexing='ij')
+            rows.append(row_ids.ravel())
+            cols.append(col_ids.ravel())
+            values.append(-schur.ravel())
+        self.interface_lu = None
+        # factorization of the interface system
+        if len(separator) > 0:
+            interface = separator_matrix
+            if values:
+                interface = interface + sparse.coo_matrix(
+                    (np.concatenate(values),
+                     (np.concatenate(rows), np.concatenate(cols))),
+                    shape=separator_matrix.shape)
+            self.interface_lu = sp_linalg.splu(sparse.csc_matrix(interface))
+
+    def factorize_subdomain(self, k):
+        """
+        Factorizes the interior matrix of subdomain k and calculates its
+        contribution to the interface system in the coupled separator rows
+        and columns
+        """
+        matrix, upper, lower = self.blocks[k]
+        lu = sp_linalg.splu(matrix)
+        cols = np.unique(upper.indices)
+        rows = np.flatnonzero(np.diff(lower.indptr))
+        if len(rows) == 0 or len(cols) == 0:
+            return lu, rows, cols, None
+        schur = lower[rows] @ lu.solve(upper[:, cols].toarray())
+        return lu, rows, cols, schur
+
+    def solve(self, rhs):
+        x = np.empty(self.shape[0])
+
+        def solve_interior(k):
+            return self.lu[k].solve(rhs[self.interior[k]])
+
+        solutions = self.thread_pool.map(solve_interior, len(self.interior))
+        if self.interface_lu is None:
+            for ids, solution in zip(self.interior, solutions):
+                x[ids] = solution
+            return x
+        interface_rhs = np.array(rhs[self.separator], dtype=float)
+        for (_, _, lower), solution in zip(self.blocks, solutions):
+            interface_rhs -= lower @ solution
+        x_separator = self.interface_lu.solve(interface_rhs)
+        x[self.separator] = x_separator
+
+        def correct_interior(k):
+            upper = self.blocks[k][1]
+            return self.lu[k].solve(
+                rhs[self.interior[k]] - upper @ x_separator)
+
+        solutions = self.thread_pool.map(correct_interior, len(self.interior))
+        for ids, solution in zip(self.interior, solutions):
+            x[ids] = solution
+        return x
+
+
+class DomainDecompositionSolver(LUSolver):
+    """
+    Direct solver for block-tridiagonal matrices, e.g. the temperature
+    system of the stack, by non-overlapping domain decomposition. The blocks
+    (cells) are partitioned into contiguous subdomains, the unknowns of the
+    last block of a subdomain coupled to the following subdomain are the
+    separators. The subdomains are factorized concurrently in the thread
+    pool, the interface system of the separators is solved exactly, so that
+    no additional outer iterations are required compared to the solution of
+    the complete system. The sub-matrices are filled from the data array of
+    the matrix with fixed index arrays of the sparsity pattern. The
+    factorizations are reused and refined as in the LUSolver.
+    """
+    def __init__(self, solver_dict, block_sizes, thread_pool=None):
+        super().__init__(solver_dict)
+        self.offsets = np.cumsum([0] + list(block_sizes))
+        # start indices of the blocks
+        if thread_pool is None:
+            thread_pool = parallel.PartitionedThreadPool(1)
+        self.thread_pool = thread_pool
+        n_subdomains = solver_dict.get('subdomains', None)
+        if n_subdomains is None:
+            n_subdomains = thread_pool.n_threads
+        self.n_subdomains = min(max(int(n_subdomains), 1), len(block_sizes))
+        # number of subdomains (default: number of threads)
+        self.interior = None
+        # interior unknowns of the subdomains
+        self.separator = None
+        # separator unknowns between the subdomains
+        self.blocks = None
+        # sub-matrices of the subdomains
+        self.separator_matrix = None
+        # sub-matrix of the separators
+        self.fill_index = None
+        # sub-matrices with the positions of their entries in the data array
+        # of the matrix
+        self.nnz = None
+
+    def reset(self):
+        super().reset()
+        self.blocks = None
+
+    def init_subdomains(self, matrix):
+        """
+        Partitions the unknowns into the interior unknowns of the subdomains
+        and the separators and extracts the sparsity patterns of the
+        sub-matrices and the positions of their entries in the data array of
+        the matrix
+        """
+        offsets = self.offsets
+        if matrix.shape[0] != offsets[-1]:
+            raise ValueError('matrix size does not match the block sizes')
+        index = position_matrix(matrix)
+        bounds = np.rint(np.linspace(0, len(offsets) - 1,
+                                     self.n_subdomains + 1)).astype(int)
+        separators = [np.zeros(0, dtype=int)]
+        for k in range(1, self.n_subdomains):
+            # unknowns of the last block of the subdomain coupled to the
+            # first block of the following subdomain
+            first, middle, last = offsets[bounds[k] - 1:bounds[k] + 2]
+            upper = index[first:middle, middle:last].tocoo()
+            lower = index[middle:last, first:middle].tocoo()
+            separators.append(first + np.union1d(upper.row, lower.col))
+        self.separator = np.concatenate(separators).astype(int)
+        is_separator = np.zeros(matrix.shape[0], dtype=bool)
+        is_separator[self.separator] = True
+        self.interior = []
+        self.blocks = []
+        self.fill_index = []
+        for k in range(self.n_subdomains):
+            ids = np.arange(offsets[bounds[k]], offsets[bounds[k + 1]])
+            ids = ids[~is_separator[ids]]
+            self.interior.append(ids)
+            rows = index[ids]
+            blocks = (rows[:, ids].tocsc(),
+                      rows[:, self.separator].tocsr(),
+                      index[self.separator][:, ids].tocsr())
+            self.blocks.append(blocks)
+            self.fill_index += [(block, data_index(block))
+                                for block in blocks]
+        self.separator_matrix = \
+            index[self.separator][:, self.separator].tocsr()
+        self.fill_index.append(
+            (self.separator_matrix, data_index(self.separator_matrix)))
+        if sum(len(ids) for _, ids in self.fill_index) != matrix.nnz:
+            raise ValueError('matrix is not block-tridiagonal with the '
+                             'provided block sizes')
+        self.nnz = matrix.nnz
+
+    def factorize(self, matrix):
+        matrix = sorted_csr(matrix)
+        if self.blocks is None or matrix.nnz != self.nnz:
+            self.init_subdomains(matrix)
+        for block, ids in self.fill_index:
+            block.data[:] = matrix.data[ids]
+        self.lu = DomainDecompositionLU(self.interior, self.separator,
+                                        self.blocks, self.separator_matrix,
+                                        self.thread_pool)
+        self.permuted = False
+        self.age = 0
+        self.n_factorizations += 1
+
+
+class IterativeSolver(LinearSolver):
+    """
+    Preconditioned Krylov solver (CG, BiCGStab, GMRES) started from the
+    solution of the previous system. The preconditioner (incomplete LU,
+    Jacobi or algebraic multigrid) is reused for the given number of
+    systems. The relative tolerance follows the residual of the previous
+    outer iteration (forcing factor, see Simulation.calc_convergence_criteria)
+    within the given limits, so that the linear systems are only solved as
+    accurately as required by the progress of the outer iteration. The
+    tolerance refers to the norm of the right hand side, which is dominated
+    by the absolute temperatures and potentials, so the maximum tolerance
+    must be well below the convergence criteria of the outer iteration. If
+    the solver does not converge, the system is solved with the sparse
+    direct solver.
+    """
+    METHODS = {'cg': sp_linalg.cg,
+               'bicgstab': sp_linalg.bicgstab,
+               'gmres': sp_linalg.gmres}
+
+    def __init__(self, solver_dict):
+        super().__init__(solver_dict)
+        method = solver_dict.get('type', 'bicgstab').lower()
+        if method not in self.METHODS:
+            raise NotImplementedError('iterative solver type must be either '
+                                      'cg, bicgstab, or gmres')
+        self.method = self.METHODS[method]
+        self.preconditioner_type = solver_dict.get('preconditioner', 'ilu')
+        if self.preconditioner_type is not None:
+            self.preconditioner_type = self.preconditioner_type.lower()
+        if self.preconditioner_type not in (None, 'none', 'ilu', 'jacobi',
+                                            'amg'):
+            raise NotImplementedError('preconditioner must be either None, '
+                                      'ilu, jacobi, or amg')
+        self.refactor_interval = \
+            max(int(solver_dict.get('refactor_interval', 1)), 1)
+        # number of systems solved with the same preconditioner
+        self.forcing_factor = solver_dict.get('forcing_factor', 1e-2)
+        # ratio of the relative tolerance to the residual of the previous
+        # outer iteration
+        self.tolerance = solver_dict.get('tolerance', [1e-10, 1e-8])
+        # minimum and maximum relative tolerance
+        self.max_iterations = solver_dict.get('maximum_iteration', 1000)
+        self.drop_tolerance = solver_dict.get('drop_tolerance', 1e-4)
+        self.fill_factor = solver_dict.get('fill_factor', 10.0)
+        # incomplete LU parameters
+        self.preconditioner = None
+        self.age = 0
+        # number of systems solved with the current preconditioner
+        self.n_iterations = 0
+        # total number of iterations
+        self.n_fallbacks = 0
+        # number of systems solved with the direct solver
+
+    def reset(self):
+        super().reset()
+        self.preconditioner = None
+
+    def create_preconditioner(self, matrix):
+        """
+        Returns the preconditioner as linear operator approximating the
+        inverse of the matrix
+        """
+        self.n_factorizations += 1
+        self.age = 0
+        if self.preconditioner_type in (None, 'none'):
+            return None
+        elif self.preconditioner_type == 'jacobi':
+            inv_diag = 1.0 / matrix.diagonal()
+            return sp_linalg.LinearOperator(matrix.shape,
+                                            lambda x: inv_diag * x)
+        elif self.preconditioner_type == 'ilu':
+            ilu = sp_linalg.spilu(sparse.csc_matrix(matrix),
+                                  drop_tol=self.drop_tolerance,
+                                  fill_factor=self.fill_factor)
+            return sp_linalg.LinearOperator(matrix.shape, ilu.solve)
+        else:
+            try:
+                import pyamg
+            except ImportError:
+                raise ImportError('package pyamg is required for the amg '
+                                  'preconditioner')
+            # multigrid hierarchy of the positive definite matrix, the
+            # conductance matrices are negative definite
+            sign = -1.0 if np.sum(matrix.diagonal()) < 0.0 else 1.0
+            amg = pyamg.smoothed_aggregation_solver(
+                sparse.csr_matrix(sign * matrix)).aspreconditioner()
+            return sp_linalg.LinearOperator(matrix.shape,
+                                            lambda x: sign * amg.matvec(x))
+
+    def calc_solution(self, matrix, rhs):
+        if self.x is not None and self.x.shape != rhs.shape:
+            self.reset()
+        if self.preconditioner is None or self.age >= self.refactor_interval:
+            self.preconditioner = self.create_preconditioner(matrix)
+        self.age += 1
+        if self.residual is None:
+            rtol = self.tolerance[0]
+        else:
+            rtol = min(max(self.forcing_factor * self.residual,
+                           self.tolerance[0]), self.tolerance[1])
+        iterations = [0]
+
+        def count(*args):
+            iterations[0] += 1
+
+        x, info = self.method(matrix, rhs, x0=self.x, atol=0.0,
+                              maxiter=self.max_iterations,
+                              M=self.preconditioner, callback=count,
+                              **{RTOL_KEYWORD: rtol})
+        self.n_iterations += iterations[0]
+        if info != 0 or not np.all(np.isfinite(x)):
+            x = sp_linalg.spsolve(matrix, rhs)
+            self.n_fallbacks += 1
+            self.preconditioner = None
+        return x
+
+
+def factory(solver_dict, block_sizes=None, thread_pool=None):
+    """
+    Returns the linear solver object according to the 'type' entry of the
+    provided dictionary (default: spsolve), the block-tridiagonal and the
+    domain decomposition solver require the sizes of the diagonal blocks,
+    the domain decomposition solver processes the subdomains in the
+    provided thread pool
+    """
+    solver_type = solver_dict.get('type', 'spsolve')
+    if solver_type is None or solver_type.lower() == 'spsolve':
+        return SparseDirectSolver(solver_dict)
+    elif solver_type.lower() == 'splu':
+        return LUSolver(solver_dict)
+    elif solver_type.lower() == 'block_tridiagonal':
+        if block_sizes is None:
+            raise ValueError('block sizes are required for the '
+                             'block-tridiagonal solver')
+        return BlockTridiagonalSolver(solver_dict, block_sizes)
+    elif solver_type.lower() == 'domain_decomposition':
+        if block_sizes is None:
+            raise ValueError('block sizes are required for the domain '
+                             'decomposition solver')
+        return DomainDecompositionSolver(solver_dict, block_sizes,
+                                         thread_pool)
+    elif solver_type.lower() in IterativeSolver.METHODS:
+        return IterativeSolver(solver_dict)
+    else:
+        raise NotImplementedError('linear solver type must be either '
+                                  'spsolve, splu, block_tridiagonal, '
+                                  'domain_decomposition, cg, bicgstab, or '
+                                  'gmres')
@@ -1,5 +1,6 @@
 import numpy as np
 from scipy import linalg as sp_la
+from scipy import sparse
 
 
 def tile_add_overlap(array, n, m=1):
@@ -26,7 +27,23 @@ def overlapping_vector(vector, reps, overlap_size):
     return result
 
 
-def block_diag_overlap(block_list, overlap):
+def sparse_matrix(rows, cols, values, shape, sparse_format='csr'):
+    """
+    Creates a sparse matrix in the given format from coordinate lists,
+    duplicate entries are summed and zero entries are not stored
+    """
+    rows = np.asarray(rows).ravel()
+    cols = np.asarray(cols).ravel()
+    values = np.asarray(values, dtype=float).ravel()
+    mask = values != 0.0
+    matrix = sparse.coo_matrix((values[mask], (rows[mask], cols[mask])),
+                               shape=shape)
+    return matrix.asformat(sparse_format)
+
+
+def block_diag_overlap(block_list, overlap, sparse_format=None):
+    if sparse_format is not None:
+        return block_diag_overlap_sparse(block_list, overlap, sparse_format)
     m_sblks = [block.shape[0] for block in block_list]
     n_sblks = [block.shape[1] for block in block_list]
     n_blocks = len(block_list)
@@ -44,6 +61,26 @@ def block_diag_overlap(block_list, overlap):
     return block_array
 
 
+def block_diag_overlap_sparse(block_list, overlap, sparse_format='csr'):
+    """
+    Sparse version of block_diag_overlap for dense or sparse blocks of equal
+    shape, the overlapping entries of consecutive blocks are summed
+    """
+    m_blk, n_blk = block_list[0].shape
+    n_blocks = len(block_list)
+    m_final = n_blocks * m_blk - (n_blocks - 1) * overlap[0]
+    n_final = n_blocks * n_blk - (n_blocks - 1) * overlap[1]
+    rows, cols, values = [], [], []
+    for i, block in enumerate(block_list):
+        block = sparse.coo_matrix(block)
+        rows.append(block.row + i * (m_blk - overlap[0]))
+        cols.append(block.col + i * (n_blk - overlap[1]))
+        values.append(block.data)
+    return sparse_matrix(np.concatenate(rows), np.concatenate(cols),
+                         np.concatenate(values), (m_final, n_final),
+                         sparse_format)
+
+
 def build_1d_conductance_matrix(cond_vector, offset=1):
     n_layer = len(cond_vector) + 1
     center_diag = overlapping_vector(cond_vector, 2, n_layer-2)
@@ -54,18 +91,49 @@ def build_1d_conductance_matrix(cond_vector, offset=1):
         + np.diag(off_diag, k=offset)
 
 
-def build_z_cell_conductance_matrix(cond_vector, n_ele):
+def build_z_cell_conductance_matrix(cond_vector, n_ele, sparse_format=None):
+    if sparse_format is not None:
+        return build_z_cell_conductance_matrix_sparse(cond_vector, n_ele,
+                                                      sparse_format)
     list_mat = []
     for i in range(n_ele):
         list_mat.append(build_1d_conductance_matrix(cond_vector[:, i]))
     return sp_la.block_diag(*list_mat)
 
 
-def build_x_cell_conductance_matrix(cond_vector, n_ele, n_layer=None):
+def build_z_cell_conductance_matrix_sparse(cond_vector, n_ele,
+                                           sparse_format='csr'):
+    """
+    Sparse version of build_z_cell_conductance_matrix, assembled directly
+    from the conductance vectors (layer interfaces, elements)
+    """
+    cond_vector = np.asarray(cond_vector)[:, :n_ele]
+    n_layer = len(cond_vector) + 1
+    n_total = n_layer * n_ele
+    center_diag = np.zeros((n_ele, n_layer))
+    center_diag[:, :-1] += cond_vector.transpose()
+    center_diag[:, 1:] += cond_vector.transpose()
+    center_diag *= -1.0
+    off_rows = (np.arange(n_ele)[:, None] * n_layer
+                + np.arange(n_layer - 1)).ravel()
+    off_diag = cond_vector.transpose().ravel()
+    diag_ids = np.arange(n_total)
+    return sparse_matrix(
+        np.concatenate((diag_ids, off_rows, off_rows + 1)),
+        np.concatenate((diag_ids, off_rows + 1, off_rows)),
+        np.concatenate((center_diag.ravel(), off_diag, off_diag)),
+        (n_total, n_total), sparse_format)
+
+
+def build_x_cell_conductance_matrix(cond_vector, n_ele, n_layer=None,
+                                    sparse_format=None):
     if not n_ele > 1:
         raise ValueError('x-conductance matrix can only be built for n_ele > 1')
     if n_layer is None:
         n_layer = len(cond_vector)
+    if sparse_format is not None:
+        return build_x_cell_conductance_matrix_sparse(cond_vector, n_ele,
+                                                      n_layer, sparse_format)
     center_diag = np.concatenate([cond_vector[:, i] for i in range(n_ele)])
     center_diag[n_layer:-n_layer] *= 2.0
     center_diag *= -1.0
@@ -75,12 +143,45 @@ def build_x_cell_conductance_matrix(cond_vector, n_ele, n_layer=None):
         + np.diag(off_diag, k=n_layer)
 
 
-def build_cell_conductance_matrix(x_cond_vector, z_cond_vector, n_ele):
-    z_cond_mtx = build_z_cell_conductance_matrix(z_cond_vector, n_ele)
+def build_x_cell_conductance_matrix_sparse(cond_vector, n_ele, n_layer,
+                                           sparse_format='csr'):
+    """
+    Sparse version of build_x_cell_conductance_matrix, assembled directly
+    from the conductance vectors (layers, elements)
+    """
+    cond_vector = np.asarray(cond_vector)[:n_layer, :n_ele]
+    n_total = n_layer * n_ele
+    center_diag = cond_vector.transpose().flatten()
+    center_diag[n_layer:-n_layer] *= 2.0
+    center_diag *= -1.0
+    off_diag = cond_vector[:, :-1].transpose().ravel()
+    off_rows = np.arange(n_total - n_layer)
+    diag_ids = np.arange(n_total)
+    return sparse_matrix(
+        np.concatenate((diag_ids, off_rows, off_rows + n_layer)),
+        np.concatenate((diag_ids, off_rows + n_layer, off_rows)),
+        np.concatenate((center_diag, off_diag, off_diag)),
+        (n_total, n_total), sparse_format)
+
+
+def build_cell_conductance_matrix(x_cond_vector, z_cond_vector, n_ele,
+                                  sparse_format=None):
+    """
+    Builds the conductance matrix of a cell from the in-plane (x) and
+    through-plane (z) conductance vectors, as dense array or, if a sparse
+    format is given, as sparse matrix without dense intermediates
+    """
+    z_cond_mtx = build_z_cell_conductance_matrix(z_cond_vector, n_ele,
+                                                 sparse_format=sparse_format)
     if n_ele > 1:
-        x_cond_mtx = build_x_cell_conductance_matrix(x_cond_vector, n_ele)
+        x_cond_mtx = build_x_cell_conductance_matrix(
+            x_cond_vector, n_ele, sparse_format=sparse_format)
+    elif sparse_format is not None:
+        return z_cond_mtx
     else:
         x_cond_mtx = 0.0
+    if sparse_format is not None:
+        return (x_cond_mtx + z_cond_mtx).asformat(sparse_format)
     return x_cond_mtx + z_cond_mtx
 
 
@@ -105,6 +206,31 @@ def connect_cells(matrix, cell_ids, layer_ids, values, mtx_ids,
             matrix[mtx_id_1, mtx_id_0] += values[i]
 
 
+def build_connection_matrix(shape, cell_ids, layer_ids, values, mtx_ids,
+                            sparse_format='csr'):
+    """
+    Sparse matrix of the conductances between the layers of different cells,
+    which is added to the block-diagonal matrix of the cells, equivalent to
+    connect_cells on a zero matrix
+    """
+    if np.isscalar(values):
+        values = np.full(len(cell_ids), values)
+    if not len(cell_ids) == len(layer_ids):
+        raise ValueError('cell and layer index lists must have equal length')
+    rows, cols, data = [], [], []
+    for i in range(len(cell_ids)):
+        mtx_id_0 = np.asarray(mtx_ids[cell_ids[i, 0]][layer_ids[i, 0]])
+        mtx_id_1 = np.asarray(mtx_ids[cell_ids[i, 1]][layer_ids[i, 1]])
+        value = np.broadcast_to(values[i], mtx_id_0.shape)
+        rows += [mtx_id_0, mtx_id_0, mtx_id_1, mtx_id_1]
+        cols += [mtx_id_1, mtx_id_0, mtx_id_1, mtx_id_0]
+        data += [value, -value, -value, value]
+    if not rows:
+        return sparse.csr_matrix(shape).asformat(sparse_format)
+    return sparse_matrix(np.concatenate(rows), np.concatenate(cols),
+                         np.concatenate(data), shape, sparse_format)
+
+
 def create_index_lists(cells):
     n_cells = len(cells)
     index_list = []
@@ -122,3 +248,24 @@ def create_index_lists(cells):
     for sub_list in layer_ids:
         layer_index_list.append(np.hstack(sub_list))
     return index_list, layer_index_list
+
+
+def csr_data_index(matrix, rows, cols):
+    """
+    Returns the positions of the entries (rows, cols) in the data array of a
+    CSR matrix with sorted indices, all entries must be part of the sparsity
+    pattern of the matrix
+    """
+    # 64-bit keys, since the number of matrix entries may exceed the range
+    # of the 32-bit sparse matrix indices
+    n_cols = np.int64(matrix.shape[1])
+    row_ids = np.repeat(np.arange(matrix.shape[0], dtype=np.int64),
+                        np.diff(matrix.indptr))
+    keys = row_ids * n_cols + matrix.indices
+    entries = np.asarray(rows, dtype=np.int64) * n_cols \
+        + np.asarray(cols, dtype=np.int64)
+    index = np.searchsorted(keys, entries)
+    if np.any(index >= len(keys)) \
+            or np.any(keys[np.minimum(index, len(keys) - 1)] != entries):
+        raise ValueError('entries are not part of the sparsity pattern')
+    return index
@@ -7,7 +7,10 @@ from . import layers as layers, constants
 
 
 class Membrane(ABC, layers.SolidLayer):
-    def __new__(cls, membrane_dict, dx, **kwargs):
+    def __new__(cls, membrane_dict=None, dx=None, **kwargs):
+        if cls is not Membrane:
+            # model class requested directly, e.g. when copying an instance
+            return super(Membrane, cls).__new__(cls)
         model_type = membrane_dict.get('type', 'Constant')
         if model_type == 'Constant':
             return super(Membrane, cls).__new__(Constant)
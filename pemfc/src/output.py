@@ -3,8 +3,6 @@ import numpy as np
 import os
 import shutil
 from itertools import cycle, islice
-import matplotlib
-import matplotlib.pyplot as plt
 import timeit
 import json
 
@@ -15,8 +13,14 @@ from . import global_functions as g_func
 from . import stack as stack
 from ..data import input_dicts
 
-# configure backend here
-matplotlib.use('TkAgg')
+# configure backend here, the backend is only selected on the first use of
+# the plotting functions and can be overridden by the environment variable
+# MPLBACKEND, a non-interactive backend is used without a display
+MPL_BACKEND = 'TkAgg'
+MPL_BACKEND_HEADLESS = 'Agg'
+
+# matplotlib.pyplot, imported by load_pyplot() on first use
+plt = None
 
 # globals
 FONT_SIZE = 14
@@ -27,9 +31,28 @@ FIG_DPI = 150
 FIG_SIZE = (6.4, 4.8)
 
 
+def load_pyplot():
+    """
+    Imports matplotlib.pyplot on the first use of the plotting functions, so
+    that the simulation itself does not depend on matplotlib and Tk
+    """
+    global plt
+    if plt is None:
+        import matplotlib.pyplot
+        if 'MPLBACKEND' not in os.environ:
+            try:
+                matplotlib.pyplot.switch_backend(MPL_BACKEND)
+            except ImportError:
+                matplotlib.pyplot.switch_backend(MPL_BACKEND_HEADLESS)
+        plt = matplotlib.pyplot
+    return plt
+
+
 class Output:
 
-    def __init__(self, dict_output):
+    def __init__(self, dict_output, settings=None):
+        self.settings = settings
+        # settings tree of the simulation, used for saving the settings
         self.save_csv = dict_output['save_csv']
         # switch to save the csv data
         self.save_plot = dict_output['save_plot']
@@ -42,6 +65,8 @@ class Output:
         self.output_dir = dict_output.get('directory',
                                           os.path.join(os.getcwd(), 'output'))
         self.case_name = None
+        self.written_files = set()
+        # paths of the csv and plot files written by this object
         if not os.path.exists(self.output_dir):
             try:
                 original_umask = os.umask(0)
@@ -89,6 +114,7 @@ class Output:
         return ax
 
     def plot_lines(self, ax, x, y, colormap=None, **kwargs):
+        plt = load_pyplot()
         x = np.asarray(x)
         y = np.asarray(y)
         ny = len(y)
@@ -139,6 +165,7 @@ class Output:
     def create_figure(self, filepath, x_array, y_array, xlabels, ylabels,
                       xlims=None, ylims=None, xticks=None, yticks=None,
                       titles=None, rows=1, cols=1, **kwargs):
+        plt = load_pyplot()
         nplots = rows*cols
 
         def check_dims(variable, correct_single_dim=False):
@@ -204,11 +231,13 @@ class Output:
         plt.tight_layout()
         if filepath:
             fig.savefig(filepath, format=kwargs.get('fileformat', 'png'))
+            self.written_files.add(filepath)
         return fig
 
     @staticmethod
     def plot(y_values, y_label, x_label, y_scale, colors,
              title, xlim_low, xlim_up, labels, path):
+        plt = load_pyplot()
         if labels is not None:
             for i in range(len(y_values)):
                 plt.plot(y_values[i], color=colors[i],
@@ -232,6 +261,7 @@ class Output:
     @staticmethod
     def x_plot(path, x, y, x_label, y_label, x_scale='linear',
                y_scale='linear', xlim=None, ylim=None, title=None, labels=None):
+        plt = load_pyplot()
         if labels is not None:
             for i in range(len(y)):
                 plt.plot(x, y[i],
@@ -275,6 +305,7 @@ class Output:
             else:
                 np.savetxt(file, array,
                            delimiter=self.delimiter, fmt=self.csv_format)
+        self.written_files.add(file_path)
         return file
 
     def write_data(self, x_values, data_array, x_label, data_name,
@@ -307,7 +338,25 @@ class Output:
                                     header=header, mode=mode)
 
     @staticmethod
-    def get_data(fc_stack):
+    def map_to_full_stack(var_array, clusters, stack_axis, coolant=False):
+        """
+        Interpolates the values of a reduced-order stack along the stack axis
+        of the array to all cells (or coolant channels) of the full stack
+        """
+        if clusters is None or stack_axis is None:
+            return var_array
+        elif coolant:
+            return clusters.interpolate_coolant(var_array, axis=stack_axis)
+        else:
+            return clusters.interpolate(var_array, axis=stack_axis)
+
+    @staticmethod
+    def get_data(fc_stack, clusters=None):
+        """
+        Returns the local data of the stack, the data of a reduced-order stack
+        is interpolated to all cells of the full stack by the provided cell
+        clusters
+        """
         if not isinstance(fc_stack, stack.Stack):
             raise TypeError('argument fc_stack must be of type Stack from pemfc'
                             'module')
@@ -326,7 +375,8 @@ class Output:
         #             data_dict[names[i]] = p_data
         #     return data_dict
 
-        def get_oo_collection_data(oo_collection, data_dict=None, **kwargs):
+        def get_oo_collection_data(oo_collection, data_dict=None,
+                                   stack_axis=0, coolant=False, **kwargs):
             if data_dict is None:
                 data_dict = {}
             n_items = len(oo_collection)
@@ -339,6 +389,8 @@ class Output:
                 var_array = g_func.construct_empty_stack_array(value, n_items)
                 for j, item in enumerate(oo_collection):
                     var_array[j] = item.print_data[0][name]['value']
+                var_array = Output.map_to_full_stack(var_array, clusters,
+                                                     stack_axis, coolant)
                 data_dict[names[i]] = \
                     {'value': var_array,
                      'units': oo_collection[0].print_data[0][name]['units']}
@@ -359,6 +411,8 @@ class Output:
                     for k, item in enumerate(oo_collection):
                         var_array[k] = \
                             item.print_data[1][base_name][sub_name]['value']
+                    var_array = Output.map_to_full_stack(
+                        var_array, clusters, stack_axis, coolant)
                     second_key = sub_name if names is None else names[i][1]
                     data_dict[first_key][second_key] = \
                         {'value': var_array,
@@ -374,7 +428,8 @@ class Output:
         data = {'Channel Location':
                 {'value': xvalues, 'units': 'm', 'label': xlabel},
                 'Cells':
-                {'value': [i + 1 for i in range(len(cells))], 'units': '-'}}
+                {'value': [i + 1 for i in range(fc_stack.n_cells_total)],
+                 'units': '-'}}
         data = get_oo_collection_data(cells, data_dict=data)
         # Save channel values
         cathode_channels = [cell.cathode.channel for cell in fc_stack.cells]
@@ -392,26 +447,34 @@ class Output:
         if fc_stack.n_cells > 1:
             fuel_circuits = fc_stack.fuel_circuits
             data = get_oo_collection_data(fuel_circuits, data_dict=data,
+                                          stack_axis=-1,
                                           names=['Cathode', 'Anode'])
 
         # Save coolant circuit values
         if fc_stack.coolant_circuit is not None:
             coolant_circuits = [fc_stack.coolant_circuit]
+            n_cool = coolant_circuits[0].n_channels \
+                + fc_stack.n_cells_total - fc_stack.n_cells
             data['Coolant Channels'] = \
-                {'value': [i + 1 for i
-                           in range(coolant_circuits[0].n_channels)],
-                 'units': '-'}
-            data = get_oo_collection_data(coolant_circuits, data_dict=data)
+                {'value': [i + 1 for i in range(n_cool)], 'units': '-'}
+            data = get_oo_collection_data(coolant_circuits, data_dict=data,
+                                          stack_axis=-1, coolant=True)
 
             cool_channels = \
                 [channel for channel in coolant_circuits[0].channels]
 
             cool_fluids = [channel.fluid for channel in cool_channels]
-            data = get_oo_collection_data(cool_fluids, data_dict=data)
+            data = get_oo_collection_data(cool_fluids, data_dict=data,
+                                          coolant=True)
 
         return data
 
-    def save(self, folder_name, fc_stack):
+    def save(self, folder_name, fc_stack, clusters=None):
+        """
+        Writes the local data of the stack to the csv and plot files, the
+        data of a reduced-order stack is interpolated to all cells of the
+        full stack by the provided cell clusters
+        """
         if not self.save_csv and not self.save_plot:
             return None
         if not isinstance(fc_stack, stack.Stack):
@@ -430,7 +493,8 @@ class Output:
         # else:
         #    self.clean_directory(plot_path)
 
-        def save_oo_collection(oo_collection, x_values, x_label, **kwargs):
+        def save_oo_collection(oo_collection, x_values, x_label,
+                               stack_axis=0, coolant=False, **kwargs):
             # data_dict = kwargs.get('data_dict', {})
             if not hasattr(oo_collection[0], 'print_data'):
                 raise TypeError
@@ -441,6 +505,8 @@ class Output:
                 for i, item in enumerate(oo_collection):
                     var_array[i] = item.print_data[0][name]['value']
                     # data_dict[item.name + ' ' + str(i)] =
+                var_array = self.map_to_full_stack(var_array, clusters,
+                                                   stack_axis, coolant)
                 x = x_values
                 if var_array.shape[-1] == (len(x_values) - 1):
                     x = ip.interpolate_1d(x_values)
@@ -455,6 +521,8 @@ class Output:
                     for i, item in enumerate(oo_collection):
                         var_array[i] = \
                             item.print_data[1][base_name][sub_name]['value']
+                    var_array = self.map_to_full_stack(var_array, clusters,
+                                                       stack_axis, coolant)
                     x = x_values
                     if var_array.shape[-1] == (len(x_values) - 1):
                         x = ip.interpolate_1d(x_values)
@@ -493,28 +561,31 @@ class Output:
         # Save fuel circuit values
         if fc_stack.n_cells > 1:
             fuel_circuits = fc_stack.fuel_circuits
-            xvalues = [i + 1 for i in range(len(cells))]
+            xvalues = [i + 1 for i in range(fc_stack.n_cells_total)]
             xlabel = 'Cell'
-            save_oo_collection(fuel_circuits, xvalues, xlabel,
+            save_oo_collection(fuel_circuits, xvalues, xlabel, stack_axis=-1,
                                legend=['Cathode', 'Anode'],
                                file_name='Fuel_Distribution')
 
         # Save coolant circuit values
         if fc_stack.coolant_circuit is not None:
             coolant_circuits = [fc_stack.coolant_circuit]
-            xvalues = [i + 1 for i in range(coolant_circuits[0].n_channels)]
+            n_cool = coolant_circuits[0].n_channels \
+                + fc_stack.n_cells_total - fc_stack.n_cells
+            xvalues = [i + 1 for i in range(n_cool)]
             xlabel = 'Channel'
             save_oo_collection(coolant_circuits, xvalues, xlabel,
+                               stack_axis=-1, coolant=True,
                                file_name='Coolant_Distribution')
 
             cool_channels = \
                 [channel for channel in coolant_circuits[0].channels]
             xvalues = cool_channels[0].x
             xlabel = 'Channel Location [m]'
-            save_oo_collection(cool_channels, xvalues, xlabel)
+            save_oo_collection(cool_channels, xvalues, xlabel, coolant=True)
             # Save fluid values
             cool_fluids = [channel.fluid for channel in cool_channels]
-            save_oo_collection(cool_fluids, xvalues, xlabel)
+            save_oo_collection(cool_fluids, xvalues, xlabel, coolant=True)
 
     def plot_polarization_curve(self, voltage_loss,
                                 cell_voltages, current_density):
@@ -522,6 +593,7 @@ class Output:
         Plots the polarization curve of the given
         current densities and average stack voltages.
         """
+        plt = load_pyplot()
         cd_array = np.asarray(current_density) * 1.e-4
         plt.plot(cd_array, cell_voltages, marker='.', color='k',
                  label='Simulation')
@@ -565,16 +637,47 @@ class Output:
             file.write('Simulation time: {0:.4f}\n'.format(sim.timing[
                                                                'simulation']))
             file.write('Output time: {0:.4f}\n'.format(sim.timing['output']))
+            if 'iterations' in sim.timing:
+                file.write('Iterations: {}\n'.format(sim.timing['iterations']))
+            if sim.timing.get('point_iterations'):
+                file.write('Iterations per point: {}\n'.format(
+                    ', '.join(str(n) for n in sim.timing['point_iterations'])))
+            if sim.timing.get('acceleration', 0.0) > 0.0:
+                file.write('Acceleration time: {0:.4f}\n'.format(
+                    sim.timing['acceleration']))
+                file.write('Accelerated iterations: {} ({:.1%})\n'.format(
+                    sim.timing['accelerated_iterations'],
+                    sim.timing['accelerated_iterations']
+                    / max(sim.timing['iterations'], 1)))
+            if sim.timing.get('parallel', 0.0) > 0.0:
+                file.write('Parallel wall time: {0:.4f}\n'.format(
+                    sim.timing['parallel']))
             stop_time = timeit.default_timer()
             file.write('Total time:{0:.4f}\n'.format(stop_time - sim.timing[
                 'start']))
             for k, v in data.items():
                 file.write('{} [{}]: '.format(k, v['units'])
                            + '{0:.4f}\n'.format(v['value']))
+            for event in getattr(sim, 'convergence_events', []):
+                file.write('Convergence event: {} at target value {} in '
+                           'iteration {} ({})\n'.format(
+                               event['event'], event['target_value'],
+                               event['iteration'], event['action']))
+            grid_sequence = getattr(sim, 'grid_sequence', None)
+            if grid_sequence is not None:
+                for entry in grid_sequence.iterations:
+                    file.write('Grid sequence at target value {}: {}\n'.format(
+                        entry['target_value'],
+                        ', '.join('{} iterations with {} nodes'.format(
+                            iterations, n_nodes) for n_nodes, iterations
+                            in zip(entry['nodes'], entry['iterations']))))
 
     def save_settings(self, settings=None, fmt='json'):
         if settings is None:
-            settings = input_dicts.sim_dict
+            if self.settings is not None:
+                settings = self.settings
+            else:
+                settings = input_dicts.sim_dict
         elif not isinstance(settings, dict):
             raise TypeError('must provide python dict to save settings')
         else:
@@ -73,8 +73,8 @@ class OutputObject:
                 dead.add(ref)
         cls._instances -= dead
 
-    def copy(self):
-        copy = deepcopy(self)
+    def copy(self, memo=None):
+        copy = deepcopy(self, memo)
         self._instances.add(weakref.ref(copy))
         return copy
 
@@ -92,6 +92,20 @@ class OutputObject:
         else:
             raise ValueError('argument data_array must be 1- or 2-dimensional')
 
+    def replace_print_data(self, old_array, new_array):
+        """
+        Redirects the print data referencing old_array to new_array, e.g.
+        after the underlying array has been replaced by a view
+        """
+        print_data_1d, print_data_2d = self.print_data
+        for entry in print_data_1d.values():
+            if entry['value'] is old_array:
+                entry['value'] = new_array
+        for entry in print_data_2d.values():
+            for i, sub_entry in enumerate(entry.values()):
+                if sub_entry['value'].base is old_array:
+                    sub_entry['value'] = new_array[i]
+
     def add_print_variables(self, print_variables):
         for i, name in enumerate(print_variables['names']):
             attr = eval('self.' + name)
@@ -0,0 +1,78 @@
+# general imports
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PartitionedThreadPool:
+    """
+    Thread pool for independent updates of the items (e.g. cells) of the
+    stack. The items are partitioned into contiguous blocks, which are
+    processed in order by one thread each. NumPy releases the GIL in most
+    array operations, so that the partitions are processed concurrently.
+    The results are returned in the order of the items independent of the
+    scheduling of the threads, hence the results and any reduction carried out
+    on them are identical to the serial execution.
+    """
+    def __init__(self, n_threads):
+        self.n_threads = max(int(n_threads), 1)
+        self.executor = None
+
+    @property
+    def active(self):
+        return self.n_threads > 1
+
+    def partition(self, n_items):
+        """
+        Returns the contiguous index ranges of the items for each thread
+        """
+        bounds = np.linspace(0, n_items, min(self.n_threads, n_items) + 1)
+        bounds = np.rint(bounds).astype(int)
+        return [range(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+    def map(self, function, n_items, stop=None):
+        """
+        Calls function(i) for all item indices i and returns the list of the
+        results in the order of the items. If stop(result) evaluates to True,
+        the remaining items of the partition are skipped (their results are
+        None), like breaking out of the serial loop. If any call raises an
+        exception, the exception of the first partition is re-raised.
+        """
+        if not self.active or n_items < 2:
+            results = [None] * n_items
+            for i in range(n_items):
+                results[i] = function(i)
+                if stop is not None and stop(results[i]):
+                    break
+            return results
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.n_threads)
+        # floating point error handling is thread-local in NumPy and must be
+        # passed to the worker threads
+        error_settings = np.geterr()
+
+        def run_partition(ids):
+            results = [None] * len(ids)
+            with np.errstate(**error_settings):
+                for j, i in enumerate(ids):
+                    results[j] = function(i)
+                    if stop is not None and stop(results[j]):
+                        break
+            return results
+
+        futures = [self.executor.submit(run_partition, ids)
+                   for ids in self.partition(n_items)]
+        results = []
+        for future in futures:
+            results += future.result()
+        return results
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __getstate__(self):
+        # thread pools can neither be copied nor pickled
+        state = self.__dict__.copy()
+        state['executor'] = None
+        return state
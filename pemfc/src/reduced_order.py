@@ -0,0 +1,162 @@
+# general imports
+import copy
+import numpy as np
+
+
+def interpolate_cells(values, positions, x):
+    """
+    Linear interpolation of cell-wise values along the stack axis
+    :param values: array with the values of the cells as leading axis
+    :param positions: stack positions (cell indices) of the values
+    :param x: stack positions to interpolate the values at
+    :return: array with the interpolated values as leading axis
+    """
+    values = np.asarray(values)
+    positions = np.asarray(positions, dtype=float)
+    x = np.asarray(x, dtype=float)
+    if len(positions) == 1:
+        return np.repeat(values, len(x), axis=0)
+    ids = np.searchsorted(positions, x, side='right') - 1
+    ids = np.clip(ids, 0, len(positions) - 2)
+    factor = (x - positions[ids]) / (positions[ids + 1] - positions[ids])
+    factor = np.clip(factor, 0.0, 1.0)
+    factor = factor.reshape(factor.shape + (1,) * (values.ndim - 1))
+    return (1.0 - factor) * values[ids] + factor * values[ids + 1]
+
+
+class CellClusters:
+    """
+    Partition of the cells of a stack into contiguous clusters along the
+    stack axis, i.e. by the position of the cells at the manifolds. Each
+    cluster is solved as one representative cell of a reduced-order stack.
+    The end cells form individual clusters, since they differ most from the
+    interior cells due to the end plates. The values of the remaining cells
+    are interpolated between the cluster centers.
+    """
+    def __init__(self, reduced_dict, n_cells):
+        self.n_cells = n_cells
+        # number of cells of the full stack
+        self.tolerance = reduced_dict.get('tolerance', 2e-3)
+        # maximum relative spread of the cell voltages within a cluster
+        self.max_refinements = reduced_dict.get('max_refinements', 1)
+        # maximum number of adaptive refinements per operating point
+        self.n_refinements = 0
+        # total number of refinements carried out
+        n_clusters = reduced_dict.get('clusters', 16)
+        # initial number of clusters of the interior cells
+        if n_cells > 2:
+            n_clusters = min(max(n_clusters, 1), n_cells - 2)
+            bounds = np.linspace(1, n_cells - 1, n_clusters + 1)
+            bounds = np.rint(bounds).astype(int)
+            self.members = \
+                [np.arange(1)] \
+                + [np.arange(bounds[i], bounds[i + 1])
+                   for i in range(n_clusters)] \
+                + [np.arange(n_cells - 1, n_cells)]
+        else:
+            self.members = [np.arange(i, i + 1) for i in range(n_cells)]
+        # cell indices of the clusters
+
+    @property
+    def n_clusters(self):
+        return len(self.members)
+
+    @property
+    def weights(self):
+        """
+        Number of cells represented by each cluster
+        """
+        return np.asarray([len(members) for members in self.members],
+                          dtype=float)
+
+    @property
+    def positions(self):
+        """
+        Stack positions (average cell indices) of the clusters
+        """
+        return np.asarray([np.average(members) for members in self.members])
+
+    def get_stack_settings(self, settings):
+        """
+        Returns a copy of the settings for the reduced-order stack with one
+        cell for each cluster
+        """
+        settings = copy.copy(settings)
+        settings['stack'] = copy.copy(settings['stack'])
+        settings['stack']['cell_number'] = self.n_clusters
+        settings['stack']['cell_weights'] = list(self.weights)
+        return settings
+
+    def interpolate(self, values, axis=0):
+        """
+        Interpolates the values of the clusters (along the provided axis) to
+        all cells of the full stack. The interior cells are interpolated
+        between the centers of the interior clusters only, since the end
+        cells differ from them due to the end plates.
+        """
+        values = np.moveaxis(np.asarray(values), axis, 0)
+        x = np.arange(self.n_cells)
+        if self.n_clusters > 2:
+            cell_values = interpolate_cells(values[1:-1],
+                                            self.positions[1:-1], x)
+            cell_values[0] = values[0]
+            cell_values[-1] = values[-1]
+        else:
+            cell_values = interpolate_cells(values, self.positions, x)
+        return np.moveaxis(cell_values, 0, axis)
+
+    def interpolate_coolant(self, values, axis=0):
+        """
+        Interpolates the values of the coolant channels of the reduced-order
+        stack (along the provided axis) to all coolant channels of the full
+        stack. Each coolant channel represents the channels of the cluster,
+        on whose cathode side it is located. The boundary channels at the end
+        plates are not used for the interpolation of the interior channels.
+        """
+        values = np.moveaxis(np.asarray(values), axis, 0)
+        if len(values) == self.n_clusters + 1:
+            # boundary channels at both end plates
+            x = np.arange(self.n_cells + 1)
+            channel_values = interpolate_cells(values[1:-1],
+                                               self.positions[1:], x)
+            channel_values[0] = values[0]
+            channel_values[-1] = values[-1]
+        else:
+            x = np.arange(self.n_cells - 1)
+            channel_values = interpolate_cells(values,
+                                               self.positions[1:] - 1.0, x)
+        return np.moveaxis(channel_values, 0, axis)
+
+    def calc_spread(self, values):
+        """
+        Returns the maximum relative deviation of the interpolated values of
+        the cluster members from the value of the representative cell
+        """
+        values = np.asarray(values, dtype=float)
+        cell_values = self.interpolate(values)
+        spread = np.zeros(self.n_clusters)
+        for i, members in enumerate(self.members):
+            deviation = np.abs(cell_values[members] - values[i])
+            spread[i] = np.max(deviation) / max(np.abs(values[i]), 1e-30)
+        return spread
+
+    def refine(self, values):
+        """
+        Splits the clusters, whose spread of the provided cell values
+        exceeds the tolerance, into two halves. Returns True, if any cluster
+        has been split.
+        """
+        spread = self.calc_spread(values)
+        members = []
+        refined = False
+        for i, cluster in enumerate(self.members):
+            if spread[i] > self.tolerance and len(cluster) > 1:
+                half = len(cluster) // 2
+                members += [cluster[:half], cluster[half:]]
+                refined = True
+            else:
+                members.append(cluster)
+        if refined:
+            self.members = members
+            self.n_refinements += 1
+        return refined
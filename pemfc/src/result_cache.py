@@ -0,0 +1,156 @@
+# general imports
+import os
+import json
+import pickle
+import hashlib
+import numpy as np
+
+try:
+    from importlib import metadata
+    VERSION = metadata.version('pemfc_model_lufire')
+except Exception:
+    VERSION = 'unknown'
+
+
+class ResultCache:
+    """
+    Persistent on-disk cache for simulation results. Entries are addressed
+    by a hash of the complete settings tree, the package version and the
+    operating points and hold the global and local result data together
+    with the converged stack state and a record of the output files written
+    by the cached run. An entry is only valid as long as these output files
+    are unchanged, so that a cache hit never refers to deleted or
+    overwritten files. The total size of the cache directory is bounded by
+    removing the least recently used entries.
+    """
+    ignored_keys = (('simulation', 'result_cache'),)
+    # settings entries without influence on the results and output files
+
+    def __init__(self, cache_dict):
+        directory = cache_dict.get('directory', None)
+        if directory is None:
+            directory = os.path.join(os.path.expanduser('~'), '.pemfc_cache')
+        self.directory = directory
+        self.max_size = cache_dict.get('max_size', 1000.0) * 1e6
+        # maximum size of the cache directory in bytes
+
+    @staticmethod
+    def to_serializable(value):
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        elif isinstance(value, np.generic):
+            return value.item()
+        else:
+            return repr(value)
+
+    def get_key(self, settings, target_values):
+        """
+        Returns the canonical hash of the settings tree, the package version
+        and the operating points
+        """
+        settings = dict(settings)
+        for keys in self.ignored_keys:
+            sub_dict = settings
+            for key in keys[:-1]:
+                sub_dict[key] = dict(sub_dict.get(key, {}))
+                sub_dict = sub_dict[key]
+            sub_dict.pop(keys[-1], None)
+        content = json.dumps({'settings': settings,
+                              'version': VERSION,
+                              'target_values': target_values},
+                             sort_keys=True, default=self.to_serializable)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get_paths(self, key):
+        return os.path.join(self.directory, key + '.pkl'), \
+            os.path.join(self.directory, key + '.npz')
+
+    @staticmethod
+    def get_file_record(paths):
+        """
+        Returns the size and modification time of each of the provided files
+        """
+        record = {}
+        for path in paths:
+            stat = os.stat(path)
+            record[os.path.abspath(path)] = (stat.st_size, stat.st_mtime_ns)
+        return record
+
+    def check_file_record(self, record):
+        """
+        Returns True, if all recorded files still exist unchanged
+        """
+        try:
+            return self.get_file_record(record) == record
+        except OSError:
+            return False
+
+    def load(self, key):
+        """
+        Returns the tuple (global_data, local_data, case_name, state_path) of
+        the entry or None, if the entry is not cached or its output files
+        have been deleted or modified since
+        """
+        data_path, state_path = self.get_paths(key)
+        try:
+            with open(data_path, 'rb') as file:
+                global_data, local_data, output_record = pickle.load(file)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        if not self.check_file_record(output_record['files']):
+            return None
+        if not os.path.isfile(state_path):
+            state_path = None
+        # mark entry as recently used
+        for path in (data_path, state_path):
+            if path is not None:
+                os.utime(path)
+        return global_data, local_data, output_record['case_name'], \
+            state_path
+
+    def save(self, key, global_data, local_data, stack=None, case_name=None,
+             output_files=()):
+        """
+        Writes the result data, the stack state and the record of the
+        provided output files as cache entry and evicts the least recently
+        used entries exceeding the size limit
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        data_path, state_path = self.get_paths(key)
+        if stack is not None:
+            temp_path = state_path + '.tmp.npz'
+            stack.save_state(temp_path)
+            os.replace(temp_path, state_path)
+        elif os.path.isfile(state_path):
+            os.remove(state_path)
+        output_record = {'case_name': case_name,
+                         'files': self.get_file_record(output_files)}
+        temp_path = data_path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            pickle.dump((global_data, local_data, output_record), file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, data_path)
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache size is
+        below the size limit
+        """
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext not in ('.pkl', '.npz'):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            size, access_time = entries.get(key, (0, 0.0))
+            entries[key] = (size + stat.st_size,
+                            max(access_time, stat.st_mtime))
+        total_size = sum(size for size, access_time in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k][1]):
+            if total_size <= self.max_size:
+                break
+            for path in self.get_paths(key):
+                if os.path.isfile(path):
+                    os.remove(path)
+            total_size -= entries[key][0]
@@ -1,12 +1,19 @@
 # general imports
 import os
+import copy
 import numpy as np
 import cProfile
 import timeit
+from concurrent.futures import ProcessPoolExecutor
 
 # local module imports
 from . import stack
 from . import output
+from . import acceleration
+from . import convergence
+from . import result_cache
+from . import reduced_order
+from . import grid_sequencing
 from ..data import input_dicts
 # from ..gui import data_transfer
 
@@ -26,23 +33,69 @@ def do_c_profile(func):
 
 class Simulation:
 
-    def __init__(self, ):
-        #dict_simulation = input_dicts.dict_simulation
-        dict_simulation = input_dicts.sim_dict['simulation']
+    def __init__(self, settings=None):
+        # work on a private copy of the settings tree, so that several
+        # simulations can be set up and run within the same process
+        if settings is None:
+            settings = input_dicts.sim_dict
+        self.settings = copy.deepcopy(settings)
+        dict_simulation = self.settings['simulation']
         self.it_crit = dict_simulation['iteration_criteria']
         # iteration criteria
         self.max_it = dict_simulation['maximum_iteration']
         # maximal number of iterations before force termination#
         self.min_it = dict_simulation['minimum_iteration']
+        # number of worker processes and operating points per worker task
+        # for the calculation of multiple operating points
+        self.n_workers = dict_simulation.get('parallel_workers', 1)
+        self.chunk_size = dict_simulation.get('parallel_chunk_size', None)
+        # initialize consecutive operating points from extrapolated
+        # solutions of the previous points
+        self.continuation = dict_simulation.get('continuation', False)
+        self.continuation_order = \
+            dict_simulation.get('continuation_order', 1)
+        self.max_refinements = \
+            dict_simulation.get('continuation_max_refinements', 4)
+        self.continuation_history = []
+        # acceleration of the outer fixed-point iteration
+        self.accelerator = \
+            acceleration.factory(dict_simulation.get('acceleration', {}))
+        # watchdog for divergence, oscillation and stagnation of the
+        # outer iteration
+        monitor_dict = dict_simulation.get('convergence_monitor', {})
+        if monitor_dict.get('active', False):
+            self.monitor = \
+                convergence.ConvergenceMonitor(monitor_dict, self.it_crit)
+        else:
+            self.monitor = None
+        self.monitor_action = monitor_dict.get('action', 'retry').lower()
+        self.monitor_max_retries = monitor_dict.get('max_retries', 2)
+        self.monitor_damping = monitor_dict.get('damping_increase', 0.5)
+        self.convergence_events = []
+        # detected convergence events with target value, iteration, type
+        # and the applied action
+        self.aborted = False
+        # True if the last operating point was aborted by the watchdog
+        # function called with the record of each outer iteration,
+        # stops the iteration of the operating point if it returns True
+        self.iteration_callback = None
 
         self.timing = {'start': 0.0,
                        'initialization': 0.0,
                        'simulation': 0.0,
-                       'output': 0.0}
+                       'output': 0.0,
+                       'acceleration': 0.0,
+                       'iterations': 0,
+                       'accelerated_iterations': 0,
+                       'point_iterations': []}
+        # 'accelerated_iterations': number of outer iterations continued
+        # from an accelerated iterate instead of the plain fixed-point
+        # update, 'point_iterations': outer iterations of each successfully
+        # calculated operating point
 
         """General variables"""
         # initialize stack object
-        n_nodes = dict_simulation['nodes']
+        self.n_nodes = dict_simulation['nodes']
         self.current_control = dict_simulation.get('current_control', True)
         if 'operation_control' in dict_simulation:
             if dict_simulation['operation_control'].lower() == 'current':
@@ -56,71 +109,223 @@ class Simulation:
             raise ValueError('parameter current_density must be provided')
         elif not self.current_density and self.average_cell_voltage is None:
             raise ValueError('parameter average_cell_voltage must be provided')
-        stack_dict = input_dicts.sim_dict['stack']
+        stack_dict = self.settings['stack']
         cell_number = stack_dict['cell_number']
         if self.current_control:
             stack_dict['init_current_density'] = self.current_density
         else:
             stack_dict['voltage'] = self.average_cell_voltage * cell_number
 
-        self.stack = stack.Stack(n_nodes, current_control=self.current_control)
+        # reduced-order model of the stack solving representative cells for
+        # clusters of similar cells
+        reduced_dict = dict_simulation.get('reduced_order', {})
+        if reduced_dict.get('active', False):
+            if not self.current_control:
+                raise NotImplementedError('reduced-order stacks are only '
+                                          'available for current control')
+            self.clusters = \
+                reduced_order.CellClusters(reduced_dict, cell_number)
+        else:
+            self.clusters = None
+
+        # coarse-to-fine solution of the operating points on a sequence of
+        # discretizations of the flow channels
+        grid_dict = dict_simulation.get('grid_sequencing', {})
+        if grid_dict.get('active', False):
+            self.grid_sequence = \
+                grid_sequencing.GridSequence(grid_dict, self.n_nodes)
+        else:
+            self.grid_sequence = None
+        self.coarse_stacks = []
+        # stacks of the coarse levels, kept for the following operating points
+
+        # persistent cache of the results of identical simulations, looked
+        # up before the stack is created, so that a cache hit does not pay
+        # for the setup of the stack
+        cache_dict = dict_simulation.get('result_cache', {})
+        self.cache_key = None
+        self.cache_entry = None
+        if cache_dict.get('active', False):
+            self.cache = result_cache.ResultCache(cache_dict)
+            self.cache_key = \
+                self.cache.get_key(self.settings, self.get_target_values())
+            self.cache_entry = self.cache.load(self.cache_key)
+        else:
+            self.cache = None
+        self.cache_hit = False
+        self.cache_state_path = None
+        # stack state file of the cached run after a cache hit, which can be
+        # restored by Stack.load_state
+
+        if self.cache_entry is None:
+            self.stack = self.create_stack()
+        else:
+            self.stack = None
+
+        # adaptive underrelaxation of the cell current density updates
+        self.urf_dict = dict_simulation.get('adaptive_underrelaxation', {})
+        self.urf_per_cell = self.urf_dict.get('cell_wise', False)
+        if self.urf_dict.get('active', False) and self.stack is not None:
+            self.urf_controller = \
+                acceleration.AdaptiveUnderRelaxation(
+                    self.urf_dict, self.stack.cells[0].urf,
+                    self.stack.n_cells)
+        else:
+            self.urf_controller = None
+
+        # restart or warm start from a stack state saved by Stack.save_state
+        self.save_states = dict_simulation.get('save_states', False)
+        # write the stack state of each converged operating point
+        self.warm_start = False
+        initial_state_file = dict_simulation.get('initial_state_file', None)
+        if initial_state_file and self.stack is not None:
+            self.stack.load_state(initial_state_file)
+            self.warm_start = True
 
         # initialize output object
-        output_dict = input_dicts.sim_dict['output']
-        self.output = output.Output(output_dict)
+        output_dict = self.settings['output']
+        self.output = output.Output(output_dict, settings=self.settings)
+
+    def create_stack(self, n_nodes=None):
+        """
+        Creates the stack object, in reduced-order mode with one cell for
+        each cell cluster, optionally with a different number of nodes along
+        the channels than the simulation settings
+        """
+        settings = self.settings
+        if self.clusters is not None:
+            settings = self.clusters.get_stack_settings(settings)
+        if n_nodes is None:
+            n_nodes = self.n_nodes
+        elif n_nodes != self.n_nodes:
+            settings = \
+                grid_sequencing.GridSequence.get_stack_settings(settings,
+                                                                n_nodes)
+        return stack.Stack(settings, n_nodes,
+                           current_control=self.current_control)
 
     # @do_c_profile
     def run(self):
         """
         This function coordinates the program sequence
         """
+        if self.cache_entry is not None:
+            # the output files of the cached run have been verified to be
+            # unchanged by the lookup of the cache entry
+            global_data, local_data, self.output.case_name, \
+                self.cache_state_path = self.cache_entry
+            self.cache_entry = None
+            self.cache_hit = True
+            return global_data, local_data
+        target_value = self.get_target_values()
+        cache_stack = None
+        if self.n_workers > 1 and len(target_value) > 1:
+            cell_voltages, current_densities, local_data, global_data = \
+                self.run_parallel()
+        else:
+            cache_stack = self.stack
+            cell_voltages, current_densities, local_data = \
+                self.run_points(target_value)
+            global_data = self.get_global_data()
+            self.close()
+        output_start_time = timeit.default_timer()
+        if len(cell_voltages) > 1:
+            self.output.write_data(current_densities, cell_voltages,
+                                   'Current Density [A/m²]', 'Cell Voltage',
+                                   units='V', directory=self.output.output_dir,
+                                   save_csv=True, save_plot=True,
+                                   write_mode='w')
+            # self.output.plot_polarization_curve(voltage_loss, cell_voltages,
+            #                                     target_value)
+        output_stop_time = timeit.default_timer()
+        self.timing['output'] += output_stop_time - output_start_time
+        if self.cache_key is not None and local_data is not None \
+                and not self.stack.break_program:
+            self.cache.save(self.cache_key, global_data, local_data,
+                            stack=cache_stack,
+                            case_name=self.output.case_name,
+                            output_files=self.output.written_files)
+        return global_data, local_data
+
+    def close(self):
+        """
+        Shuts down the worker threads of the stack and the coarse stacks of
+        the grid sequence, the stacks remain usable and restart their threads
+        on demand
+        """
+        for fc_stack in self.coarse_stacks + [self.stack]:
+            if fc_stack is not None:
+                fc_stack.close()
+
+    def get_target_values(self):
+        """
+        Returns the list of operating points (current densities or stack
+        voltages) to be calculated
+        """
         if self.current_control:
             target_value = self.current_density
         else:
-            target_value = self.average_cell_voltage * self.stack.n_cells
+            target_value = self.average_cell_voltage
         if not isinstance(target_value, (list, tuple, np.ndarray)):
             target_value = [target_value]
+        if not self.current_control:
+            n_cells = self.settings['stack']['cell_number']
+            target_value = [value * n_cells for value in target_value]
+        return target_value
+
+    def run_points(self, target_value, case_offset=0):
+        """
+        Calculates the provided operating points consecutively, each point
+        starting from the converged solution of the previous one
+        """
         cell_voltages = []
         current_densities = []
         local_data = None
         for i, tar_value in enumerate(target_value):
-            current_errors = []
-            temp_errors = []
             simulation_start_time = timeit.default_timer()
-            counter = 0
-            while True:
-                if counter == 0:
-                    if self.current_control:
-                        self.stack.update(current_density=tar_value)
-                    else:
-                        self.stack.update(voltage=tar_value)
-                else:
-                    self.stack.update()
-                if self.stack.break_program:
-                    break
-                current_error, temp_error = self.calc_convergence_criteria()
-                current_errors.append(current_error)
-                temp_errors.append(temp_error)
-                if len(target_value) < 1:
-                    print(counter)
-                counter += 1
-                if ((current_error < self.it_crit and temp_error < self.it_crit)
-                        and counter > self.min_it) or counter > self.max_it:
-                    break
+            iterations_start = self.timing['iterations']
+            if self.continuation:
+                counter, current_errors, temp_errors = \
+                    self.solve_continuation(tar_value)
+            elif self.grid_sequence is not None and not self.warm_start:
+                counter, current_errors, temp_errors = \
+                    self.solve_grid_sequence(tar_value)
+            else:
+                counter, current_errors, temp_errors = \
+                    self.solve(tar_value,
+                               reset_distribution=not self.warm_start)
+            self.warm_start = False
+            if self.clusters is not None:
+                refined = self.refine_clusters(tar_value)
+                counter += refined[0]
+                current_errors += refined[1]
+                temp_errors += refined[2]
             simulation_stop_time = timeit.default_timer()
             simulation_time = simulation_stop_time - simulation_start_time
             self.timing['simulation'] += simulation_time
             output_start_time = timeit.default_timer()
 
-            if not self.stack.break_program:
+            if self.aborted and not self.stack.break_program:
+                # skip to the next operating point
+                pass
+            elif not self.stack.break_program:
+                self.timing['point_iterations'].append(
+                    self.timing['iterations'] - iterations_start)
                 # voltage_loss = self.get_voltage_losses(self.stack)
-                cell_voltages.append(np.average([cell.v for cell in
-                                                 self.stack.cells]))
+                cell_voltages.append(self.stack.v_stack
+                                     / self.stack.n_cells_total)
                 current_densities.append(self.stack.i_cd_avg)
 
-                case_name = 'Case'+str(i)
-                self.output.save(case_name, self.stack)
-                local_data = self.output.get_data(self.stack)
+                case_name = 'Case'+str(i + case_offset)
+                self.output.save(case_name, self.stack,
+                                 clusters=self.clusters)
+                if self.save_states:
+                    state_dir = os.path.join(self.output.output_dir,
+                                             case_name)
+                    os.makedirs(state_dir, exist_ok=True)
+                    self.stack.save_state(os.path.join(state_dir, 'state.npz'))
+                local_data = self.output.get_data(self.stack,
+                                                  clusters=self.clusters)
                 if self.output.save_plot:
                     path = os.path.join(self.output.output_dir, case_name,
                                         'plots', 'Convergence.png')
@@ -132,32 +337,473 @@ class Simulation:
                                               legend=['Current Density',
                                                       'Temperature'])
             else:
-                target_value = target_value[0:-i]
                 break
             output_stop_time = timeit.default_timer()
             self.timing['output'] += output_stop_time - output_start_time
-        output_start_time = timeit.default_timer()
-        if len(target_value) > 1:
-            self.output.write_data(current_densities, cell_voltages,
-                                   'Current Density [A/m²]', 'Cell Voltage',
-                                   units='V', directory=self.output.output_dir,
-                                   save_csv=True, save_plot=True,
-                                   write_mode='w')
-            # self.output.plot_polarization_curve(voltage_loss, cell_voltages,
-            #                                     target_value)
-        output_stop_time = timeit.default_timer()
-        self.timing['output'] += output_stop_time - output_start_time
+        return cell_voltages, current_densities, local_data
+
+    def solve(self, tar_value, reset_distribution=True):
+        """
+        Iterates the coupled stack system at the provided operating point
+        until convergence. If an iteration callback is set, it is called
+        with the record of each iteration and the iteration is stopped,
+        if the callback returns True.
+        """
+        current_errors = []
+        temp_errors = []
+        for record in self.iterate(tar_value, reset_distribution):
+            current_errors.append(record['current_error'])
+            temp_errors.append(record['temp_error'])
+            if self.iteration_callback is not None:
+                if self.iteration_callback(record):
+                    break
+        return len(current_errors), current_errors, temp_errors
+
+    def solve_grid_sequence(self, tar_value):
+        """
+        Solves the operating point on the levels of the grid sequence from
+        the coarsest to the target discretization of the channels, each
+        level starting from the solution of the previous level interpolated
+        along the channels. If a coarse level fails or raises a numerical
+        error, its stack is discarded and the next level starts from the
+        initial distributions.
+        """
+        grid = self.grid_sequence
+        fine_stack = self.stack
+        if len(self.coarse_stacks) != grid.n_levels - 1 \
+                or any(coarse_stack.n_cells != fine_stack.n_cells
+                       for coarse_stack in self.coarse_stacks):
+            for coarse_stack in self.coarse_stacks:
+                coarse_stack.close()
+            self.coarse_stacks = [self.create_stack(n_nodes)
+                                  for n_nodes in grid.n_nodes[:-1]]
+        it_crit = self.it_crit
+        counter = 0
+        current_errors = []
+        temp_errors = []
+        iterations = []
+        coarse_stack = None
+        failed_levels = []
+        try:
+            for level, level_stack in \
+                    enumerate(self.coarse_stacks + [fine_stack]):
+                self.stack = level_stack
+                if coarse_stack is not None:
+                    grid.prolongate_state(coarse_stack, level_stack)
+                if level < grid.n_levels - 1:
+                    if grid.criteria is not None:
+                        self.it_crit = grid.criteria
+                    try:
+                        n_iterations, level_current_errors, \
+                            level_temp_errors = \
+                            self.solve(tar_value,
+                                       reset_distribution=coarse_stack is None)
+                    except (FloatingPointError, ValueError):
+                        # coarse level is skipped, the next level starts from
+                        # the initial distributions
+                        failed_levels.append(level)
+                        coarse_stack = None
+                        iterations.append(0)
+                        continue
+                else:
+                    self.it_crit = it_crit
+                    n_iterations, level_current_errors, level_temp_errors = \
+                        self.solve(tar_value,
+                                   reset_distribution=coarse_stack is None)
+                counter += n_iterations
+                current_errors += level_current_errors
+                temp_errors += level_temp_errors
+                iterations.append(n_iterations)
+                if level_stack.break_program or self.aborted:
+                    coarse_stack = None
+                else:
+                    coarse_stack = level_stack
+        finally:
+            self.stack = fine_stack
+            self.it_crit = it_crit
+        grid.iterations.append({'target_value': tar_value,
+                                'nodes': list(grid.n_nodes),
+                                'iterations': iterations})
+        if failed_levels:
+            # levels raising numerical errors are removed from the sequence
+            grid.remove_levels(failed_levels)
+            for level in failed_levels:
+                self.coarse_stacks[level].close()
+            self.coarse_stacks = \
+                [coarse_stack for level, coarse_stack
+                 in enumerate(self.coarse_stacks)
+                 if level not in failed_levels]
+        if any(coarse_stack.break_program
+               for coarse_stack in self.coarse_stacks):
+            # failed stacks are recreated for the next operating point
+            for coarse_stack in self.coarse_stacks:
+                coarse_stack.close()
+            self.coarse_stacks = []
+        return counter, current_errors, temp_errors
+
+    def refine_clusters(self, tar_value):
+        """
+        Refines the cell clusters of the reduced-order stack, while the
+        spread of the cell voltages within a cluster exceeds the tolerance,
+        and solves each refined stack starting from the solution of the
+        coarser stack interpolated along the stack axis
+        """
+        counter = 0
+        current_errors = []
+        temp_errors = []
+        for i in range(self.clusters.max_refinements):
+            if self.stack.break_program or self.aborted:
+                break
+            positions = self.clusters.positions
+            if not self.clusters.refine(self.stack.v):
+                break
+            coarse_stack = self.stack
+            self.stack = self.create_stack()
+            new_positions = self.clusters.positions
+            temp_sys = self.stack.temp_sys
+            temp_sys.set_layer_temperatures(
+                reduced_order.interpolate_cells(
+                    coarse_stack.cell_arrays.temp_layer, positions,
+                    new_positions))
+            self.stack.set_state(
+                {'i_cd': reduced_order.interpolate_cells(
+                    coarse_stack.i_cd, positions, new_positions),
+                 'temp_layer_vec': np.copy(temp_sys.temp_layer_vec),
+                 'channel_mass_flow': []})
+            coarse_stack.close()
+            if self.urf_controller is not None:
+                self.urf_controller = \
+                    acceleration.AdaptiveUnderRelaxation(
+                        self.urf_dict, self.stack.cells[0].urf,
+                        self.stack.n_cells)
+            # states of the coarser stack are not applicable anymore
+            self.continuation_history = []
+            n_iterations, refined_current_errors, refined_temp_errors = \
+                self.solve(tar_value, reset_distribution=False)
+            counter += n_iterations
+            current_errors += refined_current_errors
+            temp_errors += refined_temp_errors
+        return counter, current_errors, temp_errors
+
+    def iterate(self, tar_value, reset_distribution=True):
+        """
+        Generator for the iterations of the coupled stack system at the
+        provided operating point, yields a record for each outer iteration
+        until convergence, the maximum number of iterations, or the abort
+        of the stack update is reached
+        """
+        counter = 0
+        n_retries = 0
+        self.aborted = False
+        if self.accelerator is not None:
+            self.accelerator.reset()
+        if self.urf_controller is not None:
+            self.urf_controller.reset()
+        if self.monitor is not None:
+            self.monitor.reset()
+            self.stack.urf = \
+                None if self.urf_controller is None \
+                else self.urf_controller.urf
+        self.stack.residual = None
+        start_time = timeit.default_timer()
+        while True:
+            if counter == 0:
+                if self.current_control:
+                    self.stack.update(current_density=tar_value,
+                                      reset_distribution=reset_distribution)
+                else:
+                    self.stack.update(voltage=tar_value)
+            else:
+                self.stack.update()
+            if self.stack.break_program:
+                break
+            current_error, temp_error = self.calc_convergence_criteria()
+            self.stack.residual = max(current_error, temp_error)
+            if self.urf_controller is not None:
+                self.update_underrelaxation(current_error)
+            counter += 1
+            self.timing['iterations'] += 1
+            converged = \
+                current_error < self.it_crit and temp_error < self.it_crit
+            event = None
+            if self.monitor is not None and not converged:
+                event = self.monitor.update(max(current_error, temp_error))
+            record = self.get_iteration_record(tar_value, counter,
+                                               current_error, temp_error,
+                                               converged, start_time)
+            if event is not None:
+                if self.monitor_action == 'retry' \
+                        and n_retries < self.monitor_max_retries:
+                    action = 'retry'
+                    n_retries += 1
+                    self.increase_damping()
+                    self.monitor.reset()
+                else:
+                    action = 'abort'
+                    self.aborted = True
+                self.convergence_events.append(
+                    {'target_value': tar_value, 'iteration': counter,
+                     'event': event, 'action': action})
+                record['event'] = self.convergence_events[-1]
+            yield record
+            if (converged and counter > self.min_it) or counter > self.max_it \
+                    or self.aborted:
+                break
+            if self.accelerator is not None:
+                self.accelerate()
+
+    def increase_damping(self):
+        """
+        Increases the underrelaxation factors of the current density updates
+        of all cells by the configured share of the remaining range to one
+        """
+        if self.stack.urf is None:
+            self.stack.urf = \
+                np.asarray([cell.urf for cell in self.stack.cells])
+        self.stack.urf[:] += self.monitor_damping * (1.0 - self.stack.urf)
+
+    def get_iteration_record(self, tar_value, counter, current_error,
+                             temp_error, converged, start_time):
+        """
+        Returns the record of an outer iteration with the residuals, the
+        computational time of the stack subsystems, and read-only views of
+        the main solution fields
+        """
+        fields = {'Current Density': self.stack.i_cd,
+                  'Temperature': self.stack.temp_sys.temp_layer_vec,
+                  'Cell Voltage': self.stack.v}
+        for key, value in fields.items():
+            view = value.view()
+            view.flags.writeable = False
+            fields[key] = view
+        return {'target_value': tar_value,
+                'iteration': counter,
+                'current_error': current_error,
+                'temp_error': temp_error,
+                'converged': converged,
+                'elapsed_time': timeit.default_timer() - start_time,
+                'timing': dict(self.stack.timing),
+                'fields': fields,
+                'event': None}
+
+    def update_underrelaxation(self, current_error):
+        """
+        Updates the underrelaxation factors of the cells with the adaptive
+        controller based on the current density residuals of the stack or
+        of each individual cell
+        """
+        if self.urf_per_cell:
+            i_cd = self.stack.i_cd
+            residual = np.sum(((i_cd - self.stack.i_cd_old) / i_cd) ** 2.0,
+                              axis=-1)
+        else:
+            residual = current_error
+        # the current density change between iterations scales with the
+        # applied factor (1 - urf), which is removed from the residual to
+        # compare the iterations independently of the underrelaxation
+        residual = residual / (1.0 - self.urf_controller.urf) ** 2.0
+        self.stack.urf = self.urf_controller.update(residual)
+
+    def get_iterate(self):
+        """
+        Returns the vectors of current density and layer temperatures before
+        (x) and after (G(x)) the last stack update
+        """
+        fc_stack = self.stack
+        x = np.concatenate((fc_stack.i_cd_old.flatten(), fc_stack.temp_old))
+        gx = np.concatenate((fc_stack.i_cd.flatten(),
+                             fc_stack.temp_sys.temp_layer_vec))
+        return x, gx
+
+    def set_iterate(self, x):
+        """
+        Sets the current density and layer temperatures of the stack from
+        the stacked vector x
+        """
+        fc_stack = self.stack
+        n_i_cd = fc_stack.i_cd.size
+        fc_stack.i_cd[:] = x[:n_i_cd].reshape(fc_stack.i_cd.shape)
+        fc_stack.elec_sys.i_cd[:] = fc_stack.i_cd
+        fc_stack.cell_arrays.i_cd[:] = fc_stack.i_cd
+        fc_stack.temp_sys.temp_layer_vec[:] = x[n_i_cd:]
+        fc_stack.temp_sys.update_cell_layer_temperatures()
+
+    def accelerate(self):
+        """
+        Calculates the next iterate of the current density and layer
+        temperatures with the fixed-point acceleration scheme, using the
+        values before (x) and after (G(x)) the last stack update. The
+        extrapolated current densities are limited to non-negative values.
+        """
+        start_time = timeit.default_timer()
+        x, gx = self.get_iterate()
+        x_new = self.accelerator.update(x, gx)
+        if self.accelerator.accelerated:
+            n_i_cd = self.stack.i_cd.size
+            x_new[:n_i_cd] = np.maximum(x_new[:n_i_cd], 0.0)
+            self.timing['accelerated_iterations'] += 1
+        self.set_iterate(x_new)
+        self.timing['acceleration'] += timeit.default_timer() - start_time
+
+    def solve_continuation(self, tar_value):
+        """
+        Solves the operating point starting from a stack state extrapolated
+        from the previously converged operating points (predictor-corrector
+        continuation). If the point fails, the step from the last converged
+        point is successively halved.
+        """
+        step_value = tar_value
+        n_refinements = 0
+        while True:
+            self.predict_state(step_value)
+            reset_distribution = \
+                not self.continuation_history and not self.warm_start
+            error = None
+            try:
+                result = self.solve(step_value,
+                                    reset_distribution=reset_distribution)
+                failed = self.stack.break_program or self.aborted
+            except (FloatingPointError, ValueError) as e:
+                error = e
+                failed = True
+            if not failed:
+                self.continuation_history.append(
+                    (step_value, self.stack.get_state()))
+                self.continuation_history = \
+                    self.continuation_history[-2:]
+                if step_value == tar_value:
+                    return result
+                step_value = tar_value
+            elif not self.continuation_history \
+                    or n_refinements >= self.max_refinements:
+                if error is not None:
+                    raise error
+                return result
+            else:
+                n_refinements += 1
+                last_value, last_state = self.continuation_history[-1]
+                self.stack.set_state(last_state)
+                step_value = last_value + 0.5 * (step_value - last_value)
+
+    def predict_state(self, tar_value):
+        """
+        Initializes the stack state for the provided operating point by
+        extrapolation from the last converged operating points: constant
+        (scaled current density) for a single point, secant predictor
+        for two points
+        """
+        history = self.continuation_history
+        if not history:
+            return
+        value_1, state_1 = history[-1]
+        if len(history) > 1 and self.continuation_order > 0 \
+                and history[-2][0] != value_1:
+            value_0, state_0 = history[-2]
+            factor = (tar_value - value_1) / (value_1 - value_0)
+            state = {'i_cd': state_1['i_cd']
+                     + factor * (state_1['i_cd'] - state_0['i_cd']),
+                     'temp_layer_vec': state_1['temp_layer_vec']
+                     + factor * (state_1['temp_layer_vec']
+                                 - state_0['temp_layer_vec']),
+                     'channel_mass_flow':
+                         [flow_1 + factor * (flow_1 - flow_0)
+                          for flow_0, flow_1 in
+                          zip(state_0['channel_mass_flow'],
+                              state_1['channel_mass_flow'])]}
+            state['i_cd'][:] = np.maximum(state['i_cd'], 1e-3)
+            for mass_flow in state['channel_mass_flow']:
+                mass_flow[:] = np.maximum(mass_flow, 1e-12)
+        else:
+            state = {key: value for key, value in state_1.items()}
+            if self.current_control and value_1 != 0.0:
+                state['i_cd'] = state_1['i_cd'] * tar_value / value_1
+        self.stack.set_state(state)
+
+    def run_parallel(self):
+        """
+        Distributes the operating points in contiguous chunks over a pool of
+        worker processes. Each chunk is calculated by an independent
+        simulation, so that the points within a chunk are warm-started from
+        their predecessors. The results are gathered in the order of the
+        operating points.
+        """
+        if self.current_control:
+            values = self.current_density
+        else:
+            values = self.average_cell_voltage
+        values = list(np.atleast_1d(values))
+        n_values = len(values)
+        chunk_size = self.chunk_size
+        if chunk_size is None:
+            chunk_size = int(np.ceil(n_values / self.n_workers))
+        chunk_size = max(int(chunk_size), 1)
+        offsets = list(range(0, n_values, chunk_size))
+        n_workers = min(self.n_workers, len(offsets))
+        simulation_start_time = timeit.default_timer()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(run_chunk, self.settings,
+                                       values[offset:offset + chunk_size],
+                                       offset, np.geterr())
+                       for offset in offsets]
+            results = [future.result() for future in futures]
+        simulation_stop_time = timeit.default_timer()
+        self.timing['parallel'] = \
+            self.timing.get('parallel', 0.0) \
+            + simulation_stop_time - simulation_start_time
+        # wall-clock time of the worker pool, the simulation times of the
+        # workers are added up below
+
+        cell_voltages = []
+        current_densities = []
+        local_data = None
+        global_data = None
+        for i, result in enumerate(results):
+            for key in ('iterations', 'simulation', 'output',
+                        'acceleration', 'accelerated_iterations'):
+                self.timing[key] += result['timing'].get(key, 0)
+            self.timing['point_iterations'] += \
+                result['timing'].get('point_iterations', [])
+            cell_voltages += result['cell_voltages']
+            current_densities += result['current_densities']
+            self.convergence_events += result['convergence_events']
+            if self.grid_sequence is not None:
+                self.grid_sequence.iterations += result['grid_iterations']
+            if result['local_data'] is not None:
+                local_data = result['local_data']
+                global_data = result['global_data']
+                self.output.case_name = result['case_name']
+            self.output.written_files.update(result['output_files'])
+            # stop gathering at the first failed operating point to be
+            # consistent with the serial calculation
+            if result['failed']:
+                break
+        if global_data is None:
+            # the stack of this process has not been solved
+            raise ValueError('no operating point has been calculated '
+                             'successfully by the parallel workers')
+        return cell_voltages, current_densities, local_data, global_data
+
+    def get_global_data(self):
+        """
+        Returns the global stack results of the current state
+        """
         average_current_density = \
             np.average([np.average(cell.i_cd, weights=cell.active_area_dx)
-                        for cell in self.stack.cells])
+                        for cell in self.stack.cells],
+                       weights=self.stack.cell_weights)
+        cell_voltages = self.stack.v
+        if self.clusters is not None:
+            # voltages of all cells of the full stack
+            cell_voltages = self.clusters.interpolate(cell_voltages)
         global_data = \
             {'Stack Voltage': {'value': self.stack.v_stack, 'units': 'V'},
              'Average Cell Voltage':
-                 {'value': self.stack.v_stack/self.stack.n_cells, 'units': 'V'},
+                 {'value': self.stack.v_stack / self.stack.n_cells_total,
+                  'units': 'V'},
              'Minimum Cell Voltage':
-                 {'value': np.min(self.stack.v), 'units': 'V'},
+                 {'value': np.min(cell_voltages), 'units': 'V'},
              'Maximum Cell Voltage':
-                 {'value': np.max(self.stack.v), 'units': 'V'},
+                 {'value': np.max(cell_voltages), 'units': 'V'},
              'Average Current Density':
                  {'value': average_current_density, 'units': 'A/m²'},
              'Stack Power Density':
@@ -169,7 +815,7 @@ class Simulation:
                   'units': 'W'},
 
              }
-        return global_data, local_data
+        return global_data
 
     @staticmethod
     def get_voltage_losses(fc_stack):
@@ -232,3 +878,45 @@ class Simulation:
                             - self.stack.temp_sys.temp_layer_vec)
                           / self.stack.temp_sys.temp_layer_vec) ** 2.0))
         return current_error, temp_error
+
+
+def run_chunk(settings, target_values, case_offset, np_err=None):
+    """
+    Calculates a contiguous chunk of operating points with a separate
+    simulation object, used as worker task by Simulation.run_parallel
+    """
+    if np_err is not None:
+        np.seterr(**np_err)
+    settings = copy.deepcopy(settings)
+    dict_simulation = settings['simulation']
+    dict_simulation['parallel_workers'] = 1
+    dict_simulation['result_cache'] = {'active': False}
+    current_control = dict_simulation.get('current_control', True)
+    if 'operation_control' in dict_simulation:
+        current_control = \
+            dict_simulation['operation_control'].lower() == 'current'
+    if current_control:
+        dict_simulation['current_density'] = list(target_values)
+    else:
+        dict_simulation['average_cell_voltage'] = list(target_values)
+    sim = Simulation(settings)
+    target_value = sim.get_target_values()
+    cell_voltages, current_densities, local_data = \
+        sim.run_points(target_value, case_offset=case_offset)
+    global_data = None
+    if local_data is not None:
+        global_data = sim.get_global_data()
+    sim.close()
+    return {'target_value': list(target_value),
+            'failed': sim.stack.break_program,
+            'case_name': sim.output.case_name,
+            'output_files': sim.output.written_files,
+            'convergence_events': sim.convergence_events,
+            'grid_iterations':
+                [] if sim.grid_sequence is None
+                else sim.grid_sequence.iterations,
+            'cell_voltages': cell_voltages,
+            'current_densities': current_densities,
+            'local_data': local_data,
+            'global_data': global_data,
+            'timing': sim.timing}
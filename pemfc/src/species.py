@@ -9,10 +9,17 @@ from . import global_functions as g_func
 
 
 class FluidProperties(ABC):
-
+    """
+    Property data of one or several species; the objects are not modified
+    after construction and are therefore shared instead of duplicated when
+    the fluids holding them are copied
+    """
     def __init__(self):
         pass
 
+    def __deepcopy__(self, memo):
+        return self
+
     @abstractmethod
     def calc_property(self, property_name, temperature, pressure=101325.0):
         pass
@@ -51,6 +58,9 @@ class ConstantProperties(FluidProperties):
 
 class PolynomialProperties(FluidProperties, ABC):
 
+    _instances = {}
+    # shared instances by class and species names, see PolynomialProperties.get
+
     def __init__(self, species_list, property_names, poly_coeffs):
         super().__init__()
         self.names = g_func.ensure_list(species_list)
@@ -68,6 +78,20 @@ class PolynomialProperties(FluidProperties, ABC):
                                   axis=-1)
                           for item in self.coeff_dict_dict[prop_name]], axis=-1)
 
+    @classmethod
+    def get(cls, species):
+        """
+        Returns the shared instance of this class for the provided species,
+        the coefficient tables are only built on the first request
+        """
+        if isinstance(species, dict):
+            key = (cls, tuple(species.items()))
+        else:
+            key = (cls, tuple(g_func.ensure_list(species)))
+        if key not in cls._instances:
+            cls._instances[key] = cls(species)
+        return cls._instances[key]
+
     def calc_property(self, property_name, temperature, pressure=101325.0):
         if property_name in self.property_names:
             return polyval(temperature, self.coeff_dict_arr[property_name])
@@ -1,9 +1,12 @@
 # general imports
+import copy
+import timeit
 import numpy as np
 
 # local module imports
 from . import electrical_coupling as el_cpl, flow_circuit as flow_circuit, \
     cell as cl, temperature_system as therm_cpl, fluid as fluid, channel as chl
+from . import parallel, workspace
 from ..data import input_dicts
 # from ..gui import data_transfer
 
@@ -12,13 +15,43 @@ gui_data = True
 
 class Stack:
 
-    def __init__(self, n_nodes, current_control=False):
+    channel_state_names = ('temperature', 'pressure', 'mass_flow_total',
+                           'mass_flow', 'mole_flow', 'mass_source',
+                           'mole_source', 'heat')
+    circuit_state_names = ('channel_mass_flow', 'k_perm', 'f_in', 'f_out',
+                           'zeta')
+    # channel and flow circuit arrays written to and restored from state files
 
-        # Read settings dictionaries
-        stack_dict = input_dicts.sim_dict['stack']
+    def __init__(self, settings, n_nodes, current_control=False):
+
+        # Read settings dictionaries from a private copy of the settings tree,
+        # since some of the sub-dictionaries are modified during setup
+        if settings is None:
+            settings = input_dicts.sim_dict
+        settings = copy.deepcopy(settings)
+        self.settings = settings
+        stack_dict = settings['stack']
 
         self.n_cells = stack_dict['cell_number']
         # number of cells of the stack
+        cell_weights = stack_dict.get('cell_weights', None)
+        self.reduced_order = cell_weights is not None
+        # reduced-order stack, in which each cell represents a cluster of
+        # cells of the full stack
+        if cell_weights is None:
+            cell_weights = np.ones(self.n_cells)
+        self.cell_weights = np.asarray(cell_weights, dtype=float)
+        # number of cells of the full stack represented by each cell
+        if len(self.cell_weights) != self.n_cells:
+            raise ValueError('number of cell weights must match the number '
+                             'of cells')
+        self.n_cells_total = int(round(np.sum(self.cell_weights)))
+        # number of cells of the full stack
+        self.thread_pool = \
+            parallel.PartitionedThreadPool(stack_dict.get('cell_threads', 1))
+        # threads for the independent updates of the cells in each iteration
+        self.workspace = workspace.Workspace()
+        # preallocated temporary arrays of the stack components
         n_ele = n_nodes - 1
         # node points/elements along the x-axis
         self.calc_temp = stack_dict['calc_temperature']
@@ -28,10 +61,10 @@ class Stack:
         # self.calc_flow_dis = stack_dict['calc_flow_distribution']
         # switch to calculate the flow distribution
         if gui_data:
-            cell_dict = input_dicts.sim_dict['cell']
-            membrane_dict = input_dicts.sim_dict['membrane']
-            anode_dict = input_dicts.sim_dict['anode']
-            cathode_dict = input_dicts.sim_dict['cathode']
+            cell_dict = settings['cell']
+            membrane_dict = settings['membrane']
+            anode_dict = settings['anode']
+            cathode_dict = settings['cathode']
             ano_channel_dict = anode_dict['channel']
             cat_channel_dict = cathode_dict['channel']
             ano_fluid_dict = ano_channel_dict['fluid']
@@ -42,7 +75,7 @@ class Stack:
             cat_flow_circuit_dict = cathode_dict['flow_circuit']
             cat_in_manifold_dict = cat_flow_circuit_dict['inlet_manifold']
             cat_out_manifold_dict = cat_flow_circuit_dict['outlet_manifold']
-            temperature_dict = input_dicts.sim_dict['temperature_system']
+            temperature_dict = settings['temperature_system']
         else:
             raise NotImplementedError
             # cell_dict = in_dicts.dict_cell
@@ -78,7 +111,12 @@ class Stack:
                                          fluid.dict_factory(fluid_dicts[i]))
                              for j in range(self.n_cells)])
 
-        # Initialize fuel cells
+        # Initialize fuel cells, the cell state arrays are stored as views
+        # into stack-wide arrays
+        self.cell_arrays = cl.CellArrays(self.n_cells, n_ele)
+        clone_cells = stack_dict.get('clone_cells', False)
+        # create the interior cells as copies of a template cell sharing
+        # its constant data
         self.cells = []
         for i in range(self.n_cells):
             if self.n_cells == 1:
@@ -98,9 +136,15 @@ class Stack:
                 cell_dict['heat_pow'] = temperature_dict['heat_pow']
 
             cell_channels = [channels[0][i], channels[1][i]]
-            # Cell constructor
-            cell = cl.Cell(cell_dict, membrane_dict, half_cell_dicts,
-                           cell_channels, number=i)
+            if clone_cells and 1 < i < self.n_cells - 1:
+                # interior cells are copies of the first interior cell
+                cell = self.cells[1].clone(i, cell_channels)
+            else:
+                # Cell constructor
+                cell = cl.Cell(cell_dict, membrane_dict, half_cell_dicts,
+                               cell_channels, number=i,
+                               arrays=self.cell_arrays,
+                               workspace=self.workspace)
             if i == 0:
                 cell.coords[0] = 0.0
                 cell.coords[1] = cell.thickness
@@ -108,10 +152,27 @@ class Stack:
                 cell.coords[0] = self.cells[i - 1].coords[1]
                 cell.coords[1] = cell.coords[0] + cell.thickness
             self.cells.append(cell)
+        self.cell_bank = None
+        # batched update of the electrochemistry of all cells (CellBank)
+        if stack_dict.get('cell_bank', False) and current_control \
+                and cl.CellBank.is_compatible(self.cells):
+            self.cell_bank = cl.CellBank(self.cells, self.cell_arrays)
 
         # Initialize flow circuits
         manifold_length = \
             self.cells[-1].coords[-1] - self.cells[0].coords[0]
+        if self.reduced_order:
+            # manifolds of the full stack with the junctions of the
+            # represented cell clusters
+            manifold_length = \
+                np.sum(self.cell_weights
+                       * np.asarray([cell.thickness for cell in self.cells]))
+            manifold_in_dicts = \
+                [self.reduce_manifold_dict(manifold_dict, self.cell_weights)
+                 for manifold_dict in manifold_in_dicts]
+            manifold_out_dicts = \
+                [self.reduce_manifold_dict(manifold_dict, self.cell_weights)
+                 for manifold_dict in manifold_out_dicts]
         self.fuel_circuits = []
         for i in range(len(half_cell_dicts)):
             manifold_in_dicts[i]['length'] = manifold_length
@@ -121,14 +182,15 @@ class Stack:
                 flow_circuit.factory(flow_circuit_dicts[i],
                                      manifold_in_dicts[i],
                                      manifold_out_dicts[i],
-                                     channels[i], sub_channel_number))
+                                     channels[i], sub_channel_number,
+                                     channel_weights=self.cell_weights,
+                                     workspace=self.workspace))
 
         cool_flow = stack_dict['cool_flow']
         if cool_flow:
-            coolant_channel_dict = input_dicts.sim_dict['coolant_channel']
+            coolant_channel_dict = settings['coolant_channel']
             coolant_dict = coolant_channel_dict['fluid']
-            dict_coolant_flow_circuit = \
-                input_dicts.sim_dict['coolant_flow_circuit']
+            dict_coolant_flow_circuit = settings['coolant_flow_circuit']
             dict_coolant_in_manifold = \
                 dict_coolant_flow_circuit['inlet_manifold']
             dict_coolant_out_manifold = \
@@ -143,6 +205,19 @@ class Stack:
                 n_cool = self.n_cells + 1
             else:
                 n_cool = self.n_cells - 1
+            # each coolant channel is attached to the cathode side of a cell
+            # and thus represents the coolant channels of its cell cluster
+            if cool_bc:
+                cool_weights = np.append(self.cell_weights, 1.0)
+            else:
+                cool_weights = self.cell_weights[1:]
+            if self.reduced_order and n_cool > 0:
+                dict_coolant_in_manifold = \
+                    self.reduce_manifold_dict(dict_coolant_in_manifold,
+                                              cool_weights)
+                dict_coolant_out_manifold = \
+                    self.reduce_manifold_dict(dict_coolant_out_manifold,
+                                              cool_weights)
 
             n_cool_cell = temperature_dict['cool_ch_numb']
             cool_channels = []
@@ -165,7 +240,9 @@ class Stack:
                     flow_circuit.factory(dict_coolant_flow_circuit,
                                          dict_coolant_in_manifold,
                                          dict_coolant_out_manifold,
-                                         cool_channels, n_cool_cell)
+                                         cool_channels, n_cool_cell,
+                                         channel_weights=cool_weights,
+                                         workspace=self.workspace)
             else:
                 self.coolant_circuit = None
         else:
@@ -177,6 +254,12 @@ class Stack:
 
         self.flow_circuits = \
             [self.fuel_circuits[0], self.fuel_circuits[1], self.coolant_circuit]
+        if stack_dict.get('concurrent_flow_circuits', False):
+            n_flow_threads = len(self.flow_circuits)
+        else:
+            n_flow_threads = 1
+        self.flow_thread_pool = parallel.PartitionedThreadPool(n_flow_threads)
+        # threads for the concurrent update of the independent flow circuits
 
         self.current_control = current_control
 
@@ -195,6 +278,10 @@ class Stack:
         self.elec_sys = el_cpl.ElectricalCoupling(self)
         # Initialize temperature src
         self.temp_sys = therm_cpl.TemperatureSystem(self, temperature_dict)
+        self.linear_solvers = [self.temp_sys.linear_solver]
+        if self.n_cells > 1:
+            self.linear_solvers.append(self.elec_sys.linear_solver)
+        # sparse linear solvers of the coupled subsystems
 
         """boolean alarms"""
         self.v_alarm = False
@@ -213,24 +300,35 @@ class Stack:
         #                                         a=0.5, b=0.0)
         # current density array of previous iteration step
         self.i_cd_old = np.copy(self.i_cd)
+        # cell-wise underrelaxation factors for the current density update
+        # (None: use underrelaxation factor from settings)
+        self.urf = None
+        # residual of the previous outer iteration, which sets the tolerance
+        # of the iterative linear solvers (None: first iteration)
+        self.residual = None
+        # computational time of the subsystems during the last update
+        self.timing = {'flow': 0.0, 'cells': 0.0, 'temperature': 0.0,
+                       'electrical': 0.0}
         self.i_cd_avg = self.i_cd_target
         # voltage array
         self.v = np.zeros(self.n_cells)
         self.v_stack = None
         self.v_loss = None
-        self.e_0 = self.n_cells * self.cells[0].e_0
+        self.e_0 = self.n_cells_total * self.cells[0].e_0
 
         # old temperature for convergence calculation
         self.temp_old = np.zeros(self.temp_sys.temp_layer_vec.shape)
         self.temp_old[:] = self.temp_sys.temp_layer_vec
 
-    def update(self, current_density=None, voltage=None):
+    def update(self, current_density=None, voltage=None,
+               reset_distribution=True):
         """
         This function coordinates the program sequence
         """
         update_inflows = False
         if current_density is not None:
-            self.i_cd[:] = current_density
+            if reset_distribution:
+                self.i_cd[:] = current_density
             self.i_cd_avg = current_density
             update_inflows = True
         elif voltage is not None:
@@ -238,32 +336,210 @@ class Stack:
             update_inflows = True
         if self.current_control is False:
             update_inflows = True
+        start_time = timeit.default_timer()
         self.update_flows(update_inflows,
                           coolant_temp_diff=self.coolant_temp_diff,
                           coolant_mass_flow=self.coolant_mass_flow)
-        for i, cell in enumerate(self.cells):
-            cell.update(self.i_cd[i, :], current_control=self.current_control)
-            if cell.break_program:
-                self.break_program = True
-                break
+        flow_time = timeit.default_timer()
+        self.timing['flow'] = flow_time - start_time
+
+        def update_cell(i):
+            urf = None if self.urf is None else self.urf[i]
+            cell = self.cells[i]
+            cell.update(self.i_cd[i, :], current_control=self.current_control,
+                        urf=urf)
+            return cell.break_program
+
+        if self.cell_bank is not None:
+            self.cell_bank.update(self.i_cd, urf=self.urf)
+        elif any(self.thread_pool.map(update_cell, self.n_cells, stop=bool)):
+            self.break_program = True
+        cell_time = timeit.default_timer()
+        self.timing['cells'] = cell_time - flow_time
         self.i_cd_old[:] = self.elec_sys.i_cd
         self.temp_old[:] = self.temp_sys.temp_layer_vec
+        for solver in self.linear_solvers:
+            solver.residual = self.residual
         if not self.break_program:
             if self.calc_temp:
                 self.temp_sys.update()
+            temp_time = timeit.default_timer()
+            self.timing['temperature'] = temp_time - cell_time
             if self.calc_electric:
                 self.elec_sys.update(current_density=current_density,
                                      voltage=voltage)
                 self.i_cd[:] = self.elec_sys.i_cd
-            self.v[:] = \
-                np.asarray([np.average(cell.v, weights=cell.active_area_dx)
-                            for cell in self.cells])
+            self.timing['electrical'] = timeit.default_timer() - temp_time
+            self.v[:] = np.average(self.cell_arrays.v, axis=-1,
+                                   weights=self.cell_arrays.active_area_dx)
             if self.current_control:
-                self.v_stack = np.sum(self.v)
+                self.v_stack = np.sum(self.cell_weights * self.v)
                 self.v_loss = self.e_0 - self.v_stack
             self.i_cd_avg = np.average(self.i_cd[0],
                                        weights=self.cells[0].active_area_dx)
 
+    def close(self):
+        """
+        Shuts down the worker threads of the cell and flow circuit updates,
+        which are only restarted if the stack is updated again
+        """
+        self.thread_pool.shutdown()
+        self.flow_thread_pool.shutdown()
+
+    def get_state(self):
+        """
+        Returns a copy of the main solution variables (current density,
+        layer temperatures and channel flow distributions) of the stack
+        """
+        return {'i_cd': np.copy(self.i_cd),
+                'temp_layer_vec': np.copy(self.temp_sys.temp_layer_vec),
+                'channel_mass_flow':
+                    [np.copy(circuit.channel_mass_flow)
+                     for circuit in self.flow_circuits if circuit is not None]}
+
+    def set_state(self, state):
+        """
+        Sets the main solution variables of the stack from a state dictionary
+        as returned by get_state() and resets the abort flags
+        """
+        self.i_cd[:] = state['i_cd']
+        self.elec_sys.i_cd[:] = self.i_cd
+        self.cell_arrays.i_cd[:] = self.i_cd
+        for cell in self.cells:
+            cell.break_program = False
+        self.temp_sys.temp_layer_vec[:] = state['temp_layer_vec']
+        self.temp_sys.update_cell_layer_temperatures()
+        circuits = [circuit for circuit in self.flow_circuits
+                    if circuit is not None]
+        for circuit, mass_flow in zip(circuits, state['channel_mass_flow']):
+            circuit.channel_mass_flow[:] = mass_flow
+            circuit.mass_flow_in = np.sum(circuit.channel_mass_flow)
+            circuit.initialize = False
+        self.break_program = False
+
+    def get_state_channels(self):
+        """
+        Returns the channels and manifolds of all flow circuits together with
+        the key prefixes used in state files
+        """
+        circuits = [circuit for circuit in self.flow_circuits
+                    if circuit is not None]
+        state_channels = []
+        for i, circuit in enumerate(circuits):
+            prefix = 'circuit_{}_'.format(i)
+            for j, channel in enumerate(circuit.channels):
+                state_channels.append(
+                    (prefix + 'channel_{}_'.format(j), channel))
+            for j, manifold in enumerate(circuit.manifolds):
+                state_channels.append(
+                    (prefix + 'manifold_{}_'.format(j), manifold))
+        return state_channels
+
+    def save_state(self, path):
+        """
+        Writes the full solution state of the stack (cell, channel, flow
+        circuit and temperature system variables) to a compressed .npz file,
+        which can be restored with load_state() for restarts or warm starts
+        """
+        state = {'i_cd': self.i_cd,
+                 'temp_layer_vec': self.temp_sys.temp_layer_vec,
+                 'v': self.v}
+        for i, cell in enumerate(self.cells):
+            prefix = 'cell_{}_'.format(i)
+            state[prefix + 'temp_layer'] = cell.temp_layer
+            state[prefix + 'v'] = cell.v
+        circuits = [circuit for circuit in self.flow_circuits
+                    if circuit is not None]
+        for i, circuit in enumerate(circuits):
+            prefix = 'circuit_{}_'.format(i)
+            for name in self.circuit_state_names:
+                if getattr(circuit, name, None) is not None:
+                    state[prefix + name] = getattr(circuit, name)
+        for prefix, channel in self.get_state_channels():
+            for name in self.channel_state_names:
+                if hasattr(channel, name):
+                    state[prefix + name] = getattr(channel, name)
+        np.savez_compressed(path, **state)
+
+    def load_state(self, path):
+        """
+        Restores the solution state of the stack from a file written by
+        save_state(). The stack must have the same discretization as the
+        stack the state was saved from.
+        """
+        with np.load(path) as data:
+            state = dict(data)
+        for key in ('i_cd', 'temp_layer_vec'):
+            if key not in state:
+                raise KeyError('{} is missing in state file {}'
+                               .format(key, path))
+        if state['i_cd'].shape != self.i_cd.shape \
+                or state['temp_layer_vec'].shape \
+                != self.temp_sys.temp_layer_vec.shape:
+            raise ValueError('state file {} does not conform to the '
+                             'discretization of the stack'.format(path))
+        self.set_state({'i_cd': state['i_cd'],
+                        'temp_layer_vec': state['temp_layer_vec'],
+                        'channel_mass_flow': []})
+        if 'v' in state:
+            self.v[:] = state['v']
+            self.v_stack = np.sum(self.cell_weights * self.v)
+            self.v_loss = self.e_0 - self.v_stack
+        for i, cell in enumerate(self.cells):
+            prefix = 'cell_{}_'.format(i)
+            if prefix + 'v' in state:
+                cell.v[:] = state[prefix + 'v']
+        circuits = [circuit for circuit in self.flow_circuits
+                    if circuit is not None]
+        for i, circuit in enumerate(circuits):
+            prefix = 'circuit_{}_'.format(i)
+            if prefix + 'channel_mass_flow' not in state:
+                continue
+            for name in self.circuit_state_names:
+                if prefix + name not in state:
+                    continue
+                value = getattr(circuit, name, None)
+                if isinstance(value, np.ndarray) \
+                        and value.shape == state[prefix + name].shape:
+                    value[:] = state[prefix + name]
+                else:
+                    setattr(circuit, name, np.copy(state[prefix + name]))
+            circuit.mass_flow_in = np.sum(circuit.channel_mass_flow)
+            circuit.initialize = False
+        for prefix, channel in self.get_state_channels():
+            for name in self.channel_state_names:
+                if prefix + name in state:
+                    getattr(channel, name)[:] = state[prefix + name]
+            self.update_channel_fluid(channel)
+
+    @staticmethod
+    def update_channel_fluid(channel):
+        """
+        Updates the fluid properties of a channel after its state variables
+        have been set
+        """
+        if hasattr(channel, 'mole_flow'):
+            channel.fluid.update(channel.temperature, channel.pressure,
+                                 channel.mole_flow)
+        else:
+            channel.fluid.update(channel.temperature, channel.pressure)
+
+    @staticmethod
+    def reduce_manifold_dict(manifold_dict, weights):
+        """
+        Returns a copy of the manifold settings for a reduced-order stack,
+        whose manifold elements span the junctions of the represented cells
+        according to the provided weights. The element lengths and the
+        constant junction pressure loss coefficients are scaled accordingly.
+        """
+        manifold_dict = manifold_dict.copy()
+        coords = np.concatenate(([0.0], np.cumsum(weights)))
+        manifold_dict['relative_coordinates'] = coords / coords[-1]
+        zeta_const = manifold_dict.get('constant_friction_factor', 0.0)
+        manifold_dict['constant_friction_factor'] = \
+            zeta_const * np.asarray(weights)
+        return manifold_dict
+
     def update_flows(self, update_inflows=False,
                      coolant_temp_diff=None, coolant_mass_flow=None):
         """
@@ -272,8 +548,7 @@ class Stack:
         mass_flows_in = [None, None]
         if update_inflows:
             mass_flows_in[:] = self.calc_mass_flows()
-        for i in range(len(self.fuel_circuits)):
-            self.fuel_circuits[i].update(mass_flows_in[i])
+        circuits = list(self.fuel_circuits)
         if self.coolant_circuit is not None:
             cool_mass_flow = None
             if self.current_control or update_inflows:
@@ -281,12 +556,17 @@ class Stack:
                     cool_mass_flow = coolant_mass_flow
                 elif coolant_temp_diff is not None:
                     cool_mass_flow = self.calc_cool_mass_flow(coolant_temp_diff)
-            self.coolant_circuit.update(cool_mass_flow)
+            circuits.append(self.coolant_circuit)
+            mass_flows_in.append(cool_mass_flow)
+        # the flow circuits share no data and are updated concurrently, if
+        # the flow thread pool is active
+        self.flow_thread_pool.map(
+            lambda i: circuits[i].update(mass_flows_in[i]), len(circuits))
 
     def calc_cool_mass_flow(self, coolant_temp_diff):
         n_cool_cell = self.coolant_circuit.n_subchannels
         if self.v_loss is None:
-            v_loss = 0.5 * self.n_cells
+            v_loss = 0.5 * self.n_cells_total
         else:
             v_loss = self.v_loss
         heat = self.i_cd_avg * self.cells[0].active_area * v_loss
@@ -302,7 +582,7 @@ class Stack:
                 self.cells[0].half_cells[i].calc_inlet_flow(self.i_cd_avg)
             cell_mass_flow = np.sum(cell_mass_flow, axis=0)
             mass_flow = cell_mass_flow \
-                * self.cells[0].half_cells[i].n_channel * self.n_cells
+                * self.cells[0].half_cells[i].n_channel * self.n_cells_total
             mass_flows_in.append(mass_flow)
         return mass_flows_in
 
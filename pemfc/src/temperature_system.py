@@ -1,13 +1,11 @@
 # general imports
 import numpy as np
-import copy
 from scipy import linalg as sp_la
 from scipy import sparse
-from scipy.sparse.linalg import spsolve
 
 # local module imports
 from . import matrix_functions as mtx, cell as fcell, \
-    global_functions as g_func, channel as chl
+    channel as chl, linear_solver
 
 # import pandas as pd
 # from numba import jit
@@ -24,18 +22,26 @@ class TemperatureSystem:
         if not isinstance(self.cells[0], fcell.Cell):
             raise TypeError
         self.n_cells = stack.n_cells
+        self.thread_pool = stack.thread_pool
+        # threads for the independent channel updates
+        self.workspace = stack.workspace
+        # preallocated temporary arrays
 
         # use SciPy sparse solver, efficient for larger sparse matrices
         self.sparse_solve = True
-
-        # instead of solving the completely coupled temperature src at once
-        # solve the decoupled cell-wise temperature systems and iterate
-        # however not working yet!!!
-        self.solve_individual_cells = False
+        self.linear_solver = linear_solver.factory(
+            stack.settings['stack'].get('temperature_linear_solver', {}),
+            block_sizes=[cell.n_layer * cell.n_ele for cell in self.cells],
+            thread_pool=self.thread_pool)
+        # solver for the sparse linear system of the layer temperatures, the
+        # cells form the blocks of the block-tridiagonal matrix, which are
+        # partitioned into concurrently solved subdomains by the domain
+        # decomposition solver
 
         # sub channel ratios
         self.n_cat_channels = stack.fuel_circuits[0].n_subchannels
         self.n_ano_channels = stack.fuel_circuits[1].n_subchannels
+        self.fuel_circuits = stack.fuel_circuits
 
         # coolant flow settings
         self.cool_flow = False
@@ -50,6 +56,7 @@ class TemperatureSystem:
             else:
                 self.cool_ch_bc = False
             self.n_cool_sub_channels = stack.coolant_circuit.n_subchannels
+            self.cool_channel_bank = stack.coolant_circuit.channel_bank
 
         self.e_tn = self.cells[0].e_tn
         # thermodynamic neutral cell potential
@@ -86,7 +93,7 @@ class TemperatureSystem:
             else:
                 k_amb_vector = cell.k_amb[:-1].transpose().flatten()
 
-            cell.add_implicit_layer_source(cell.heat_mtx_const, -k_amb_vector)
+            cell.heat_diag_const[:] = -k_amb_vector
             cell.add_explicit_layer_source(cell.heat_rhs_const,
                                            k_amb_vector * temp_amb)
 
@@ -95,23 +102,75 @@ class TemperatureSystem:
 
         self.index_list, self.layer_index_list = \
             mtx.create_index_lists(self.cells)
-
+        # cell and layer ids with the corresponding indices of the
+        # temperature vector for the stack-wide layer temperature array
+        self.cell_arrays = stack.cell_arrays
+        self.layer_cell_ids = \
+            np.asarray([i for i, cell in enumerate(self.cells)
+                        for j in range(cell.n_layer)])
+        self.layer_ids = \
+            np.asarray([j for cell in self.cells for j in range(cell.n_layer)])
+        self.layer_index = \
+            np.asarray([self.index_list[i][j] for i, cell
+                        in enumerate(self.cells) for j in range(cell.n_layer)])
+
+        self.index_arrays = [np.asarray(index) for index in self.index_list]
+        # indices of the layer temperatures of each cell (layers, elements)
         self.mtx_const = self.connect_cells()
         if self.sparse_solve:
-            self.mtx_const = sparse.csr_matrix(self.mtx_const)
+            self.init_sparse_pattern()
 
     def connect_cells(self):
-        matrix = sp_la.block_diag(*[cell.heat_mtx_const for cell in self.cells])
+        """
+        Assembles the constant conductance matrix of the stack from the cell
+        matrices, the constant diagonal sources and the conductances between
+        the cells, as sparse matrix without dense intermediates if the
+        sparse solver is used
+        """
+        diag_const = np.hstack([cell.heat_diag_const for cell in self.cells])
         cell_ids = np.asarray([list(range(self.n_cells-1)),
                                list(range(1, self.n_cells))]).transpose()
         layer_ids = np.asarray([(-1, 0) for i in range(self.n_cells-1)])
         conductance = \
             np.asarray([self.cells[i].thermal_conductance_z[layer_ids[i][0]]
                         for i in range(self.n_cells-1)])
+        if self.sparse_solve:
+            matrix = sparse.block_diag(
+                [cell.heat_mtx_const for cell in self.cells], format='csr')
+            matrix = matrix + sparse.diags(diag_const, format='csr')
+            connection = \
+                mtx.build_connection_matrix(matrix.shape, cell_ids,
+                                            layer_ids, conductance,
+                                            self.index_list)
+            return (matrix + connection).tocsr()
+        matrix = sp_la.block_diag(*[cell.heat_mtx_const.toarray()
+                                    for cell in self.cells])
+        matrix[np.diag_indices_from(matrix)] += diag_const
         mtx.connect_cells(matrix, cell_ids, layer_ids,
                           conductance, self.index_list)
         return matrix
 
+    def init_sparse_pattern(self):
+        """
+        Creates the sparse conductance matrix with the fixed sparsity pattern
+        of the constant conductances and the diagonal, and the positions of
+        the diagonal entries in its data array, so that the dynamic
+        conductances only update the data array in place
+        """
+        n = self.mtx_const.shape[0]
+        diag_ids = np.arange(n)
+        pattern = abs(self.mtx_const) + sparse.identity(n, format='csr')
+        pattern = sparse.csr_matrix(pattern)
+        pattern.sort_indices()
+        self.mtx = pattern
+        # constant part of the matrix data
+        const_coo = self.mtx_const.tocoo()
+        self.mtx_const_data = np.zeros(pattern.nnz)
+        self.mtx_const_data[mtx.csr_data_index(
+            pattern, const_coo.row, const_coo.col)] = const_coo.data
+        # positions of the diagonal entries
+        self.diag_index = mtx.csr_data_index(pattern, diag_ids, diag_ids)
+
     def update(self):
         """
         This function coordinates the program sequence
@@ -138,16 +197,35 @@ class TemperatureSystem:
         """
         Calculates the fluid temperatures in the anode and cathode channels
         """
-        for i, cell in enumerate(self.cells):
-            cell.cathode.channel.update_heat(wall_temp=cell.temp_layer[1],
-                                             update_fluid=False)
-            cell.anode.channel.update_heat(wall_temp=cell.temp_layer[4],
-                                           update_fluid=False)
+        # wall layer ids of the cathode and anode channels
+        layer_ids = (1, 4)
+        for circuit, layer_id in zip(self.fuel_circuits, layer_ids):
+            if circuit.channel_bank is not None:
+                circuit.channel_bank.update_heat(
+                    wall_temp=self.cell_arrays.temp_layer[:, layer_id],
+                    update_fluid=False)
+            else:
+                def update_channel(i):
+                    circuit.channels[i].update_heat(
+                        wall_temp=self.cells[i].temp_layer[layer_id],
+                        update_fluid=False)
+
+                self.thread_pool.map(update_channel, len(circuit.channels))
 
     def update_coolant_channel(self):
         """
             Calculates the coolant channel temperatures.
         """
+        if self.cool_channel_bank is not None:
+            temp_layer = self.cell_arrays.temp_layer
+            if self.cool_ch_bc:
+                wall_temp = np.concatenate((temp_layer[:, 0],
+                                            temp_layer[-1:, -1]))
+            else:
+                wall_temp = temp_layer[1:, 0]
+            self.cool_channel_bank.update_heat(wall_temp=wall_temp,
+                                               update_fluid=False)
+            return
         for i, cool_chl in enumerate(self.cool_channels):
             if self.cool_ch_bc:
                 if i == self.n_cool - 1:
@@ -225,69 +303,48 @@ class TemperatureSystem:
                         cell.add_explicit_layer_source(cell.heat_rhs_dyn,
                                                        source, layer_id=0)
 
-        if not self.solve_individual_cells:
-            rhs_dyn = np.hstack([cell.heat_rhs_dyn for cell in self.cells])
-            self.rhs = self.rhs_const + rhs_dyn
+        rhs_dyn = np.hstack([cell.heat_rhs_dyn for cell in self.cells])
+        self.rhs = self.rhs_const + rhs_dyn
 
     def update_matrix(self):
         """
-        Updates the thermal conductance matrix
+        Updates the thermal conductance matrix with the implicit heat
+        transfer to the channel fluids on its diagonal
         """
-        source_vectors = []
+        dyn_vec = self.workspace.zeros((id(self), 'dynamic diagonal'),
+                                       self.temp_layer_vec.shape)
         for i, cell in enumerate(self.cells):
-            cell.heat_mtx_dyn[:, :] = 0.0
-            source_vectors.append(np.zeros(cell.heat_rhs_dyn.shape))
-
+            index = self.index_arrays[i]
             # add thermal conductance for heat transfer to cathode gas
-            source = -cell.cathode.channel.k_coeff * self.n_cat_channels
-            matrix, source_vec_1 = \
-                cell.add_implicit_layer_source(cell.heat_mtx_dyn, source, 1)
-
+            dyn_vec[index[1]] = \
+                -cell.cathode.channel.k_coeff * self.n_cat_channels
             # add thermal conductance for heat transfer to anode gas
-            source = -cell.anode.channel.k_coeff * self.n_ano_channels
-            matrix, source_vec_2 = \
-                cell.add_implicit_layer_source(cell.heat_mtx_dyn, source, 4)
-
+            dyn_vec[index[4]] = \
+                -cell.anode.channel.k_coeff * self.n_ano_channels
             # add thermal conductance for heat transfer to coolant
-            source_vec_3 = np.zeros(source_vec_1.shape)
             if self.cool_flow:
                 if self.cool_ch_bc:
-                    source = - self.cool_channels[i].k_coeff
-                    source *= self.n_cool_sub_channels
-                    matrix, source_vec = \
-                        cell.add_implicit_layer_source(cell.heat_mtx_dyn,
-                                                       source, layer_id=0)
-                    source_vec_3[:] = source_vec
+                    dyn_vec[index[0]] = \
+                        -self.cool_channels[i].k_coeff \
+                        * self.n_cool_sub_channels
                     if cell.last_cell:
-                        source = - self.cool_channels[i + 1].k_coeff
-                        source *= self.n_cool_sub_channels
-                        matrix, source_vec = \
-                            cell.add_implicit_layer_source(cell.heat_mtx_dyn,
-                                                           source, layer_id=-1)
-                        source_vec_3[:] += source_vec
-                else:
-                    if not cell.first_cell:
-                        source = - self.cool_channels[i - 1].k_coeff
-                        source *= self.n_cool_sub_channels
-                        matrix, source_vec = \
-                            cell.add_implicit_layer_source(cell.heat_mtx_dyn,
-                                                           source, layer_id=0)
-                        source_vec_3[:] = source_vec
-
-            source_vectors[i][:] = source_vec_1 + source_vec_2 + source_vec_3
+                        dyn_vec[index[-1]] = \
+                            -self.cool_channels[i + 1].k_coeff \
+                            * self.n_cool_sub_channels
+                elif not cell.first_cell:
+                    dyn_vec[index[0]] = \
+                        -self.cool_channels[i - 1].k_coeff \
+                        * self.n_cool_sub_channels
 
-        dyn_vec = np.hstack(source_vectors)
         if self.sparse_solve:
-            self.mtx = \
-                self.mtx_const + sparse.diags([dyn_vec], [0], format='csr')
+            data = self.mtx.data
+            data[:] = self.mtx_const_data
+            data[self.diag_index] += dyn_vec
         else:
             self.mtx = self.mtx_const + np.diag(dyn_vec)
 
     def solve_system(self):
-        if self.solve_individual_cells:
-            self.solve_cells()
-        else:
-            self.solve_implicit_system()
+        self.solve_implicit_system()
 
     def solve_implicit_system(self):
         """
@@ -298,75 +355,24 @@ class TemperatureSystem:
         # rhs_df = pd.DataFrame(self.rhs)
         # rhs_df.to_clipboard(index=False, header=False, sep=' ')
         if self.sparse_solve:
-            self.temp_layer_vec[:] = spsolve(self.mtx, self.rhs)
+            self.temp_layer_vec[:] = \
+                self.linear_solver.solve(self.mtx, self.rhs)
         else:
             self.temp_layer_vec[:] = np.linalg.tensorsolve(self.mtx, self.rhs)
 
-    def connect_to_next_cell(self, i):
-        cell = self.cells[i]
-        conductance = cell.thermal_conductance_z[-1]
-        source = conductance * self.cells[i + 1].temp_layer[0]
-        cell.add_explicit_layer_source(cell.heat_rhs_dyn, source, -1)
-        coeff = - conductance
-        cell.add_implicit_layer_source(cell.heat_mtx_dyn, coeff, -1)
-
-    def connect_to_previous_cell(self, i):
-        cell = self.cells[i]
-        conductance = self.cells[i - 1].thermal_conductance_z[-1]
-        source = - conductance * self.cells[i - 1].temp_layer[-1]
-        # source = conductance * (self.cells[i - 1].temp_layer[-1] -
-        #                        self.cells[i].temp_layer[0])
-        cell.add_explicit_layer_source(cell.heat_rhs_dyn, source, 0)
-        source = conductance
-        cell.add_implicit_layer_source(cell.heat_mtx_dyn, source, 0)
-
-    def solve_cells(self):
+    def set_layer_temperatures(self, temp_layer):
         """
-        Solves the layer temperatures.
+        Sets the layer temperature vector from a stack-wide layer
+        temperature array (cells, layers, elements)
         """
-        tolerance = 1e-10
-        error = 1e8
-        under_relaxation = 0.0
-        temp_old = g_func.full(self.temp_layer_vec.shape, 1e8)
-        temp_new = np.zeros(self.temp_layer_vec.shape)
-        counter = 0
-        while (error > tolerance) or (counter < 3):
-            temp_new_list = []
-            for i, cell in enumerate(self.cells):
-                if counter > 0:
-                    if self.n_cells > 1:
-                        if cell.first_cell:
-                            self.connect_to_next_cell(i)
-                        elif cell.last_cell:
-                            self.connect_to_previous_cell(i)
-                        else:
-                            self.connect_to_previous_cell(i)
-                            self.connect_to_next_cell(i)
-                cell.heat_mtx[:] = cell.heat_mtx_const + cell.heat_mtx_dyn
-                cell.heat_rhs[:] = cell.heat_rhs_const + cell.heat_rhs_dyn
-                temp_layer_vec = \
-                    np.linalg.tensorsolve(cell.heat_mtx, cell.heat_rhs)
-                if counter > 0:
-                    temp_layer_vec = (1.0 - under_relaxation) * temp_layer_vec \
-                        + under_relaxation * temp_old_array[i]
-                temp_new_list.append(temp_layer_vec)
-                for j in range(cell.n_layer):
-                    index_vector = cell.index_array[j]
-                    cell.temp_layer[j] = temp_layer_vec[index_vector]
-            temp_old_array = copy.deepcopy(temp_new_list)
-            temp_new[:] = np.concatenate(temp_new_list, axis=0)
-            error = np.abs(np.sum(((temp_old - temp_new) / temp_new) ** 2.0))
-            temp_old[:] = temp_new
-            counter += 1
-        self.temp_layer_vec[:] = temp_new
+        self.temp_layer_vec[self.layer_index] = \
+            temp_layer[self.layer_cell_ids, self.layer_ids]
+        self.update_cell_layer_temperatures()
 
     def update_cell_layer_temperatures(self):
         """
         From 1D temperature vector to 2D cell temperature arrays
         """
-        for i, cell in enumerate(self.cells):
-            for j in range(cell.n_layer):
-                # index_vector = cell.index_array[j]
-                index_vector = self.index_list[i][j]
-                cell.temp_layer[j] = self.temp_layer_vec[index_vector]
+        self.cell_arrays.temp_layer[self.layer_cell_ids, self.layer_ids] = \
+            self.temp_layer_vec[self.layer_index]
 
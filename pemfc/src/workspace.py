@@ -0,0 +1,47 @@
+# general imports
+import numpy as np
+
+
+class Workspace:
+    """
+    Pool of preallocated arrays for the temporary arrays of the iterations,
+    owned by the stack and shared by its components. The buffers are
+    identified by a key, e.g. the owner and the name of the array, and only
+    allocated on the first request. Subsequent requests with the same key,
+    shape and data type return the same array, so that a steady-state outer
+    iteration does not allocate heap memory for them. The content of a buffer
+    is not preserved between requests, each key must only be used by one
+    owner at a time.
+    """
+    def __init__(self):
+        self.buffers = {}
+        self.n_allocations = 0
+        # number of allocated buffers (including re-allocations due to
+        # changed shapes)
+
+    def empty(self, key, shape, dtype=float):
+        """
+        Returns the uninitialized buffer for the provided key
+        """
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        buffer = self.buffers.get(key)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[key] = buffer
+            self.n_allocations += 1
+        return buffer
+
+    def zeros(self, key, shape, dtype=float):
+        """
+        Returns the buffer for the provided key filled with zeros
+        """
+        buffer = self.empty(key, shape, dtype)
+        buffer.fill(0)
+        return buffer
+
+    @property
+    def nbytes(self):
+        """
+        Total size of the buffers in bytes
+        """
+        return sum(buffer.nbytes for buffer in self.buffers.values())
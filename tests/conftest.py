@@ -0,0 +1,62 @@
+# general imports
+import copy
+import numpy as np
+import pytest
+
+# local module imports
+from pemfc.data import input_dicts
+from pemfc.src import simulation
+
+
+@pytest.fixture(autouse=True)
+def raise_numpy_errors():
+    """
+    Raises floating point errors like the main application
+    """
+    old_settings = np.seterr(all='raise')
+    yield
+    np.seterr(**old_settings)
+
+
+@pytest.fixture
+def make_settings(tmp_path):
+    """
+    Returns a function creating the settings of a small stack with the
+    output written to a temporary directory
+    """
+    def make(cell_number=3, current_density=10000.0, save_csv=False,
+             **simulation_dict):
+        settings = copy.deepcopy(input_dicts.sim_dict)
+        settings['stack']['cell_number'] = cell_number
+        settings['simulation']['current_density'] = current_density
+        settings['simulation'].update(simulation_dict)
+        settings['output']['directory'] = str(tmp_path / 'output')
+        settings['output']['save_csv'] = save_csv
+        settings['output']['save_plot'] = False
+        return settings
+    return make
+
+
+@pytest.fixture
+def run_simulation():
+    """
+    Returns a function running the simulation for the given settings and
+    returning the global data, the flattened values of the local data and
+    the simulation object
+    """
+    def get_local_values(local_data):
+        values = {}
+        for name, entry in local_data.items():
+            if 'value' in entry:
+                values[name] = np.asarray(entry['value'])
+            else:
+                for sub_name, sub_entry in entry.items():
+                    values[name + '/' + sub_name] = \
+                        np.asarray(sub_entry['value'])
+        return values
+
+    def run(settings):
+        sim = simulation.Simulation(settings)
+        global_data, local_data = sim.run()
+        return global_data, get_local_values(local_data), sim
+    return run
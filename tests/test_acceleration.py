@@ -0,0 +1,30 @@
+# general imports
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('scheme', ['Anderson', 'Aitken'])
+def test_acceleration_matches_plain_iteration(make_settings, run_simulation,
+                                              scheme):
+    # the convergence criteria limits the change between iterations, the
+    # tight criteria ensures that both solutions are close to the fixed point
+    settings = make_settings(current_density=[6000.0, 10000.0],
+                             iteration_criteria=1e-10)
+    global_data, local_values, sim = run_simulation(settings)
+    assert sim.timing['accelerated_iterations'] == 0
+    assert len(sim.timing['point_iterations']) == 2
+
+    settings = make_settings(current_density=[6000.0, 10000.0],
+                             iteration_criteria=1e-10)
+    settings['simulation']['acceleration']['type'] = scheme
+    acc_global_data, acc_local_values, acc_sim = run_simulation(settings)
+    timing = acc_sim.timing
+    assert sum(timing['point_iterations']) == timing['iterations']
+    assert 0 < timing['accelerated_iterations'] < timing['iterations']
+    assert timing['iterations'] < sim.timing['iterations']
+    np.testing.assert_allclose(acc_global_data['Stack Voltage']['value'],
+                               global_data['Stack Voltage']['value'],
+                               rtol=1e-5)
+    np.testing.assert_allclose(acc_local_values['Current Density'],
+                               local_values['Current Density'], rtol=1e-3)
+    assert np.all(acc_sim.stack.i_cd >= 0.0)
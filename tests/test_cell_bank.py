@@ -0,0 +1,23 @@
+# general imports
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('membrane_type', ['Constant', 'Springer'])
+def test_cell_bank_matches_cell_update(make_settings, run_simulation,
+                                       membrane_type):
+    results = []
+    for cell_bank in (False, True):
+        settings = make_settings()
+        settings['stack']['cell_bank'] = cell_bank
+        settings['membrane']['type'] = membrane_type
+        global_data, local_values, sim = run_simulation(settings)
+        assert (sim.stack.cell_bank is not None) == cell_bank
+        results.append((global_data, local_values, sim.timing['iterations']))
+    (global_data, local_values, iterations), \
+        (bank_global_data, bank_local_values, bank_iterations) = results
+    assert bank_iterations == iterations
+    assert bank_global_data == global_data
+    for name, value in local_values.items():
+        np.testing.assert_array_equal(bank_local_values[name], value,
+                                      err_msg=name)
@@ -0,0 +1,30 @@
+# general imports
+import numpy as np
+import pytest
+
+
+def set_channel_bank(settings, channel_bank):
+    for circuit_dict in (settings['cathode']['flow_circuit'],
+                         settings['anode']['flow_circuit'],
+                         settings['coolant_flow_circuit']):
+        circuit_dict['channel_bank'] = channel_bank
+
+
+@pytest.mark.parametrize('current_density', [10000.0, 24000.0])
+def test_channel_bank_matches_channel_update(make_settings, run_simulation,
+                                             current_density):
+    results = []
+    for channel_bank in (False, True):
+        settings = make_settings(current_density=current_density)
+        set_channel_bank(settings, channel_bank)
+        global_data, local_values, sim = run_simulation(settings)
+        for circuit in sim.stack.flow_circuits:
+            assert (circuit.channel_bank is not None) == channel_bank
+        results.append((global_data, local_values, sim.timing['iterations']))
+    (global_data, local_values, iterations), \
+        (bank_global_data, bank_local_values, bank_iterations) = results
+    assert bank_iterations == iterations
+    assert bank_global_data == global_data
+    for name, value in local_values.items():
+        np.testing.assert_array_equal(bank_local_values[name], value,
+                                      err_msg=name)
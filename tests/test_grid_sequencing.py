@@ -0,0 +1,28 @@
+# general imports
+import numpy as np
+
+# local module imports
+from pemfc.src import grid_sequencing
+
+
+def test_grid_sequencing_matches_baseline(make_settings, run_simulation):
+    results = []
+    for active in (False, True):
+        settings = make_settings(iteration_criteria=1e-10)
+        grid_sequencing.set_nodes(settings, 21)
+        settings['simulation']['grid_sequencing'].update(
+            {'active': active, 'levels': 3, 'coarsening_factor': 2.0})
+        global_data, local_values, sim = run_simulation(settings)
+        if active:
+            assert sim.grid_sequence.n_nodes == [6, 11, 21]
+            assert len(sim.grid_sequence.iterations) == 1
+        else:
+            assert sim.grid_sequence is None
+        results.append((global_data['Stack Voltage']['value'],
+                        local_values['Current Density']))
+    (voltage, current_density), (grid_voltage, grid_current_density) = \
+        results
+    assert grid_current_density.shape == current_density.shape
+    np.testing.assert_allclose(grid_voltage, voltage, rtol=1e-6)
+    np.testing.assert_allclose(grid_current_density, current_density,
+                               rtol=1e-4)
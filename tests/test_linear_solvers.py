@@ -0,0 +1,34 @@
+# general imports
+import numpy as np
+import pytest
+
+
+BLOCK_SOLVERS = ('block_tridiagonal', 'domain_decomposition')
+
+
+def set_linear_solver(settings, solver_type):
+    settings['stack']['temperature_linear_solver']['type'] = solver_type
+    # the electrical system is not partitioned into cell blocks
+    settings['stack']['electrical_linear_solver']['type'] = \
+        'splu' if solver_type in BLOCK_SOLVERS else solver_type
+
+
+@pytest.mark.parametrize('solver_type', ['splu', 'block_tridiagonal',
+                                         'domain_decomposition', 'bicgstab',
+                                         'gmres'])
+def test_linear_solver_matches_spsolve(make_settings, run_simulation,
+                                       solver_type):
+    results = []
+    for backend in ('spsolve', solver_type):
+        settings = make_settings(cell_number=7, current_density=24000.0)
+        set_linear_solver(settings, backend)
+        global_data, local_values, sim = run_simulation(settings)
+        results.append((global_data['Stack Voltage']['value'],
+                        local_values['Current Density'],
+                        sim.timing['iterations']))
+    (voltage, current_density, iterations), \
+        (solver_voltage, solver_current_density, solver_iterations) = results
+    assert solver_iterations == iterations
+    assert abs(solver_voltage - voltage) < 1e-6
+    np.testing.assert_allclose(solver_current_density, current_density,
+                               rtol=1e-6)
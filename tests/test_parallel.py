@@ -0,0 +1,42 @@
+# general imports
+import threading
+import numpy as np
+
+
+def count_pool_threads():
+    return sum(thread.name.startswith('ThreadPoolExecutor')
+               for thread in threading.enumerate())
+
+
+def test_cell_threads_match_serial_update(make_settings, run_simulation):
+    n_threads = count_pool_threads()
+    results = []
+    for cell_threads in (1, 2):
+        settings = make_settings(cell_number=4)
+        settings['stack']['cell_bank'] = False
+        settings['stack']['cell_threads'] = cell_threads
+        settings['stack']['concurrent_flow_circuits'] = cell_threads > 1
+        global_data, local_values, sim = run_simulation(settings)
+        results.append((global_data, local_values, sim.timing['iterations']))
+    (global_data, local_values, iterations), \
+        (thread_global_data, thread_local_values, thread_iterations) = results
+    assert thread_iterations == iterations
+    assert thread_global_data == global_data
+    for name, value in local_values.items():
+        np.testing.assert_array_equal(thread_local_values[name], value,
+                                      err_msg=name)
+    # the worker threads are shut down at the end of the run
+    assert count_pool_threads() == n_threads
+
+
+def test_replaced_stacks_are_closed(make_settings, run_simulation):
+    n_threads = count_pool_threads()
+    settings = make_settings(cell_number=12)
+    settings['stack']['cell_bank'] = False
+    settings['stack']['cell_threads'] = 2
+    settings['simulation']['reduced_order'].update(
+        {'active': True, 'clusters': 2, 'tolerance': 1e-6,
+         'max_refinements': 2})
+    settings['simulation']['grid_sequencing']['active'] = True
+    global_data, local_values, sim = run_simulation(settings)
+    assert count_pool_threads() == n_threads
@@ -0,0 +1,41 @@
+# general imports
+import numpy as np
+import pytest
+
+
+def run_stack(make_settings, run_simulation, reduced_dict=None):
+    settings = make_settings(cell_number=12, iteration_criteria=1e-10)
+    if reduced_dict is not None:
+        settings['simulation']['reduced_order'].update(reduced_dict)
+        settings['simulation']['reduced_order']['active'] = True
+    global_data, local_values, sim = run_simulation(settings)
+    return global_data['Stack Voltage']['value'], \
+        local_values['Cell Voltage'], sim.stack.n_cells
+
+
+def test_single_cell_clusters_match_full_stack(make_settings,
+                                               run_simulation):
+    voltage, cell_voltage, n_cells = run_stack(make_settings, run_simulation)
+    reduced_voltage, reduced_cell_voltage, n_solved = \
+        run_stack(make_settings, run_simulation,
+                  {'clusters': 10, 'max_refinements': 0})
+    assert n_solved == n_cells == 12
+    assert reduced_voltage == voltage
+    np.testing.assert_array_equal(reduced_cell_voltage, cell_voltage)
+
+
+@pytest.mark.parametrize('max_refinements', [0, 1])
+def test_reduced_order_matches_full_stack(make_settings, run_simulation,
+                                          max_refinements):
+    tolerance = 2e-3
+    voltage, cell_voltage, n_cells = run_stack(make_settings, run_simulation)
+    reduced_voltage, reduced_cell_voltage, n_solved = \
+        run_stack(make_settings, run_simulation,
+                  {'clusters': 4, 'tolerance': tolerance,
+                   'max_refinements': max_refinements})
+    assert n_solved < n_cells
+    assert reduced_cell_voltage.shape == cell_voltage.shape
+    np.testing.assert_allclose(reduced_voltage, voltage, rtol=tolerance)
+    np.testing.assert_allclose(np.average(reduced_cell_voltage, axis=-1),
+                               np.average(cell_voltage, axis=-1),
+                               rtol=tolerance)
@@ -0,0 +1,68 @@
+# general imports
+import os
+import numpy as np
+
+# local module imports
+from pemfc.src import simulation
+from pemfc.src import result_cache
+
+
+def make_cache_settings(make_settings, directory, **cache_dict):
+    cache_dict.update({'active': True, 'directory': str(directory)})
+    return make_settings(save_csv=True, result_cache=cache_dict)
+
+
+def test_cache_hit_and_miss(make_settings, tmp_path):
+    settings = make_cache_settings(make_settings, tmp_path / 'cache')
+    sim = simulation.Simulation(settings)
+    global_data, local_data = sim.run()
+    assert not sim.cache_hit
+
+    sim = simulation.Simulation(settings)
+    assert sim.stack is None
+    cached_global_data, cached_local_data = sim.run()
+    assert sim.cache_hit
+    assert sim.output.case_name == 'Case0'
+    assert os.path.isfile(sim.cache_state_path)
+    assert cached_global_data['Stack Voltage']['value'] \
+        == global_data['Stack Voltage']['value']
+    np.testing.assert_array_equal(
+        cached_local_data['Cell Voltage']['value'],
+        local_data['Cell Voltage']['value'])
+
+    # different operating point
+    settings['simulation']['current_density'] = 8000.0
+    sim = simulation.Simulation(settings)
+    sim.run()
+    assert not sim.cache_hit
+
+
+def test_cache_miss_with_modified_output(make_settings, tmp_path):
+    settings = make_cache_settings(make_settings, tmp_path / 'cache')
+    sim = simulation.Simulation(settings)
+    sim.run()
+    csv_path = os.path.join(sim.output.output_dir, 'Case0', 'csv_data')
+    os.remove(os.path.join(csv_path, sorted(os.listdir(csv_path))[0]))
+
+    sim = simulation.Simulation(settings)
+    assert sim.stack is not None
+    sim.run()
+    assert not sim.cache_hit
+    assert simulation.Simulation(settings).cache_entry is not None
+
+
+def test_cache_eviction(tmp_path):
+    cache = result_cache.ResultCache({'directory': str(tmp_path)})
+    data = {'Stack Voltage': {'value': np.ones(200), 'units': 'V'}}
+    keys = [cache.get_key({'index': i}, [0.0]) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.save(key, data, data)
+        # distinct access times of the entries
+        os.utime(cache.get_paths(key)[0], (i, i))
+    assert all(cache.load(key) is not None for key in keys[1:])
+    # first entry is least recently used
+    cache.max_size = 2.5 * os.path.getsize(cache.get_paths(keys[0])[0])
+    cache.evict()
+    assert cache.load(keys[0]) is None
+    assert cache.load(keys[1]) is not None
+    assert cache.load(keys[2]) is not None
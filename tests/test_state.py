@@ -0,0 +1,38 @@
+# general imports
+import os
+import numpy as np
+
+# local module imports
+from pemfc.src import simulation
+
+
+def test_save_and_load_state_round_trip(make_settings, run_simulation,
+                                        tmp_path):
+    settings = make_settings(save_states=True, iteration_criteria=1e-10)
+    global_data, local_values, cold_sim = run_simulation(settings)
+    state_path = os.path.join(cold_sim.output.output_dir, 'Case0',
+                              'state.npz')
+    assert os.path.isfile(state_path)
+
+    # a stack restored from the state file writes the same state
+    settings = make_settings(initial_state_file=state_path,
+                             iteration_criteria=1e-10)
+    sim = simulation.Simulation(settings)
+    assert sim.warm_start
+    restored_path = str(tmp_path / 'restored.npz')
+    sim.stack.save_state(restored_path)
+    with np.load(state_path) as data, np.load(restored_path) as restored:
+        assert sorted(restored.files) == sorted(data.files)
+        for name in data.files:
+            np.testing.assert_array_equal(restored[name], data[name],
+                                          err_msg=name)
+
+    # the warm start from the converged state converges immediately
+    warm_global_data, warm_local_values, warm_sim = run_simulation(settings)
+    assert warm_sim.timing['iterations'] <= warm_sim.min_it + 2 \
+        < cold_sim.timing['iterations']
+    np.testing.assert_allclose(warm_global_data['Stack Voltage']['value'],
+                               global_data['Stack Voltage']['value'],
+                               rtol=1e-6)
+    np.testing.assert_allclose(warm_local_values['Current Density'],
+                               local_values['Current Density'], rtol=1e-4)